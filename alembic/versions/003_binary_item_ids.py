@@ -0,0 +1,80 @@
+"""Store item ids as native UUID / 16-byte binary.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+"""
+
+import uuid
+from collections.abc import Callable
+from typing import Any, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+
+def _copy_items(id_type: sa.types.TypeEngine, convert: Callable[[Any], Any]) -> None:
+    """Rebuild the items table with a new id type, converting each key.
+
+    Used on databases without an in-place ``ALTER COLUMN ... USING`` (SQLite).
+    """
+    bind = op.get_bind()
+    op.create_table(
+        "items_new",
+        sa.Column("id", id_type, primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("description", sa.Text, nullable=False),
+        sa.Column("version", sa.Integer, nullable=False, server_default="1"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+        ),
+    )
+    columns = ("id", "name", "description", "version", "updated_at")
+    old_items = sa.table("items", *(sa.column(name) for name in columns))
+    new_items = sa.table("items_new", *(sa.column(name) for name in columns))
+
+    rows = bind.execute(sa.select(old_items))
+    while batch := rows.fetchmany(BATCH_SIZE):
+        bind.execute(
+            new_items.insert(),
+            [{**row._asdict(), "id": convert(row.id)} for row in batch],
+        )
+
+    op.drop_table("items")
+    op.rename_table("items_new", "items")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column(
+            "items",
+            "id",
+            type_=postgresql.UUID(as_uuid=True),
+            postgresql_using="id::uuid",
+        )
+    else:
+        _copy_items(sa.LargeBinary(16), lambda value: uuid.UUID(value).bytes)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column(
+            "items",
+            "id",
+            type_=sa.String(36),
+            postgresql_using="id::text",
+        )
+    else:
+        _copy_items(sa.String(36), lambda value: str(uuid.UUID(bytes=value)))
@@ -0,0 +1,42 @@
+"""Create item_counts table, seeded with the current item count.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match app.db.models.ITEM_COUNT_SLOTS.
+SLOTS = 16
+
+
+def upgrade() -> None:
+    item_counts = op.create_table(
+        "item_counts",
+        sa.Column("slot", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("count", sa.BigInteger, nullable=False),
+    )
+    # Lock out concurrent inserts so none is missed between the count and
+    # the first application write to the counter.
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("LOCK TABLE items IN SHARE MODE")
+    existing = bind.execute(sa.text("SELECT COUNT(*) FROM items")).scalar_one()
+    op.bulk_insert(
+        item_counts,
+        [{"slot": slot, "count": existing if slot == 0 else 0} for slot in range(SLOTS)],
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("item_counts")
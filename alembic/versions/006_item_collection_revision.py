@@ -0,0 +1,29 @@
+"""Add the collection revision to item_counts.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("item_counts") as batch_op:
+        batch_op.add_column(
+            sa.Column("revision", sa.BigInteger, nullable=False, server_default="0")
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("item_counts") as batch_op:
+        batch_op.drop_column("revision")
@@ -3,14 +3,22 @@
 import os
 from datetime import UTC, datetime
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 
 from app import __version__
+from app.core.drain import get_drain_state
 
 router = APIRouter()
 
 
+class ReadinessResponse(BaseModel):
+    """Readiness check response model."""
+
+    status: str
+    in_flight: int
+
+
 class HealthResponse(BaseModel):
     """Health check response model."""
 
@@ -33,3 +41,24 @@ def health_check() -> HealthResponse:
         timestamp=datetime.now(UTC).isoformat(),
         environment=os.getenv("ENVIRONMENT", "development"),
     )
+
+
+@router.get(
+    "/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse}},
+)
+def readiness_check(response: Response) -> ReadinessResponse:
+    """Report whether this replica should receive new traffic.
+
+    Unlike ``/health``, this fails as soon as a drain begins, so the replica
+    is taken out of rotation while in-flight requests finish.
+
+    Returns:
+        ReadinessResponse with ``ready`` or ``draining`` status (HTTP 503).
+    """
+    drain = get_drain_state()
+    if drain.draining:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return ReadinessResponse(status="draining", in_flight=drain.in_flight)
+    return ReadinessResponse(status="ready", in_flight=drain.in_flight)
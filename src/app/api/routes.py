@@ -1,77 +1,505 @@
 """API routes for items and calculator endpoints."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+import json
+import logging
+import math
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Literal
 
-from app.db.database import get_db
-from app.db.models import Item
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.wire import (
+    NegotiatedResponse,
+    NegotiatedRoute,
+    dump_json,
+    packb,
+    response_media_type,
+    unpackb,
+)
+from app.core.config import get_settings
+from app.core.etag import etag_matches, make_etag
+from app.db import repository
+from app.db.database import get_db, get_read_db, get_session_factory
+from app.db.types import parse_uuid
 from app.models.schemas import (
+    AggregateResponse,
     CalculateRequest,
     CalculateResponse,
+    CalculateStreamRequest,
+    ImportResult,
+    ItemCountResponse,
     ItemCreate,
     ItemResponse,
     Operation,
+    QuantileEstimate,
 )
+from app.services.aggregation import AggregationError, aggregate
 from app.services.calculator import add, divide, multiply, subtract
+from app.services.change_feed import (
+    ItemEvent,
+    get_change_feed,
+    item_event_stream,
+    publish_on_commit,
+    resume_cursor,
+)
+from app.services.idempotency import (
+    MAX_KEY_LENGTH,
+    IdempotencyConflict,
+    IdempotencyStoreFull,
+    IdempotentCall,
+    StoredResponse,
+    get_idempotency_store,
+    request_fingerprint,
+)
+from app.services.importer import (
+    ImportCheckpoint,
+    ImportFailed,
+    ImportFormatError,
+    ImportProgress,
+    ItemImporter,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/api/v1",
+    tags=["api"],
+    route_class=NegotiatedRoute,
+    default_response_class=NegotiatedResponse,
+)
+
 
-router = APIRouter(prefix="/api/v1", tags=["api"])
+def _item_etag(item_id: uuid.UUID, version: int) -> str:
+    """Build the ETag of a single item in the negotiated media type."""
+    return make_etag("item", item_id, version, response_media_type())
+
+
+# Lowest item ID, where the first page starts.
+_FIRST_ID = uuid.UUID(int=0)
+
+
+def _items_etag(revision: int, *page: object) -> str:
+    """Build the ETag of the item list, or of one page, from its revision.
+
+    Like item ETags, it differs between the JSON and MessagePack
+    representations.
+    """
+    return make_etag("items", revision, *page, response_media_type())
+
+
+def _not_modified(etag: str) -> Response:
+    """Build an empty 304 response carrying the current ETag."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Vary": "Accept"},
+    )
+
+
+# How item totals are computed: "exact" from the item counter, "approximate"
+# from PostgreSQL statistics (falling back to exact elsewhere).
+CountMode = Literal["exact", "approximate"]
+# Largest page of GET /items.
+MAX_PAGE_SIZE = 1000
+
+
+async def _count_items(db: AsyncSession, mode: CountMode) -> ItemCountResponse:
+    """Count items without scanning the items table."""
+    if mode == "approximate":
+        estimate = await repository.estimate_item_count(db)
+        if estimate is not None:
+            return ItemCountResponse(count=estimate, exact=False)
+    return ItemCountResponse(count=await repository.count_items(db), exact=True)
 
 
 @router.get("/items", response_model=list[ItemResponse])
-async def get_items(db: AsyncSession = Depends(get_db)) -> list[ItemResponse]:
-    """Get all items.
+async def get_items(
+    response: Response,
+    after: uuid.UUID | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    total: CountMode | None = Query(default=None),
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
+) -> list[ItemResponse] | Response:
+    """Get all items, or one page of them.
+
+    Args:
+        after: Return only items created after this item ID (requires ``limit``).
+        limit: Return at most this many items, oldest first. Pass the last
+            returned ID as ``after`` to get the next page.
+        total: Also return the number of items, in ``X-Total-Count``.
+        if_none_match: Optional ETag(s) of a list representation the client holds.
 
     Returns:
-        List of all items in the database.
+        List of the requested items, or an empty 304 response if the
+        client's copy is still current.
     """
-    result = await db.execute(select(Item))
-    items = result.scalars().all()
+    if limit is None and after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="after requires limit",
+        )
+    # Read the revision before the items: a write committing in between then
+    # yields a newer body under an older ETag, which the next poll corrects,
+    # never an older body under a newer ETag.
+    revision = await repository.items_revision(db)
+    etag = (
+        _items_etag(revision) if limit is None else _items_etag(revision, after, limit)
+    )
+    if if_none_match and etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+
+    if limit is None:
+        items = await repository.list_items(db)
+    else:
+        items = await repository.list_items_after(db, after or _FIRST_ID, limit)
+    response.headers["ETag"] = etag
+    if total is not None:
+        response.headers["X-Total-Count"] = str((await _count_items(db, total)).count)
     return [
         ItemResponse(id=item.id, name=item.name, description=item.description)
         for item in items
     ]
 
 
+@router.get("/items/count", response_model=ItemCountResponse)
+async def count_items(
+    mode: CountMode = Query(default="exact"),
+    db: AsyncSession = Depends(get_read_db),
+) -> ItemCountResponse:
+    """Get the number of items.
+
+    Args:
+        mode: ``exact`` reads the item counter; ``approximate`` reads
+            PostgreSQL's table statistics, which lag behind recent writes,
+            and is exact on other databases.
+
+    Returns:
+        The item count and whether it is exact.
+    """
+    return await _count_items(db, mode)
+
+
+@asynccontextmanager
+async def _idempotent(
+    request: Request, key: str | None, body: bytes
+) -> AsyncIterator[IdempotentCall]:
+    """Apply the request's ``Idempotency-Key``, if any, around a handler.
+
+    Args:
+        request: The request, whose method, path and query are fingerprinted.
+        key: The ``Idempotency-Key`` header value.
+        body: Canonical form of the request body to fingerprint.
+
+    Raises:
+        HTTPException: 400 for an overlong key, 409 while the first request
+            with the key is still running, 422 if the key was used for a
+            different request, 503 if every stored key belongs to a running
+            request.
+    """
+    if key is not None and not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters",
+        )
+    call = IdempotentCall(
+        get_idempotency_store(),
+        key,
+        request_fingerprint(request.method, request.url.path, request.url.query, body),
+    )
+    try:
+        await call.begin()
+    except IdempotencyConflict as exc:
+        if exc.reason == "mismatch":
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail="Idempotency-Key was already used for a different request",
+            ) from exc
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress",
+            headers={"Retry-After": "1"},
+        ) from exc
+    except IdempotencyStoreFull as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many requests with an Idempotency-Key are in progress",
+            headers={"Retry-After": "1"},
+        ) from exc
+
+    failed = True
+    try:
+        yield call
+        failed = False
+    finally:
+        await call.finish(failed)
+
+
+def _replay(stored: StoredResponse) -> Response:
+    """Rebuild a stored response for a retried request."""
+    return NegotiatedResponse(
+        stored.content,
+        status_code=stored.status_code,
+        headers={**stored.headers, "Idempotent-Replayed": "true"},
+    )
+
+
 @router.post("/items", response_model=ItemResponse, status_code=status.HTTP_201_CREATED)
 async def create_item(
-    item: ItemCreate, db: AsyncSession = Depends(get_db)
-) -> ItemResponse:
+    item: ItemCreate,
+    request: Request,
+    response: Response,
+    idempotency_key: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_db),
+) -> ItemResponse | Response:
     """Create a new item.
 
     Args:
         item: Item data to create.
+        idempotency_key: Optional client-chosen key repeated on retries; a
+            retry of a completed request gets the original response back
+            (marked ``Idempotent-Replayed``) without creating another item.
 
     Returns:
         The created item with generated ID.
     """
-    db_item = Item(name=item.name, description=item.description)
-    db.add(db_item)
-    await db.flush()
-    await db.refresh(db_item)
-
-    return ItemResponse(
-        id=db_item.id,
-        name=db_item.name,
-        description=db_item.description,
+    async with _idempotent(
+        request, idempotency_key, item.model_dump_json().encode()
+    ) as call:
+        if call.replay is not None:
+            return _replay(call.replay)
+
+        db_item = await repository.create_item(db, item.name, item.description)
+
+        created = ItemResponse(
+            id=db_item.id,
+            name=db_item.name,
+            description=db_item.description,
+        )
+        publish_on_commit(db, ItemEvent.created(created))
+        etag = _item_etag(db_item.id, db_item.version)
+        if idempotency_key is not None:
+            # Only a committed item may be replayed.
+            await db.commit()
+            call.record(
+                StoredResponse(
+                    status.HTTP_201_CREATED,
+                    created.model_dump(mode="json"),
+                    {"ETag": etag},
+                )
+            )
+    response.headers["ETag"] = etag
+    return created
+
+
+async def _replay_pages(
+    db: AsyncSession, after: uuid.UUID | None, page_size: int
+) -> AsyncIterator[list[ItemEvent]]:
+    """Yield pages of creation events for items after ``after``."""
+    while after is not None:
+        items = await repository.list_items_after(db, after, page_size)
+        yield [
+            ItemEvent.created(
+                ItemResponse(id=item.id, name=item.name, description=item.description)
+            )
+            for item in items
+        ]
+        after = items[-1].id if len(items) == page_size else None
+
+
+@router.get("/items/changes", response_class=StreamingResponse)
+async def item_changes(
+    last_event_id: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
+) -> StreamingResponse:
+    """Stream item creations as Server-Sent Events.
+
+    Each event's ID is the item ID. A client reconnecting with
+    ``Last-Event-ID`` first receives every item created after that ID, then
+    live events. Items can commit slightly out of ID order, so the replay
+    starts ``CHANGE_FEED_OVERLAP_SECONDS`` before that ID and may repeat
+    events the client already has. A client too slow to drain its buffer, or
+    connected while the feed lost events, receives a ``reset`` event and
+    should reconnect with its last event ID.
+
+    Args:
+        last_event_id: ID of the last event the client received, if resuming.
+
+    Returns:
+        A ``text/event-stream`` response that stays open until the client
+        disconnects.
+    """
+    settings = get_settings()
+    feed = get_change_feed()
+    # Subscribe before replaying so events committed in between are buffered.
+    subscription = feed.subscribe()
+    last_id = parse_uuid(last_event_id) if last_event_id else None
+    cursor = (
+        resume_cursor(last_id, settings.change_feed_overlap_seconds)
+        if last_id is not None
+        else None
+    )
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for message in item_event_stream(
+                subscription,
+                _replay_pages(db, cursor, settings.change_feed_replay_page_size),
+                settings.change_feed_heartbeat_seconds,
+                settings.change_feed_overlap_seconds,
+            ):
+                yield message
+        finally:
+            feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Content types accepted by the import endpoint, by import format.
+_IMPORT_MEDIA_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+def _log_import_progress(
+    progress: ImportProgress, checkpoint: ImportCheckpoint
+) -> None:
+    logger.info(
+        "Item import: %d rows read, %d imported, %d rejected (%.0f rows/s)",
+        progress.rows,
+        progress.imported,
+        progress.rejected,
+        progress.rows / max(progress.elapsed, 1e-9),
     )
 
 
+@router.post(
+    "/items/import",
+    response_model=ImportResult,
+    responses={500: {"model": ImportResult}},
+)
+async def import_items(
+    request: Request,
+    format: str | None = Query(default=None, pattern="^(csv|ndjson)$"),
+    checkpoint: str | None = Query(default=None),
+    idempotency_key: str | None = Header(default=None),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> ImportResult | Response:
+    """Bulk-import items from a streamed CSV or NDJSON body.
+
+    The body is read in chunks and loaded in batches, so it is never held in
+    memory as a whole. Rows that fail validation are skipped and reported.
+
+    Args:
+        format: ``csv`` or ``ndjson``; inferred from ``Content-Type`` if omitted.
+        checkpoint: ``checkpoint`` of an earlier, failed import of the same
+            body, to load only the batches it did not commit.
+        idempotency_key: Optional client-chosen key repeated on retries; a
+            retry of a completed import gets its summary back instead of
+            loading the body again. The body is streamed, so only the
+            method, path, query and ``Content-Type`` are fingerprinted.
+
+    Returns:
+        Import totals, the first rejected rows and a checkpoint. If a batch
+        fails to load, the same summary is returned with status 500 and
+        ``complete`` set to false.
+    """
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip()
+    fmt = format or _IMPORT_MEDIA_TYPES.get(content_type.lower())
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or set ?format=",
+        )
+
+    settings = get_settings()
+    async with _idempotent(request, idempotency_key, content_type.encode()) as call:
+        if call.replay is not None:
+            return _replay(call.replay)
+        try:
+            importer = ItemImporter(
+                session_factory,
+                batch_size=settings.import_batch_size,
+                parallelism=settings.import_parallelism,
+                max_errors=settings.import_max_errors,
+                checkpoint=(
+                    ImportCheckpoint.from_token(checkpoint) if checkpoint else None
+                ),
+                on_progress=_log_import_progress,
+            )
+            progress = await importer.run(request.stream(), fmt)
+        except ImportFormatError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+            ) from exc
+        except ImportFailed as exc:
+            # Not recorded: a retry with the checkpoint should run again.
+            result = exc.progress.to_result(exc.checkpoint, complete=False)
+            return NegotiatedResponse(
+                result.model_dump(mode="json"),
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+        result = progress.to_result(importer.checkpoint, complete=True)
+        call.record(StoredResponse(status.HTTP_200_OK, result.model_dump(mode="json")))
+    return result
+
+
 @router.get("/items/{item_id}", response_model=ItemResponse)
-async def get_item(item_id: str, db: AsyncSession = Depends(get_db)) -> ItemResponse:
+async def get_item(
+    item_id: str,
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: AsyncSession = Depends(get_read_db),
+) -> ItemResponse | Response:
     """Get a specific item by ID.
 
     Args:
         item_id: The unique identifier of the item.
+        if_none_match: Optional ETag(s) of an item representation the client holds.
 
     Returns:
-        The item with the specified ID.
+        The item with the specified ID, or an empty 304 response if the
+        client's copy is still current.
 
     Raises:
         HTTPException: If the item is not found.
     """
-    result = await db.execute(select(Item).where(Item.id == item_id))
-    item = result.scalar_one_or_none()
+    key = parse_uuid(item_id)
+    if key is not None and if_none_match:
+        # Revalidate against the version column only; the row is loaded and
+        # serialized only when the client's copy is stale.
+        version = await repository.get_item_version(db, key)
+        if version is not None:
+            etag = _item_etag(key, version)
+            if etag_matches(if_none_match, etag):
+                return _not_modified(etag)
+
+    item = await repository.get_item(db, key) if key is not None else None
 
     if item is None:
         raise HTTPException(
@@ -79,9 +507,32 @@ async def get_item(item_id: str, db: AsyncSession = Depends(get_db)) -> ItemResp
             detail=f"Item with id '{item_id}' not found",
         )
 
+    response.headers["ETag"] = _item_etag(item.id, item.version)
     return ItemResponse(id=item.id, name=item.name, description=item.description)
 
 
+_OPERATIONS = {
+    Operation.ADD: add,
+    Operation.SUBTRACT: subtract,
+    Operation.MULTIPLY: multiply,
+    Operation.DIVIDE: divide,
+}
+
+
+def _compute(request: CalculateRequest) -> CalculateResponse:
+    """Apply the requested operation.
+
+    Raises:
+        ValueError: If the calculator rejects the operands.
+    """
+    return CalculateResponse(
+        a=request.a,
+        b=request.b,
+        operation=request.operation.value,
+        result=_OPERATIONS[request.operation](request.a, request.b),
+    )
+
+
 @router.post("/calculate", response_model=CalculateResponse)
 async def calculate(request: CalculateRequest) -> CalculateResponse:
     """Perform a calculation.
@@ -95,24 +546,188 @@ async def calculate(request: CalculateRequest) -> CalculateResponse:
     Raises:
         HTTPException: If division by zero is attempted.
     """
-    operations = {
-        Operation.ADD: add,
-        Operation.SUBTRACT: subtract,
-        Operation.MULTIPLY: multiply,
-        Operation.DIVIDE: divide,
-    }
-
     try:
-        result = operations[request.operation](request.a, request.b)
+        return _compute(request)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         ) from None
 
-    return CalculateResponse(
-        a=request.a,
-        b=request.b,
-        operation=request.operation.value,
-        result=result,
+
+_AGGREGATE_MEDIA_TYPES = {
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/octet-stream": "float64",
+}
+
+
+@router.post("/calculate/aggregate", response_model=AggregateResponse)
+async def calculate_aggregate(
+    request: Request,
+    format: str | None = Query(default=None, pattern="^(ndjson|float64)$"),
+    q: list[float] = Query(default=[0.5, 0.9, 0.99]),
+) -> AggregateResponse:
+    """Compute statistics over a streamed sequence of numbers.
+
+    The body is consumed chunk by chunk in a single pass and never buffered:
+    memory use does not grow with the number of values.
+
+    Args:
+        format: ``ndjson`` (one JSON number per line) or ``float64`` (packed
+            little-endian doubles); inferred from ``Content-Type`` if omitted.
+        q: Quantiles to estimate, each between 0 and 1 (repeat the
+            parameter for several).
+
+    Returns:
+        Count, sum, mean, sample variance and standard deviation, extremes
+        and the estimated quantiles.
+
+    Raises:
+        HTTPException: 415 if the format is unknown, 400 if the body is not a
+            sequence of finite numbers or a quantile is out of range.
+    """
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip()
+    fmt = format or _AGGREGATE_MEDIA_TYPES.get(content_type.lower())
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=(
+                "Send application/x-ndjson or application/octet-stream, "
+                "or set ?format="
+            ),
+        )
+    if not all(0 <= quantile <= 1 for quantile in q):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quantiles must be between 0 and 1",
+        )
+
+    try:
+        result = await aggregate(
+            request.stream(), fmt, get_settings().calculate_aggregate_compression
+        )
+    except AggregationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        ) from None
+
+    stats = result.stats
+    empty = stats.count == 0
+    variance = stats.variance
+    return AggregateResponse(
+        count=stats.count,
+        sum=stats.sum,
+        mean=None if empty else stats.mean,
+        variance=variance,
+        stddev=None if variance is None else math.sqrt(variance),
+        min=None if empty else stats.minimum,
+        max=None if empty else stats.maximum,
+        quantiles=[
+            QuantileEstimate(q=quantile, value=result.digest.quantile(quantile))
+            for quantile in q
+        ],
     )
+
+
+def _stream_reply(message: object) -> dict[str, Any]:
+    """Compute the reply to one streamed calculation message."""
+    correlation_id = message.get("id") if isinstance(message, dict) else None
+    try:
+        request = CalculateStreamRequest.model_validate(message)
+        reply = _compute(request).model_dump()
+    except ValidationError as e:
+        return {
+            "id": correlation_id,
+            "detail": e.errors(include_url=False, include_context=False),
+        }
+    except ValueError as e:
+        return {"id": correlation_id, "detail": str(e)}
+    reply["id"] = request.id
+    return reply
+
+
+async def _receive_calculations(
+    websocket: WebSocket, replies: asyncio.Queue[tuple[dict[str, Any], bool]]
+) -> None:
+    """Read calculation frames and queue one reply per message.
+
+    ``replies`` is bounded, so a client that stops reading results stops being
+    read from as well; TCP backpressure then throttles the sender.
+    """
+    while True:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000))
+        binary = frame.get("bytes") is not None
+        try:
+            payload = unpackb(frame["bytes"]) if binary else json.loads(frame["text"])
+        except ValueError:
+            payload = None
+        # A frame may carry a client-side batch of messages.
+        for message in payload if isinstance(payload, list) else [payload]:
+            await replies.put((_stream_reply(message), binary))
+
+
+async def _send_replies(
+    websocket: WebSocket,
+    replies: asyncio.Queue[tuple[dict[str, Any], bool]],
+    max_batch: int,
+    batch_window: float,
+) -> None:
+    """Send queued replies, coalescing up to ``max_batch`` per frame."""
+    while True:
+        batch = [await replies.get()]
+        if max_batch > 1 and batch_window > 0:
+            await asyncio.sleep(batch_window)
+        while len(batch) < max_batch and not replies.empty():
+            batch.append(replies.get_nowait())
+
+        # Replies go back in the framing (text JSON / binary MessagePack) of
+        # the message that produced them.
+        for binary, group in groupby(batch, key=itemgetter(1)):
+            bodies = [reply for reply, _ in group]
+            content: object = bodies if max_batch > 1 else bodies[0]
+            if binary:
+                await websocket.send_bytes(packb(content))
+            else:
+                await websocket.send_text(dump_json(content).decode())
+
+
+@router.websocket("/calculate/ws")
+async def calculate_stream(
+    websocket: WebSocket,
+    max_batch: int = Query(default=1, ge=1),
+    batch_window_ms: float = Query(default=0.0, ge=0.0, le=1000.0),
+) -> None:
+    """Stream calculations over a WebSocket.
+
+    Each message is a ``CalculateRequest`` with an optional ``id`` echoed back
+    as a correlation ID; a frame may also hold a list of messages. Text frames
+    carry JSON, binary frames MessagePack, and replies are pipelined in order.
+
+    Args:
+        max_batch: Maximum replies coalesced into one frame (sent as a list
+            when greater than 1).
+        batch_window_ms: How long to wait for more replies before flushing a
+            batch.
+    """
+    settings = get_settings()
+    await websocket.accept()
+    replies: asyncio.Queue[tuple[dict[str, Any], bool]] = asyncio.Queue(
+        maxsize=settings.calculate_ws_max_in_flight
+    )
+    try:
+        async with asyncio.TaskGroup() as tasks:
+            tasks.create_task(_receive_calculations(websocket, replies))
+            tasks.create_task(
+                _send_replies(
+                    websocket,
+                    replies,
+                    min(max_batch, settings.calculate_ws_max_batch),
+                    batch_window_ms / 1000,
+                )
+            )
+    except* WebSocketDisconnect:
+        pass
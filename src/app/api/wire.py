@@ -0,0 +1,153 @@
+"""Content negotiation between JSON and MessagePack for API routes."""
+
+import json
+import math
+from collections.abc import Callable, Coroutine
+from contextvars import ContextVar
+from typing import Any
+
+import msgpack
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.background import BackgroundTask
+
+from app.core.negotiation import negotiate
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = (
+    "application/msgpack",
+    "application/x-msgpack",
+    "application/vnd.msgpack",
+)
+# JSON stays first so that ``*/*`` and a missing ``Accept`` header keep the
+# existing behaviour.
+RESPONSE_MEDIA_TYPES = (JSON_MEDIA_TYPE, *MSGPACK_MEDIA_TYPES)
+
+_response_media_type: ContextVar[str] = ContextVar(
+    "response_media_type", default=JSON_MEDIA_TYPE
+)
+
+
+def response_media_type() -> str:
+    """Return the media type negotiated for the current request's response."""
+    return _response_media_type.get()
+
+
+def _finite(content: Any) -> Any:
+    """Replace NaN and infinities with None, as pydantic's JSON output does."""
+    if isinstance(content, float):
+        return content if math.isfinite(content) else None
+    if isinstance(content, dict):
+        return {key: _finite(value) for key, value in content.items()}
+    if isinstance(content, list | tuple):
+        return [_finite(value) for value in content]
+    return content
+
+
+def is_msgpack(content_type: str | None) -> bool:
+    """Check whether a ``Content-Type`` header denotes MessagePack."""
+    if not content_type:
+        return False
+    return content_type.split(";", 1)[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def packb(content: Any) -> bytes:
+    """Encode JSON-compatible content as MessagePack."""
+    packed: bytes = msgpack.packb(content, use_bin_type=True)
+    return packed
+
+
+def unpackb(data: bytes) -> Any:
+    """Decode MessagePack into JSON-compatible Python objects."""
+    return msgpack.unpackb(data, raw=False)
+
+
+class NegotiatedResponse(Response):
+    """Response rendered as JSON or MessagePack for the current request.
+
+    FastAPI hands this class JSON-compatible content, so MessagePack output is
+    produced directly without a JSON round trip.
+    """
+
+    media_type = JSON_MEDIA_TYPE
+
+    def __init__(
+        self,
+        content: Any,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        media_type: str | None = None,
+        background: BackgroundTask | None = None,
+    ) -> None:
+        if media_type is None:
+            media_type = _response_media_type.get()
+        super().__init__(content, status_code, headers, media_type, background)
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type in MSGPACK_MEDIA_TYPES:
+            return packb(content)
+        return dump_json(content)
+
+
+def dump_json(content: Any) -> bytes:
+    """Encode JSON-compatible content as compact JSON.
+
+    JSON has no NaN or infinity, so those are rendered as ``null``.
+    """
+    try:
+        return _dump_json(content)
+    except ValueError:
+        return _dump_json(_finite(content))
+
+
+def _dump_json(content: Any) -> bytes:
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class _MsgPackRequest(Request):
+    """Request whose MessagePack body is exposed through ``json()``."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpackb(await self.body())
+        return self._json
+
+
+class NegotiatedRoute(APIRoute):
+    """API route that accepts and returns MessagePack as well as JSON.
+
+    Request bodies sent with a MessagePack ``Content-Type`` are decoded before
+    validation, and responses honour the ``Accept`` header. Error responses
+    raised through exception handlers stay JSON.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            if is_msgpack(request.headers.get("content-type")):
+                # FastAPI only parses bodies it recognises as JSON; present the
+                # decoded MessagePack payload through the same path.
+                scope = dict(request.scope)
+                scope["headers"] = [
+                    (name, value)
+                    for name, value in request.scope["headers"]
+                    if name != b"content-type"
+                ] + [(b"content-type", JSON_MEDIA_TYPE.encode())]
+                request = _MsgPackRequest(scope, request.receive)
+
+            media_type = negotiate(request.headers.get("accept"), RESPONSE_MEDIA_TYPES)
+            token = _response_media_type.set(media_type or JSON_MEDIA_TYPE)
+            try:
+                return await handler(request)
+            finally:
+                _response_media_type.reset(token)
+
+        return negotiated_handler
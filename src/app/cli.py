@@ -0,0 +1,303 @@
+"""Command-line entry point for operational tasks.
+
+Usage:
+    python -m app.cli import-items items.csv --parallelism 8
+    python -m app.cli recount-items
+    python -m app.cli explain-queries --snapshot tests/query_plans/sqlite.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from collections.abc import AsyncIterator, Sequence
+from pathlib import Path
+
+from app.core.config import get_settings, to_async_url
+from app.db.query_plans import (
+    DEFAULT_COST_TOLERANCE,
+    DEFAULT_ROWS,
+    PlanSnapshot,
+    capture,
+    compare_plans,
+)
+from app.services.importer import (
+    SUPPORTED_FORMATS,
+    ImportCheckpoint,
+    ImportFailed,
+    ImportFormatError,
+    ImportProgress,
+    ItemImporter,
+)
+
+# Source files are read in chunks of this many bytes.
+READ_CHUNK_SIZE = 1024 * 1024
+
+_FORMATS_BY_SUFFIX = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+async def _read_chunks(path: Path) -> AsyncIterator[bytes]:
+    """Read a file in chunks without blocking the event loop."""
+    with path.open("rb") as source:
+        while chunk := await asyncio.to_thread(source.read, READ_CHUNK_SIZE):
+            yield chunk
+
+
+def _load_checkpoint(path: Path, source: Path) -> ImportCheckpoint | None:
+    """Load the checkpoint of an interrupted import of ``source``, if any."""
+    if not path.exists():
+        return None
+    saved = json.loads(path.read_text())
+    if saved["source"] != str(source.resolve()):
+        raise ImportFormatError(
+            f"Checkpoint {path} belongs to {saved['source']}, not {source}"
+        )
+    return ImportCheckpoint.from_token(saved["checkpoint"])
+
+
+def _save_checkpoint(path: Path, source: Path, checkpoint: ImportCheckpoint) -> None:
+    """Atomically replace the checkpoint file."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(
+        json.dumps(
+            {"source": str(source.resolve()), "checkpoint": checkpoint.to_token()}
+        )
+    )
+    os.replace(tmp, path)
+
+
+def _print_progress(progress: ImportProgress) -> None:
+    rate = progress.rows / max(progress.elapsed, 1e-9)
+    print(
+        f"\r{progress.rows:,} rows read | {progress.imported:,} imported | "
+        f"{progress.rejected:,} rejected | {rate:,.0f} rows/s",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+async def import_items(args: argparse.Namespace) -> int:
+    """Run the ``import-items`` command.
+
+    Returns:
+        The process exit status.
+    """
+    from app.db.database import dispose_engine, get_session_factory
+    from app.services.change_feed import get_change_feed
+
+    source: Path = args.source
+    fmt = args.format or _FORMATS_BY_SUFFIX.get(source.suffix.lower())
+    if fmt is None:
+        print(f"Cannot infer the format of {source}; pass --format", file=sys.stderr)
+        return 2
+    checkpoint_path: Path = args.checkpoint or source.with_name(
+        source.name + ".checkpoint"
+    )
+
+    settings = get_settings()
+    if not settings.database_url:
+        print("Database not configured. Set DATABASE_URL.", file=sys.stderr)
+        return 2
+
+    def on_progress(progress: ImportProgress, checkpoint: ImportCheckpoint) -> None:
+        _save_checkpoint(checkpoint_path, source, checkpoint)
+        _print_progress(progress)
+
+    # Imported items are announced to change-feed subscribers on every replica.
+    feed = get_change_feed()
+    await feed.start()
+    try:
+        importer = ItemImporter(
+            get_session_factory(),
+            batch_size=args.batch_size or settings.import_batch_size,
+            parallelism=args.parallelism or settings.import_parallelism,
+            max_errors=settings.import_max_errors,
+            checkpoint=_load_checkpoint(checkpoint_path, source),
+            on_progress=on_progress,
+        )
+        progress = await importer.run(_read_chunks(source), fmt)
+        result = progress.to_result(importer.checkpoint, complete=True)
+    except ImportFormatError as exc:
+        print(f"\n{exc}", file=sys.stderr)
+        return 2
+    except ImportFailed as exc:
+        result = exc.progress.to_result(exc.checkpoint, complete=False)
+        print(
+            f"\nImport failed: {exc.__cause__}\nRe-run the same command to resume "
+            f"from {checkpoint_path}",
+            file=sys.stderr,
+        )
+    finally:
+        await feed.stop()
+        await dispose_engine()
+
+    print(file=sys.stderr)
+    print(result.model_dump_json(indent=2))
+    if result.complete:
+        checkpoint_path.unlink(missing_ok=True)
+        return 0
+    return 1
+
+
+async def recount_items(args: argparse.Namespace) -> int:
+    """Run the ``recount-items`` command.
+
+    Returns:
+        The process exit status.
+    """
+    from app.db import repository
+    from app.db.database import dispose_engine, get_session_factory
+
+    if not get_settings().database_url:
+        print("Database not configured. Set DATABASE_URL.", file=sys.stderr)
+        return 2
+    try:
+        async with get_session_factory()() as session:
+            total = await repository.recount_items(session)
+            await session.commit()
+    finally:
+        await dispose_engine()
+    print(total)
+    return 0
+
+
+async def explain_queries(args: argparse.Namespace) -> int:
+    """Run the ``explain-queries`` command.
+
+    Returns:
+        The process exit status.
+    """
+    scratch = None
+    if args.database_url:
+        url = to_async_url(args.database_url)
+    else:
+        fd, scratch = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.unlink(scratch)
+        url = f"sqlite+aiosqlite:///{scratch}"
+    try:
+        snapshot = await capture(url, args.rows)
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    finally:
+        if scratch is not None and os.path.exists(scratch):
+            os.unlink(scratch)
+
+    for name, plan in sorted(snapshot.plans.items()):
+        cost = "" if plan.cost is None else f" (cost {plan.cost:.1f})"
+        print(f"{name}{cost}")
+        for step in plan.steps:
+            print(f"    {step}")
+
+    if args.snapshot is None:
+        return 0
+    if args.update:
+        snapshot.save(args.snapshot)
+        print(f"Saved {args.snapshot}", file=sys.stderr)
+        return 0
+    problems = compare_plans(
+        PlanSnapshot.load(args.snapshot), snapshot, args.cost_tolerance
+    )
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser for all commands."""
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser(
+        "import-items",
+        help="Bulk-import items from a CSV or NDJSON file",
+        description=(
+            "Stream a CSV (name,description header) or NDJSON file into the "
+            "items table. Progress is checkpointed after every batch; re-running "
+            "an interrupted import resumes it."
+        ),
+    )
+    importer.add_argument("source", type=Path, help="CSV or NDJSON file")
+    importer.add_argument(
+        "--format",
+        choices=SUPPORTED_FORMATS,
+        help="Source format (default: inferred from the file extension)",
+    )
+    importer.add_argument(
+        "--batch-size",
+        type=int,
+        help="Rows per batch and transaction (default: IMPORT_BATCH_SIZE)",
+    )
+    importer.add_argument(
+        "--parallelism",
+        type=int,
+        help="Batches loaded concurrently (default: IMPORT_PARALLELISM)",
+    )
+    importer.add_argument(
+        "--checkpoint",
+        type=Path,
+        help="Checkpoint file (default: <source>.checkpoint)",
+    )
+    importer.set_defaults(handler=import_items)
+
+    recount = commands.add_parser(
+        "recount-items",
+        help="Reset the item counter to an exact count",
+        description=(
+            "Count the items table and reset the item counter behind "
+            "GET /api/v1/items/count, e.g. after rows were written around the "
+            "application. Blocks item inserts while counting on PostgreSQL."
+        ),
+    )
+    recount.set_defaults(handler=recount_items)
+
+    explain = commands.add_parser(
+        "explain-queries",
+        help="Capture and check the plans of the repository's queries",
+        description=(
+            "Migrate an empty scratch database, seed it with synthetic items "
+            "and EXPLAIN every query in app.db.repository.QUERIES. With "
+            "--snapshot, fail if a query lost an index or grew in estimated "
+            "cost against the saved plans; add --update to save them instead."
+        ),
+    )
+    explain.add_argument(
+        "--database-url",
+        help="Empty scratch database (default: a temporary SQLite file)",
+    )
+    explain.add_argument(
+        "--rows",
+        type=int,
+        default=DEFAULT_ROWS,
+        help=f"Synthetic items to seed (default: {DEFAULT_ROWS})",
+    )
+    explain.add_argument("--snapshot", type=Path, help="Saved plans to check against")
+    explain.add_argument(
+        "--update", action="store_true", help="Write the plans to --snapshot"
+    )
+    explain.add_argument(
+        "--cost-tolerance",
+        type=float,
+        default=DEFAULT_COST_TOLERANCE,
+        help=(
+            "Allowed growth factor of estimated costs "
+            f"(default: {DEFAULT_COST_TOLERANCE})"
+        ),
+    )
+    explain.set_defaults(handler=explain_queries)
+    return parser
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Parse arguments and run the selected command."""
+    args = build_parser().parse_args(argv)
+    exit_code: int = asyncio.run(args.handler(args))
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""Negotiated response compression middleware (zstd, brotli, gzip)."""
+
+import gzip
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.negotiation import negotiate
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None  # type: ignore[assignment]
+
+# Content types that are already compressed or must not be buffered.
+EXCLUDED_CONTENT_TYPES = (
+    "text/event-stream",
+    "image/",
+    "audio/",
+    "video/",
+    "application/gzip",
+    "application/zip",
+)
+
+# Bodies above this size are compressed in a worker thread so a large
+# payload does not stall the event loop.
+THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+# (path, content type, strong ETag, content coding)
+CacheKey = tuple[str, str, str, str]
+
+
+def available_encodings() -> list[str]:
+    """Return the supported content codings, most preferred first."""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+class CompressedBodyCache:
+    """Bounded LRU of compressed bodies keyed by strong ETag and coding.
+
+    A strong ETag together with the content type identifies the exact bytes of
+    a representation, so the compressed form can be reused for every response
+    carrying them.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, bytes] = OrderedDict()
+
+    def get(self, key: CacheKey) -> bytes | None:
+        """Return a cached compressed body and mark it recently used."""
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: CacheKey, body: bytes) -> None:
+        """Store a compressed body, evicting the least recently used entry."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CompressionMiddleware:
+    """Compress responses using the best coding the client accepts.
+
+    Only complete, single-message bodies of at least ``minimum_size`` bytes are
+    compressed; streamed responses, excluded paths and already-encoded
+    responses pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        exclude_paths: Sequence[str] = (),
+        cache_size: int = 256,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.exclude_paths = frozenset(exclude_paths)
+        self.cache = CompressedBodyCache(cache_size)
+        self.encodings = available_encodings()
+        self._compressors: dict[str, Callable[[bytes], bytes]] = {
+            "gzip": lambda body: gzip.compress(body, gzip_level, mtime=0),
+        }
+        if brotli is not None:
+            self._compressors["br"] = lambda body: brotli.compress(
+                body, quality=brotli_quality
+            )
+        if zstandard is not None:
+            self._compressors["zstd"] = lambda body: zstandard.ZstdCompressor(
+                level=zstd_level
+            ).compress(body)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(
+            Headers(scope=scope).get("accept-encoding"), self.encodings
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Hold the headers until the body shows whether to compress.
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await self._compress(
+                (scope["path"], headers.get("content-type", "")),
+                headers.get("etag"),
+                encoding,
+                body,
+            )
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The encoded bytes differ from the identity representation.
+                headers["ETag"] = f"W/{etag}"
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    async def _compress(
+        self,
+        resource: tuple[str, str],
+        etag: str | None,
+        encoding: str,
+        body: bytes,
+    ) -> bytes:
+        """Compress ``body``, reusing a cached result for strong ETags."""
+        key: CacheKey | None = None
+        if etag and not etag.startswith("W/"):
+            key = (*resource, etag, encoding)
+        if key is not None and (cached := self.cache.get(key)) is not None:
+            return cached
+
+        compressor = self._compressors[encoding]
+        if len(body) >= THREAD_MINIMUM_SIZE:
+            compressed = await anyio.to_thread.run_sync(compressor, body)
+        else:
+            compressed = compressor(body)
+
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
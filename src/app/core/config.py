@@ -18,15 +18,102 @@ class Settings(BaseSettings):
     environment: str = "development"
     log_level: str = "INFO"
 
+    # Graceful shutdown: keep serving with readiness failing for the delay,
+    # then wait up to the timeout for in-flight requests. The container passes
+    # the timeout to uvicorn's --timeout-graceful-shutdown, in whole seconds.
+    shutdown_drain_delay_seconds: float = 0.0
+    shutdown_drain_timeout_seconds: float = 25.0
+
+    # HTTP metrics: request duration histogram buckets, and the fraction of
+    # requests whose request/response sizes are observed
+    http_metrics_buckets: list[float] = [
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1.0,
+        2.5,
+        5.0,
+        10.0,
+    ]
+    http_metrics_size_sample_rate: float = 1.0
+
+    # Interval of the event loop lag probe (event_loop_lag_seconds)
+    event_loop_lag_interval_seconds: float = 0.5
+
     # Database
     database_url: str = ""
+    # Compiled SQL cache entries per engine (SQLAlchemy's query_cache_size)
+    database_query_cache_size: int = 500
+    # asyncpg prepared statements cached per connection; set to 0 behind
+    # PgBouncer in transaction mode, which cannot share prepared statements
+    database_prepared_statement_cache_size: int = 100
+    # Optional item shards (JSON list of URLs). Items are spread over these by
+    # a hash of their ID; DATABASE_URL keeps every other table
+    database_shard_urls: list[str] = []
+    # alembic.ini naming the migration scripts run at startup, as for the
+    # alembic command; defaults to the one next to src/
+    alembic_config: str = ""
+
+    # Bulk item import (CLI and POST /api/v1/items/import)
+    import_batch_size: int = 5000
+    import_parallelism: int = 4
+    import_max_errors: int = 100
+
+    # Idempotency-Key support on POST endpoints: "memory" (per replica) or
+    # "database" (shared through the idempotency_keys table)
+    idempotency_store: str = "memory"
+    idempotency_ttl_seconds: float = 86400.0
+    # Unfinished database reservations expire after this unless renewed
+    idempotency_lease_seconds: float = 30.0
+    idempotency_max_entries: int = 10000
+
+    # Item change feed (SSE)
+    change_feed_transport: str = "memory"  # "memory" or "postgres"
+    change_feed_channel: str = "item_changes"
+    change_feed_buffer_size: int = 256
+    change_feed_heartbeat_seconds: float = 15.0
+    change_feed_replay_page_size: int = 500
+    # Item IDs are assigned at flush time on each replica's clock, so items
+    # can commit out of ID order; resuming replays this far back
+    change_feed_overlap_seconds: float = 5.0
+    change_feed_reconnect_max_seconds: float = 30.0
+
+    # Streaming calculator WebSocket
+    calculate_ws_max_in_flight: int = 256
+    calculate_ws_max_batch: int = 100
+
+    # Streaming aggregation (POST /api/v1/calculate/aggregate): t-digest
+    # compression, i.e. about how many centroids the quantile sketch keeps
+    calculate_aggregate_compression: float = 100.0
+
+    # Response compression
+    compression_minimum_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    compression_cache_size: int = 256
+    compression_exclude_paths: list[str] = ["/health", "/api/v1/calculate"]
 
     @property
     def async_database_url(self) -> str:
         """Convert database URL to async format."""
-        if self.database_url.startswith("postgresql://"):
-            return self.database_url.replace("postgresql://", "postgresql+asyncpg://")
-        return self.database_url
+        return to_async_url(self.database_url)
+
+    @property
+    def async_database_shard_urls(self) -> list[str]:
+        """Convert the item shard URLs to async format."""
+        return [to_async_url(url) for url in self.database_shard_urls]
+
+
+def to_async_url(url: str) -> str:
+    """Select the asyncpg driver for a plain ``postgresql://`` URL."""
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://")
+    return url
 
 
 @lru_cache
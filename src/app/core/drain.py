@@ -0,0 +1,245 @@
+"""Graceful draining for shutdowns and rolling deploys.
+
+Draining happens in two steps. First readiness fails while requests are still
+served, so load balancers can take the replica out of rotation. Then new work
+is refused, and shutdown waits for in-flight requests up to a deadline.
+"""
+
+import asyncio
+import json
+import logging
+import signal
+import threading
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from functools import lru_cache
+from types import FrameType
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code for "service restart": clients should reconnect.
+WS_SERVICE_RESTART = 1012
+
+
+class DrainState:
+    """Tracks in-flight work and the drain phase of this process."""
+
+    def __init__(self) -> None:
+        self.draining = False
+        self.accepting = True
+        self.in_flight = 0
+        self.streams = 0
+        self.aborted = 0
+        self.started_at: float | None = None
+        self.refused_at: float | None = None
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def reset(self) -> None:
+        """Return to normal service, e.g. when the application starts."""
+        self.draining = False
+        self.accepting = True
+        self.aborted = 0
+        self.started_at = None
+        self.refused_at = None
+
+    def begin(self) -> None:
+        """Start draining: readiness fails but requests are still served."""
+        if not self.draining:
+            self.draining = True
+            self.started_at = time.perf_counter()
+
+    def stop_accepting(self) -> None:
+        """Refuse new requests from now on."""
+        self.begin()
+        if self.accepting:
+            self.accepting = False
+            self.refused_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since draining began, or 0 when not draining."""
+        if self.started_at is None:
+            return 0.0
+        return time.perf_counter() - self.started_at
+
+    @property
+    def refusing_for(self) -> float:
+        """Seconds since new requests started being refused, or 0."""
+        if self.refused_at is None:
+            return 0.0
+        return time.perf_counter() - self.refused_at
+
+    @property
+    def requests_in_flight(self) -> int:
+        """In-flight requests other than long-lived streams."""
+        return self.in_flight - self.streams
+
+    def request_started(self, streaming: bool = False) -> None:
+        self.in_flight += 1
+        if streaming:
+            self.streams += 1
+        self._idle.clear()
+
+    def request_finished(self, streaming: bool = False) -> None:
+        self.in_flight -= 1
+        if streaming:
+            self.streams -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> int:
+        """Wait for in-flight requests to finish.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+
+        Returns:
+            The number of requests still in flight when the wait ended.
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except TimeoutError:
+            pass
+        return self.in_flight
+
+
+class DrainMiddleware:
+    """Count in-flight requests and refuse new ones once draining.
+
+    Requests to ``exempt_paths`` (probes, metrics) are neither counted nor
+    refused. WebSockets and requests to ``streaming_paths`` (event streams)
+    are counted in ``DrainState.streams`` as well, since they stay open for
+    as long as the client likes and say nothing about load.
+
+    Refused HTTP requests get ``503`` with ``Retry-After`` and
+    ``Connection: close``. Refused WebSockets are closed with code 1012.
+    Requests cancelled by the server during a drain are counted in
+    ``DrainState.aborted``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        state: DrainState,
+        exempt_paths: Sequence[str] = (),
+        streaming_paths: Sequence[str] = (),
+        retry_after: int = 1,
+    ) -> None:
+        self.app = app
+        self.state = state
+        self.exempt_paths = frozenset(exempt_paths)
+        self.streaming_paths = frozenset(streaming_paths)
+        self.retry_after = retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        if not self.state.accepting:
+            await self._refuse(scope, send)
+            return
+
+        streaming = (
+            scope["type"] == "websocket" or scope["path"] in self.streaming_paths
+        )
+        self.state.request_started(streaming)
+        try:
+            await self.app(scope, receive, send)
+        except asyncio.CancelledError:
+            if self.state.draining:
+                self.state.aborted += 1
+            raise
+        finally:
+            self.state.request_finished(streaming)
+
+    async def _refuse(self, scope: Scope, send: Send) -> None:
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": WS_SERVICE_RESTART})
+            return
+        body = json.dumps({"detail": "Server is shutting down"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+def install_drain_signal_handler(
+    state: DrainState,
+    on_drain: Callable[[], Awaitable[None]],
+    delay: float,
+) -> Callable[[], None]:
+    """Start draining on ``SIGTERM`` before handing the signal to the server.
+
+    Readiness fails at once; after ``delay`` seconds new work is refused,
+    ``on_drain`` runs and the server's own handler starts its shutdown.
+
+    Args:
+        state: Drain state to update.
+        on_drain: Coroutine function ending long-lived work (such as streams)
+            that would otherwise hold the server's graceful shutdown open.
+        delay: Seconds to keep serving while load balancers catch up.
+
+    Returns:
+        A callable restoring the previous handler. Nothing is installed
+        outside the main thread or when no server handler is set.
+    """
+    previous = signal.getsignal(signal.SIGTERM)
+    if threading.current_thread() is not threading.main_thread() or not callable(
+        previous
+    ):
+        return lambda: None
+
+    loop = asyncio.get_running_loop()
+    tasks: set[asyncio.Task[None]] = set()
+
+    async def drain(sig: int, frame: FrameType | None) -> None:
+        await asyncio.sleep(delay)
+        state.stop_accepting()
+        try:
+            await on_drain()
+        finally:
+            previous(sig, frame)
+
+    def schedule(sig: int, frame: FrameType | None) -> None:
+        task = loop.create_task(drain(sig, frame))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def handle_sigterm(sig: int, frame: FrameType | None) -> Any:
+        if state.draining:
+            # A second signal skips the drain delay.
+            previous(sig, frame)
+            return
+        logger.info("SIGTERM received, draining for %.1fs", delay)
+        state.begin()
+        loop.call_soon_threadsafe(schedule, sig, frame)
+
+    def restore() -> None:
+        signal.signal(signal.SIGTERM, previous)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    return restore
+
+
+@lru_cache
+def get_drain_state() -> DrainState:
+    """Get the process-wide drain state."""
+    return DrainState()
@@ -0,0 +1,42 @@
+"""Entity tag helpers for conditional GET requests."""
+
+import hashlib
+
+
+def make_etag(*parts: object) -> str:
+    """Build a strong entity tag from the given version components.
+
+    Args:
+        parts: Values that together identify one version of a representation.
+
+    Returns:
+        A quoted strong ETag suitable for the ``ETag`` response header.
+    """
+    digest = hashlib.blake2b(
+        "\x1f".join(str(part) for part in parts).encode(), digest_size=16
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an ``If-None-Match`` header against the current ETag.
+
+    ``If-None-Match`` uses the weak comparison function (RFC 9110, 13.1.2),
+    so a ``W/`` prefix on either side is ignored.
+
+    Args:
+        if_none_match: Raw ``If-None-Match`` request header, if any.
+        etag: The current ETag of the representation.
+
+    Returns:
+        True if the client already holds the current representation.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == current
+        for candidate in if_none_match.split(",")
+    )
@@ -0,0 +1,39 @@
+"""Event loop lag probe.
+
+A task sleeps for a fixed interval and records how late it wakes up. Blocking
+calls and CPU-heavy handlers delay every coroutine on the loop, and show up
+here before they show up in CPU utilisation of an I/O-bound service.
+"""
+
+import asyncio
+import contextlib
+
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS
+
+
+class EventLoopLagMonitor:
+    """Periodically measures event loop scheduling delay."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Start probing on the running loop."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop probing."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            EVENT_LOOP_LAG_SECONDS.set(max(0.0, loop.time() - expected))
@@ -0,0 +1,44 @@
+"""Application-specific Prometheus metrics."""
+
+from prometheus_client import Gauge, Histogram
+
+DB_CONNECTION_HOLD_SECONDS = Histogram(
+    "db_connection_hold_seconds",
+    "Time a pooled database connection is checked out, by method and route.",
+    ["method", "route"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# Saturation signals for autoscaling. Unlabelled so each pod exports exactly
+# one series per metric and adapter queries stay stable.
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Requests currently being handled, excluding probes, metrics, event "
+    "streams and WebSockets.",
+)
+
+HTTP_STREAMS_OPEN = Gauge(
+    "http_streams_open",
+    "Open Server-Sent Events streams and WebSocket sessions.",
+)
+
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection.",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+DB_POOL_WAITING = Gauge(
+    "db_pool_waiting",
+    "Checkouts currently queued for a pooled database connection.",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Pooled database connections currently checked out.",
+)
+
+EVENT_LOOP_LAG_SECONDS = Gauge(
+    "event_loop_lag_seconds",
+    "Delay of the last event loop lag probe past its scheduled time.",
+)
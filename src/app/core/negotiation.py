@@ -0,0 +1,66 @@
+"""HTTP content negotiation helpers for ``Accept``-style headers."""
+
+from collections.abc import Sequence
+
+
+def parse_quality_list(header: str) -> list[tuple[str, float]]:
+    """Parse a comma-separated header with optional ``q`` weights.
+
+    Args:
+        header: Raw header value, e.g. ``"gzip;q=0.8, br"``.
+
+    Returns:
+        ``(token, quality)`` pairs in header order, tokens lower-cased.
+    """
+    parsed: list[tuple[str, float]] = []
+    for element in header.split(","):
+        token, *params = element.split(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        parsed.append((token, quality))
+    return parsed
+
+
+def _matches(pattern: str, offer: str) -> bool:
+    if pattern in ("*", "*/*") or pattern == offer:
+        return True
+    if pattern.endswith("/*"):
+        return offer.split("/", 1)[0] == pattern[:-2]
+    return False
+
+
+def negotiate(header: str | None, offers: Sequence[str]) -> str | None:
+    """Pick the best offer for an ``Accept``-style header.
+
+    Exact tokens take precedence over wildcards when computing an offer's
+    quality, and ties are broken by the order of ``offers``.
+
+    Args:
+        header: Raw request header value, or None if absent.
+        offers: Tokens the server can produce, most preferred first.
+
+    Returns:
+        The chosen offer, or None if the header is absent or accepts none.
+    """
+    if not header:
+        return None
+    preferences = parse_quality_list(header)
+    best: str | None = None
+    best_quality = 0.0
+    for offer in offers:
+        exact = [q for token, q in preferences if token == offer]
+        wildcard = [q for token, q in preferences if _matches(token, offer)]
+        candidates = exact or wildcard
+        quality = max(candidates) if candidates else 0.0
+        if quality > best_quality:
+            best, best_quality = offer, quality
+    return best
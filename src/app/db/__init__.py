@@ -1,5 +1,11 @@
 """Database module."""
 
-from app.db.database import get_db, init_db
+from app.db.database import (
+    dispose_engine,
+    get_db,
+    get_read_db,
+    get_session_factory,
+    init_db,
+)
 
-__all__ = ["get_db", "init_db"]
+__all__ = ["dispose_engine", "get_db", "get_read_db", "get_session_factory", "init_db"]
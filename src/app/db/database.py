@@ -1,16 +1,38 @@
 """Database connection and session management."""
 
-from collections.abc import AsyncGenerator
+import hashlib
+import time
+import uuid
+from collections.abc import AsyncGenerator, AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
 
+from alembic.command import stamp, upgrade
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from fastapi import Request
+from sqlalchemy import Connection, event
+from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import DeclarativeBase, Mapper, ORMExecuteState
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from app.core.config import get_settings
+from app.core.metrics import (
+    DB_CONNECTION_HOLD_SECONDS,
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_WAIT_SECONDS,
+    DB_POOL_WAITING,
+)
+from app.db.types import uuid7
 
 
 class Base(DeclarativeBase):
@@ -19,9 +41,211 @@ class Base(DeclarativeBase):
     pass
 
 
+class ReadOnlySession(AsyncSession):
+    """Session for pure reads that hands its connection back after each query.
+
+    ``execute`` results are fully buffered, so the connection is returned to
+    the pool as soon as the rows are fetched instead of being held while the
+    response is serialized. Nothing is ever committed.
+    """
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Result[Any]:
+        try:
+            result: Result[Any] = await super().execute(*args, **kwargs)
+        finally:
+            await self.close()
+        return result
+
+    async def flush(self, *args: Any, **kwargs: Any) -> None:
+        raise RuntimeError("ReadOnlySession does not support writes")
+
+
+# Method and route template of the request that is currently using the
+# database.
+_current_route: ContextVar[tuple[str, str]] = ContextVar(
+    "current_route", default=("unknown", "unknown")
+)
+
+
+def _set_current_route(request: Request) -> None:
+    """Label connections checked out for this request with its method and route.
+
+    The method keeps reads and writes on one path (``GET`` and ``POST
+    /api/v1/items``) apart, as ``HttpMetricsMiddleware`` does.
+    """
+    route = request.scope.get("route")
+    # Each request runs in its own context, so the value never leaks across
+    # requests and does not need to be reset.
+    _current_route.set((request.method, getattr(route, "path", "unknown")))
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long and how many checkouts wait.
+
+    Pool events only fire once a connection has been handed out, so the wait
+    is measured around the pool's own checkout.
+    """
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        DB_POOL_WAITING.inc()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAITING.dec()
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Record connection hold time per method and route, and checked-out connections."""
+
+    @event.listens_for(engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection: Any, record: Any, proxy: Any) -> None:
+        record.info["checkout_at"] = time.perf_counter()
+        record.info["route"] = _current_route.get()
+        DB_POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection: Any, record: Any) -> None:
+        checkout_at = record.info.pop("checkout_at", None)
+        if checkout_at is not None:
+            DB_POOL_CHECKED_OUT.dec()
+            method, route = record.info.pop("route", ("unknown", "unknown"))
+            DB_CONNECTION_HOLD_SECONDS.labels(method=method, route=route).observe(
+                time.perf_counter() - checkout_at
+            )
+
+
+# Shard holding every table that is not sharded.
+PRIMARY_SHARD = "primary"
+# Session.info key under which sharded sessions expose their router.
+ITEM_SHARDS_KEY = "item_shards"
+# Tables spread over the item shards; every other table is on the primary.
+_ITEM_TABLES = frozenset(("items", "item_counts"))
+# Bound parameter through which repository statements look up one item.
+_ITEM_ID_PARAM = "item_id"
+
+
+class ItemShardRouter:
+    """Routes items to shards by a stable hash of their ID.
+
+    Each shard also keeps a counter of its own items; every other table
+    lives on the primary database. Statements on items go to the owning
+    shard when they bind ``item_id``, and to all shards otherwise; callers
+    merge the per-shard rows.
+
+    Args:
+        shard_ids: Names of the item shards, in configuration order. The
+            order is part of the routing: reordering shards moves items.
+    """
+
+    def __init__(self, shard_ids: Sequence[str]) -> None:
+        if not shard_ids:
+            raise ValueError("At least one item shard is required")
+        self.shard_ids = list(shard_ids)
+
+    def shard_for(self, item_id: uuid.UUID) -> str:
+        """Return the shard owning ``item_id``."""
+        digest = hashlib.blake2b(item_id.bytes, digest_size=8).digest()
+        return self.shard_ids[int.from_bytes(digest) % len(self.shard_ids)]
+
+    def shard_chooser(
+        self, mapper: Mapper[Any] | None, instance: Any, clause: Any = None, **kw: Any
+    ) -> str:
+        """Choose the shard an instance is flushed to."""
+        if not _is_item(mapper):
+            return PRIMARY_SHARD
+        if instance is None:
+            raise ValueError("Cannot choose an item shard without an item")
+        if instance.id is None:
+            # The column default would only run during the INSERT, after the
+            # shard has been chosen.
+            instance.id = uuid7()
+        return self.shard_for(instance.id)
+
+    def identity_chooser(
+        self, mapper: Mapper[Any], primary_key: Sequence[Any], **kw: Any
+    ) -> list[str]:
+        """Choose the shards to search for an identity (``Session.get``)."""
+        if _is_item(mapper):
+            return [self.shard_for(primary_key[0])]
+        return [PRIMARY_SHARD]
+
+    def execute_chooser(self, orm_context: ORMExecuteState) -> list[str]:
+        """Choose the shards a statement runs on."""
+        if not any(_is_item(mapper) for mapper in orm_context.all_mappers):
+            return [PRIMARY_SHARD]
+        parameters = orm_context.parameters
+        if isinstance(parameters, dict) and _ITEM_ID_PARAM in parameters:
+            return [self.shard_for(parameters[_ITEM_ID_PARAM])]
+        return list(self.shard_ids)
+
+
+def _is_item(mapper: Mapper[Any] | None) -> bool:
+    return mapper is not None and mapper.class_.__tablename__ in _ITEM_TABLES
+
+
+def sharding_options(
+    primary: AsyncEngine, shards: dict[str, AsyncEngine]
+) -> dict[str, Any]:
+    """Build ``async_sessionmaker`` arguments routing items over ``shards``.
+
+    Args:
+        primary: Engine for every table that is not sharded.
+        shards: Item shard engines by shard name.
+
+    Returns:
+        Keyword arguments for ``async_sessionmaker``.
+    """
+    router = ItemShardRouter(list(shards))
+    return {
+        "sync_session_class": ShardedSession,
+        "shards": {
+            PRIMARY_SHARD: primary.sync_engine,
+            **{name: engine.sync_engine for name, engine in shards.items()},
+        },
+        "shard_chooser": router.shard_chooser,
+        "identity_chooser": router.identity_chooser,
+        "execute_chooser": router.execute_chooser,
+        "info": {ITEM_SHARDS_KEY: router},
+    }
+
+
+def item_shard_router(session: AsyncSession) -> ItemShardRouter | None:
+    """Return the router of a sharded session, or None if not sharded."""
+    router: ItemShardRouter | None = session.info.get(ITEM_SHARDS_KEY)
+    return router
+
+
 # Create async engine (lazy initialization)
 _engine: AsyncEngine | None = None
+_shard_engines: dict[str, AsyncEngine] = {}
 _async_session_factory: async_sessionmaker[AsyncSession] | None = None
+_read_session_factory: async_sessionmaker[ReadOnlySession] | None = None
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    """Create an instrumented engine with the configured caches and pool."""
+    settings = get_settings()
+    connect_args: dict[str, Any] = {}
+    engine_args: dict[str, Any] = {}
+    if url.startswith("postgresql+asyncpg://"):
+        connect_args["prepared_statement_cache_size"] = (
+            settings.database_prepared_statement_cache_size
+        )
+    if not url.startswith("sqlite"):
+        # SQLite picks its own pool (StaticPool for in-memory databases).
+        engine_args["poolclass"] = TimedQueuePool
+    engine = create_async_engine(
+        url,
+        echo=settings.environment == "development",
+        pool_pre_ping=True,
+        query_cache_size=settings.database_query_cache_size,
+        connect_args=connect_args,
+        **engine_args,
+    )
+    instrument_engine(engine)
+    return engine
 
 
 def _get_engine() -> AsyncEngine | None:
@@ -30,14 +254,24 @@ def _get_engine() -> AsyncEngine | None:
     if _engine is None:
         settings = get_settings()
         if settings.database_url:
-            _engine = create_async_engine(
-                settings.async_database_url,
-                echo=settings.environment == "development",
-                pool_pre_ping=True,
-            )
+            _engine = _create_engine(settings.async_database_url)
     return _engine
 
 
+def _get_shard_engines() -> dict[str, AsyncEngine]:
+    """Get or create the item shard engines; empty when items are not sharded."""
+    if not _shard_engines:
+        for index, url in enumerate(get_settings().async_database_shard_urls):
+            _shard_engines[f"shard{index}"] = _create_engine(url)
+    return _shard_engines
+
+
+def _session_options(engine: AsyncEngine) -> dict[str, Any]:
+    """Extra session factory arguments, routing items when shards are set."""
+    shards = _get_shard_engines()
+    return sharding_options(engine, shards) if shards else {}
+
+
 def _get_session_factory() -> async_sessionmaker[AsyncSession] | None:
     """Get or create the session factory."""
     global _async_session_factory
@@ -48,11 +282,28 @@ def _get_session_factory() -> async_sessionmaker[AsyncSession] | None:
                 engine,
                 class_=AsyncSession,
                 expire_on_commit=False,
+                **_session_options(engine),
             )
     return _async_session_factory
 
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+def _get_read_session_factory() -> async_sessionmaker[ReadOnlySession] | None:
+    """Get or create the read-only session factory."""
+    global _read_session_factory
+    if _read_session_factory is None:
+        engine = _get_engine()
+        if engine:
+            _read_session_factory = async_sessionmaker(
+                engine,
+                class_=ReadOnlySession,
+                expire_on_commit=False,
+                autoflush=False,
+                **_session_options(engine),
+            )
+    return _read_session_factory
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """Dependency to get database session."""
     session_factory = _get_session_factory()
     if session_factory is None:
@@ -60,6 +311,7 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             "Database not configured. Set DATABASE_URL environment variable."
         )
 
+    _set_current_route(request)
     async with session_factory() as session:
         try:
             yield session
@@ -69,9 +321,120 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Dependency to get a read-only database session.
+
+    A connection is only checked out when the first query runs and is
+    released right after it; there is no commit.
+    """
+    session_factory = _get_read_session_factory()
+    if session_factory is None:
+        raise RuntimeError(
+            "Database not configured. Set DATABASE_URL environment variable."
+        )
+
+    _set_current_route(request)
+    async with session_factory() as session:
+        yield session
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """Dependency to get the session factory, for work spanning transactions."""
+    session_factory = _get_session_factory()
+    if session_factory is None:
+        raise RuntimeError(
+            "Database not configured. Set DATABASE_URL environment variable."
+        )
+    return session_factory
+
+
+@asynccontextmanager
+async def read_session() -> AsyncIterator[AsyncSession]:
+    """Open a read-only session outside of a request."""
+    session_factory = _get_read_session_factory()
+    if session_factory is None:
+        raise RuntimeError(
+            "Database not configured. Set DATABASE_URL environment variable."
+        )
+
+    async with session_factory() as session:
+        yield session
+
+
+async def dispose_engine() -> None:
+    """Close every pooled connection and forget the engines."""
+    global _engine, _async_session_factory, _read_session_factory
+    if _engine is not None:
+        await _engine.dispose()
+    for shard_engine in _shard_engines.values():
+        await shard_engine.dispose()
+    _engine = None
+    _shard_engines.clear()
+    _async_session_factory = None
+    _read_session_factory = None
+
+
+# alembic.ini next to src/, in a checkout and in the image.
+_DEFAULT_ALEMBIC_INI = Path(__file__).resolve().parents[3] / "alembic.ini"
+
+
+def alembic_script_location() -> str:
+    """Locate the migration scripts through ``alembic.ini``.
+
+    The file is ``ALEMBIC_CONFIG`` if set, else the one next to ``src/``; a
+    relative ``script_location`` in it is resolved against its directory.
+
+    Raises:
+        FileNotFoundError: If there is no such file.
+    """
+    path = Path(get_settings().alembic_config or _DEFAULT_ALEMBIC_INI)
+    if not path.is_file():
+        raise FileNotFoundError(
+            f"No Alembic configuration at {path}; set ALEMBIC_CONFIG"
+        )
+    location = Config(str(path)).get_main_option("script_location", "alembic")
+    return str(path.resolve().parent / location)
+
+
+def alembic_config(connection: Connection, item_shard: bool = False) -> Config:
+    """Build an Alembic configuration that migrates ``connection``.
+
+    Args:
+        connection: Open connection; migrations run in its transaction.
+        item_shard: Whether the database is an item shard, where revisions
+            of tables that only live on the primary database are skipped.
+    """
+    config = Config()
+    config.set_main_option("script_location", alembic_script_location())
+    config.attributes["connection"] = connection
+    config.attributes["item_shard"] = item_shard
+    return config
+
+
+def _prepare_item_shard(connection: Connection) -> None:
+    """Create the item tables of a new shard, or migrate an existing one."""
+    config = alembic_config(connection, item_shard=True)
+    if MigrationContext.configure(connection).get_current_revision() is None:
+        Base.metadata.create_all(
+            connection,
+            tables=[Base.metadata.tables[name] for name in sorted(_ITEM_TABLES)],
+        )
+        stamp(config, "head")
+    else:
+        upgrade(config, "head")
+
+
 async def init_db() -> None:
-    """Initialize database tables."""
+    """Initialize database tables on the primary database and every shard.
+
+    Shards only get the item tables. A new shard is created from the models
+    and stamped with the current Alembic revision; an existing one is
+    migrated to it, so shards follow the same revisions as the primary.
+    """
     engine = _get_engine()
     if engine:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+        for shard in _get_shard_engines().values():
+            async with shard.begin() as conn:
+                await conn.run_sync(_prepare_item_shard)
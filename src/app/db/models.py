@@ -1,11 +1,27 @@
 """SQLAlchemy ORM models."""
 
 import uuid
+from datetime import UTC, datetime
+from typing import Any
 
-from sqlalchemy import String, Text
+from sqlalchemy import (
+    BigInteger,
+    Connection,
+    DateTime,
+    Integer,
+    String,
+    Table,
+    Text,
+    event,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.database import Base
+from app.db.types import BinaryUUID, uuid7
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
 
 
 class Item(Base):
@@ -13,13 +29,69 @@ class Item(Base):
 
     __tablename__ = "items"
 
-    id: Mapped[str] = mapped_column(
-        String(36),
+    id: Mapped[uuid.UUID] = mapped_column(
+        BinaryUUID,
         primary_key=True,
-        default=lambda: str(uuid.uuid4()),
+        default=uuid7,
     )
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     description: Mapped[str] = mapped_column(Text, nullable=False)
+    # Bumped by SQLAlchemy on every UPDATE; used to derive ETags.
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=_utcnow,
+        onupdate=_utcnow,
+    )
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __repr__(self) -> str:
         return f"Item(id={self.id!r}, name={self.name!r})"
+
+
+# Rows of the item counter. Inserts add to a random slot, so concurrent
+# transactions rarely wait on each other's row lock.
+ITEM_COUNT_SLOTS = 16
+
+
+class ItemCount(Base):
+    """One slot of the item counter; the item count is the sum of all slots.
+
+    Kept next to the items it counts (on every shard when sharded) and
+    updated in the same transaction as each insert. The sum of ``revision``
+    is the collection version the item list ETag is built from: every write
+    to the items table bumps it.
+    """
+
+    __tablename__ = "item_counts"
+
+    slot: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    revision: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+
+@event.listens_for(ItemCount.__table__, "after_create")
+def _create_item_count_slots(target: Table, connection: Connection, **kw: Any) -> None:
+    """Fill a new counter table with zeroed slots."""
+    connection.execute(
+        target.insert(),
+        [{"slot": slot, "count": 0} for slot in range(ITEM_COUNT_SLOTS)],
+    )
+
+
+class IdempotencyKey(Base):
+    """Reserved idempotency key and, once the request finished, its response."""
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # SHA-256 of the request the key was first used with.
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Null while the first attempt is in progress.
+    status_code: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    response: Mapped[str | None] = mapped_column(Text, nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, index=True
+    )
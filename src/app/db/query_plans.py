@@ -0,0 +1,354 @@
+"""Query-plan capture and regression checks for the repository's queries.
+
+Builds the schema from the Alembic migrations on a scratch database, seeds it
+with synthetic items, and runs ``EXPLAIN`` on every statement registered in
+``repository.QUERIES``: ``EXPLAIN QUERY PLAN`` on SQLite and
+``EXPLAIN (FORMAT JSON)`` on PostgreSQL. Plans are reduced to the tables read
+by a full scan, the indexes used and, on PostgreSQL, the planner's estimated
+total cost, and compared with a saved snapshot, so a migration that drops an
+index or a query change that defeats one is reported instead of shipped.
+"""
+
+import json
+import re
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+from alembic.command import upgrade
+from sqlalchemy import ClauseElement, Executable, Select, insert, inspect, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+
+from app.db.database import alembic_config
+from app.db.models import Item, ItemCount
+from app.db.repository import QUERIES
+from app.db.types import uuid7
+
+# Rows seeded by default; enough for PostgreSQL to prefer indexes where they
+# help.
+DEFAULT_ROWS = 100_000
+# Estimated costs may grow by this factor before a check fails.
+DEFAULT_COST_TOLERANCE = 1.5
+# Page size bound to ``limit`` when explaining paginated queries.
+SAMPLE_PAGE_SIZE = 100
+
+_SEED_BATCH_SIZE = 10_000
+# EXPLAIN QUERY PLAN details of table accesses, e.g. "SCAN items",
+# "SEARCH items USING INDEX sqlite_autoindex_items_1 (id=?)".
+_SQLITE_ACCESS = re.compile(
+    r"^(?P<op>SCAN|SEARCH) (?:TABLE )?(?P<table>\w+)"
+    r"(?: USING (?:(?:COVERING )?INDEX (?P<index>\S+)|(?P<rowid>INTEGER PRIMARY KEY)))?"
+)
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN`` of a statement, in the connection's dialect."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    prefix = (
+        "EXPLAIN (FORMAT JSON) "
+        if compiler.dialect.name == "postgresql"
+        else "EXPLAIN QUERY PLAN "
+    )
+    explained = compiler.process(element.statement, **kw)
+    # The rows are the plan, not the statement's columns: drop the statement's
+    # result map so its type processors are not applied to them.
+    compiler._result_columns = []
+    return prefix + explained
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """The parts of one query's plan that regressions show up in.
+
+    Attributes:
+        steps: Plan nodes, outermost first, indented by depth.
+        cost: Estimated total cost, or None where the planner reports none
+            (SQLite).
+        seq_scans: Tables read by a full scan.
+        indexes: Indexes the plan reads.
+    """
+
+    steps: tuple[str, ...]
+    cost: float | None = None
+    seq_scans: frozenset[str] = frozenset()
+    indexes: frozenset[str] = frozenset()
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize for a snapshot file."""
+        return {
+            "steps": list(self.steps),
+            "cost": self.cost,
+            "seq_scans": sorted(self.seq_scans),
+            "indexes": sorted(self.indexes),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "QueryPlan":
+        """Load a plan written by ``to_dict``."""
+        return cls(
+            steps=tuple(data["steps"]),
+            cost=data["cost"],
+            seq_scans=frozenset(data["seq_scans"]),
+            indexes=frozenset(data["indexes"]),
+        )
+
+
+@dataclass
+class PlanSnapshot:
+    """The plans of every registered query on one dialect and dataset size."""
+
+    dialect: str
+    rows: int
+    plans: dict[str, QueryPlan] = field(default_factory=dict)
+
+    def to_json(self) -> str:
+        """Serialize with stable ordering, for reviewable diffs."""
+        return (
+            json.dumps(
+                {
+                    "dialect": self.dialect,
+                    "rows": self.rows,
+                    "plans": {
+                        name: plan.to_dict()
+                        for name, plan in sorted(self.plans.items())
+                    },
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+
+    @classmethod
+    def from_json(cls, raw: str) -> "PlanSnapshot":
+        """Load a snapshot written by ``to_json``."""
+        data = json.loads(raw)
+        return cls(
+            dialect=data["dialect"],
+            rows=data["rows"],
+            plans={
+                name: QueryPlan.from_dict(plan) for name, plan in data["plans"].items()
+            },
+        )
+
+    def save(self, path: Path) -> None:
+        """Write the snapshot to ``path``."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(self.to_json())
+
+    @classmethod
+    def load(cls, path: Path) -> "PlanSnapshot":
+        """Read a snapshot from ``path``."""
+        return cls.from_json(path.read_text())
+
+
+def _sqlite_plan(rows: list[Any]) -> QueryPlan:
+    """Reduce ``EXPLAIN QUERY PLAN`` rows of (id, parent, notused, detail)."""
+    depths: dict[int, int] = {}
+    steps, seq_scans, indexes = [], set(), set()
+    for node_id, parent, _, detail in rows:
+        depth = depths.get(parent, -1) + 1
+        depths[node_id] = depth
+        steps.append("  " * depth + detail)
+        access = _SQLITE_ACCESS.match(detail)
+        if access is None:
+            continue
+        if access["index"]:
+            indexes.add(access["index"])
+        elif access["rowid"]:
+            indexes.add(f"{access['table']} rowid")
+        elif access["op"] == "SCAN":
+            seq_scans.add(access["table"])
+    return QueryPlan(tuple(steps), None, frozenset(seq_scans), frozenset(indexes))
+
+
+def _postgresql_nodes(
+    node: Mapping[str, Any], depth: int = 0
+) -> Iterator[tuple[int, Mapping[str, Any]]]:
+    yield depth, node
+    for child in node.get("Plans", ()):
+        yield from _postgresql_nodes(child, depth + 1)
+
+
+def _postgresql_plan(raw: Any) -> QueryPlan:
+    """Reduce the output of ``EXPLAIN (FORMAT JSON)``."""
+    if isinstance(raw, str):
+        # asyncpg returns json columns undecoded.
+        raw = json.loads(raw)
+    root = raw[0]["Plan"]
+    steps, seq_scans, indexes = [], set(), set()
+    for depth, node in _postgresql_nodes(root):
+        step = node["Node Type"]
+        if "Relation Name" in node:
+            step += f" on {node['Relation Name']}"
+        if "Index Name" in node:
+            step += f" using {node['Index Name']}"
+            indexes.add(node["Index Name"])
+        if node["Node Type"] == "Seq Scan":
+            seq_scans.add(node["Relation Name"])
+        steps.append("  " * depth + step)
+    return QueryPlan(
+        tuple(steps),
+        float(root["Total Cost"]),
+        frozenset(seq_scans),
+        frozenset(indexes),
+    )
+
+
+async def explain(
+    connection: AsyncConnection, statement: Select, parameters: Mapping[str, Any]
+) -> QueryPlan:
+    """Plan ``statement`` with ``parameters`` bound, without running it."""
+    result = await connection.execute(Explain(statement), dict(parameters))
+    if connection.dialect.name == "postgresql":
+        return _postgresql_plan(result.scalar_one())
+    return _sqlite_plan(list(result.all()))
+
+
+async def capture_plans(
+    connection: AsyncConnection,
+    parameters: Mapping[str, Any],
+    rows: int,
+    queries: Mapping[str, Select] = QUERIES,
+) -> PlanSnapshot:
+    """Plan every query in ``queries``.
+
+    Args:
+        connection: Connection to a seeded database.
+        parameters: Values for every bound parameter the queries use.
+        rows: Number of items the database was seeded with.
+        queries: Statements by name; the repository's registry by default.
+    """
+    snapshot = PlanSnapshot(connection.dialect.name, rows)
+    for name, statement in queries.items():
+        snapshot.plans[name] = await explain(connection, statement, parameters)
+    return snapshot
+
+
+def _upgrade(connection: Any) -> None:
+    upgrade(alembic_config(connection), "head")
+
+
+async def build_dataset(connection: AsyncConnection, rows: int) -> dict[str, Any]:
+    """Migrate an empty database to head and seed ``rows`` synthetic items.
+
+    Args:
+        connection: Connection to a scratch database, inside a transaction.
+        rows: Number of items to insert.
+
+    Returns:
+        Parameters for the registered queries: an existing ``item_id`` and
+        ``after`` cursor halfway through the items, and a page ``limit``.
+
+    Raises:
+        ValueError: If the database already has an items table.
+    """
+    if await connection.run_sync(
+        lambda sync_connection: inspect(sync_connection).has_table(Item.__tablename__)
+    ):
+        raise ValueError("Query plans need an empty scratch database")
+    await connection.run_sync(_upgrade)
+
+    started = datetime.now(UTC) - timedelta(seconds=rows)
+    middle = None
+    for offset in range(0, rows, _SEED_BATCH_SIZE):
+        batch = []
+        for index in range(offset, min(offset + _SEED_BATCH_SIZE, rows)):
+            item_id = uuid7()
+            if index == rows // 2:
+                middle = item_id
+            batch.append(
+                {
+                    "id": item_id,
+                    "name": f"Item {index}",
+                    "description": f"Synthetic item number {index}",
+                    "version": 1 + index % 3,
+                    "updated_at": started + timedelta(seconds=index),
+                }
+            )
+        await connection.execute(insert(Item), batch)
+    await connection.execute(
+        update(ItemCount).where(ItemCount.slot == 0).values(count=rows)
+    )
+    await connection.execute(text("ANALYZE"))
+    return {
+        "item_id": middle or uuid7(),
+        "after": middle or uuid7(),
+        "limit": SAMPLE_PAGE_SIZE,
+    }
+
+
+async def capture(database_url: str, rows: int = DEFAULT_ROWS) -> PlanSnapshot:
+    """Seed a scratch database and plan every registered query.
+
+    Everything runs in one transaction that is rolled back, so on PostgreSQL
+    the database is left empty.
+
+    Args:
+        database_url: Async URL of an empty scratch database.
+        rows: Number of synthetic items to seed.
+    """
+    engine = create_async_engine(database_url)
+    try:
+        async with engine.connect() as connection:
+            transaction = await connection.begin()
+            try:
+                parameters = await build_dataset(connection, rows)
+                return await capture_plans(connection, parameters, rows)
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+
+def compare_plans(
+    baseline: PlanSnapshot,
+    current: PlanSnapshot,
+    cost_tolerance: float = DEFAULT_COST_TOLERANCE,
+) -> list[str]:
+    """List the regressions of ``current`` against ``baseline``.
+
+    A query regresses when it reads a table by a full scan that the baseline
+    did not, stops using an index the baseline used, or its estimated cost
+    exceeds ``cost_tolerance`` times the baseline's. Other plan changes are
+    left to review of the snapshot diff.
+
+    Returns:
+        One message per problem; empty if there are none.
+    """
+    if (baseline.dialect, baseline.rows) != (current.dialect, current.rows):
+        return [
+            f"Snapshot is for {baseline.dialect} with {baseline.rows} rows, "
+            f"not {current.dialect} with {current.rows} rows"
+        ]
+    problems = []
+    for name, plan in current.plans.items():
+        expected = baseline.plans.get(name)
+        if expected is None:
+            problems.append(f"{name}: no saved plan; update the snapshot")
+            continue
+        for table in sorted(plan.seq_scans - expected.seq_scans):
+            problems.append(f"{name}: now reads {table} by a full scan")
+        for index in sorted(expected.indexes - plan.indexes):
+            problems.append(f"{name}: no longer uses index {index}")
+        if (
+            plan.cost is not None
+            and expected.cost is not None
+            and plan.cost > expected.cost * cost_tolerance
+        ):
+            problems.append(
+                f"{name}: estimated cost {plan.cost:.1f} is over {cost_tolerance}x "
+                f"the saved {expected.cost:.1f}"
+            )
+    return problems
@@ -0,0 +1,191 @@
+"""Item repository built on prebuilt, cache-friendly statements.
+
+Every statement is constructed once at import time with bound parameters, so
+a request does not rebuild the expression tree, and SQLAlchemy's compiled
+cache (and asyncpg's prepared-statement cache on PostgreSQL) is hit with the
+same cache key on every call.
+
+With item sharding enabled, statements binding ``item_id`` run on the owning
+shard only and every other item statement runs on all shards. Readers below
+merge the per-shard rows, so callers see the same results either way.
+
+The item count and a collection revision are kept in the ``item_counts``
+table, which every write updates in its own transaction, so totals and list
+revalidation never scan the items table.
+"""
+
+import random
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import Select, bindparam, case, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.db.database import item_shard_router
+from app.db.models import ITEM_COUNT_SLOTS, Item, ItemCount
+
+ITEM_BY_ID = select(Item).where(Item.id == bindparam("item_id"))
+ITEM_VERSION_BY_ID = select(Item.version).where(Item.id == bindparam("item_id"))
+ALL_ITEMS = select(Item).order_by(Item.id)
+ITEMS_AFTER = (
+    select(Item)
+    .where(Item.id > bindparam("after"))
+    .order_by(Item.id)
+    .limit(bindparam("limit"))
+)
+ITEMS_REVISION = select(func.coalesce(func.sum(ItemCount.revision), 0))
+ITEM_COUNT = select(func.coalesce(func.sum(ItemCount.count), 0))
+
+# Registry of the repository's read queries, by name.
+QUERIES: dict[str, Select] = {
+    "item_by_id": ITEM_BY_ID,
+    "item_version_by_id": ITEM_VERSION_BY_ID,
+    "all_items": ALL_ITEMS,
+    "items_after": ITEMS_AFTER,
+    "items_revision": ITEMS_REVISION,
+    "item_count": ITEM_COUNT,
+}
+
+ADD_TO_ITEM_COUNT = (
+    update(ItemCount)
+    .where(ItemCount.slot == bindparam("counter_slot"))
+    .values(count=ItemCount.count + bindparam("delta"), revision=ItemCount.revision + 1)
+)
+RESET_ITEM_COUNT = update(ItemCount).values(
+    count=case((ItemCount.slot == 0, bindparam("total")), else_=0),
+    revision=ItemCount.revision + 1,
+)
+COUNT_ALL_ITEMS = select(func.count()).select_from(Item)
+# PostgreSQL's planner estimate of the table size, refreshed by (auto)ANALYZE
+# and VACUUM; -1 if the table was never analyzed.
+ITEMS_ESTIMATE = text("SELECT reltuples FROM pg_class WHERE oid = 'items'::regclass")
+
+
+async def get_item(db: AsyncSession, item_id: uuid.UUID) -> Item | None:
+    """Load one item by primary key."""
+    result = await db.execute(ITEM_BY_ID, {"item_id": item_id})
+    return result.scalar_one_or_none()
+
+
+async def get_item_version(db: AsyncSession, item_id: uuid.UUID) -> int | None:
+    """Load only the version of one item, for cheap revalidation."""
+    result = await db.execute(ITEM_VERSION_BY_ID, {"item_id": item_id})
+    return result.scalar_one_or_none()
+
+
+def _merge_by_id(items: Sequence[Item]) -> list[Item]:
+    """Merge per-shard runs, each already ordered by ID, into one ordered list.
+
+    Sorting is linear on a single run and merges ``k`` runs in
+    ``O(n log k)``, since the sort detects the ordered runs.
+    """
+    return sorted(items, key=lambda item: item.id)
+
+
+async def list_items(db: AsyncSession) -> Sequence[Item]:
+    """Load all items, oldest first."""
+    result = await db.execute(ALL_ITEMS)
+    return _merge_by_id(result.scalars().all())
+
+
+async def list_items_after(
+    db: AsyncSession, after: uuid.UUID, limit: int
+) -> Sequence[Item]:
+    """Load up to ``limit`` items created after ``after``, oldest first.
+
+    Item IDs are UUIDv7, so key order is creation order.
+    """
+    result = await db.execute(ITEMS_AFTER, {"after": after, "limit": limit})
+    # Each shard returns up to ``limit`` rows; keep the first ``limit`` overall.
+    return _merge_by_id(result.scalars().all())[:limit]
+
+
+async def items_revision(db: AsyncSession) -> int:
+    """Return the collection revision, which every item write increases."""
+    result = await db.execute(ITEMS_REVISION)
+    # One row per shard that was queried.
+    return sum(row[0] for row in result.all())
+
+
+def _item_databases(db: AsyncSession) -> list[dict[str, Any]]:
+    """Return bind arguments reaching each database that holds items."""
+    router = item_shard_router(db)
+    if router is None:
+        return [{}]
+    return [{"shard_id": shard_id} for shard_id in router.shard_ids]
+
+
+async def add_to_item_count(connection: AsyncConnection, delta: int) -> None:
+    """Count ``delta`` new items and bump the collection revision.
+
+    Every write to the items table must call this on the connection it wrote
+    on (with ``delta=0`` for updates), so the count and the list ETag commit
+    or roll back with the rows.
+    """
+    await connection.execute(
+        ADD_TO_ITEM_COUNT,
+        {"counter_slot": random.randrange(ITEM_COUNT_SLOTS), "delta": delta},
+    )
+
+
+async def count_items(db: AsyncSession) -> int:
+    """Return the exact number of items from the counter table."""
+    result = await db.execute(ITEM_COUNT)
+    # One row per shard that was queried.
+    return sum(row[0] for row in result.all())
+
+
+async def estimate_item_count(db: AsyncSession) -> int | None:
+    """Estimate the number of items from PostgreSQL planner statistics.
+
+    Returns:
+        The estimate, or None if a database is not PostgreSQL or has no
+        statistics for the items table yet.
+    """
+    total = 0
+    for bind_arguments in _item_databases(db):
+        # Checked on the engine and queried through the session, so a
+        # ReadOnlySession still releases its connection after the query.
+        if db.get_bind(**bind_arguments).dialect.name != "postgresql":
+            return None
+        result = await db.execute(ITEMS_ESTIMATE, bind_arguments=bind_arguments)
+        estimate = result.scalar_one()
+        if estimate < 0:
+            return None
+        total += int(estimate)
+    return total
+
+
+async def recount_items(db: AsyncSession) -> int:
+    """Reset the item counter to a full ``COUNT(*)`` of the items table.
+
+    Repairs a counter that drifted because rows were written around the
+    application. On PostgreSQL, inserts wait until the session commits.
+
+    Returns:
+        The number of items.
+    """
+    total = 0
+    for bind_arguments in _item_databases(db):
+        connection = await db.connection(bind_arguments=bind_arguments)
+        if connection.dialect.name == "postgresql":
+            await connection.execute(text("LOCK TABLE items IN SHARE MODE"))
+        count = (await connection.execute(COUNT_ALL_ITEMS)).scalar_one()
+        await connection.execute(RESET_ITEM_COUNT, {"total": count})
+        total += count
+    return total
+
+
+async def create_item(db: AsyncSession, name: str, description: str) -> Item:
+    """Insert a new item and return it with generated columns populated."""
+    item = Item(name=name, description=description)
+    db.add(item)
+    await db.flush()
+    router = item_shard_router(db)
+    connection = await db.connection(
+        bind_arguments={} if router is None else {"shard_id": router.shard_for(item.id)}
+    )
+    await add_to_item_count(connection, 1)
+    await db.refresh(item)
+    return item
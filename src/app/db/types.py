@@ -0,0 +1,105 @@
+"""Custom column types and key generation for ORM models."""
+
+import os
+import threading
+import time
+import uuid
+from typing import Any
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Dialect
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+_uuid7_lock = threading.Lock()
+_uuid7_last_ms = 0
+_uuid7_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUID as defined by RFC 9562 (version 7).
+
+    The top 48 bits hold the Unix time in milliseconds, so new keys are
+    appended to the right edge of a B-tree index instead of landing on random
+    pages. IDs generated by this process within the same millisecond stay
+    monotonic thanks to a 12-bit counter in ``rand_a``.
+
+    Returns:
+        A new version 7 UUID.
+    """
+    global _uuid7_last_ms, _uuid7_counter
+    with _uuid7_lock:
+        timestamp_ms = time.time_ns() // 1_000_000
+        if timestamp_ms > _uuid7_last_ms:
+            _uuid7_last_ms = timestamp_ms
+            _uuid7_counter = int.from_bytes(os.urandom(2)) & 0x7FF
+        else:
+            _uuid7_counter += 1
+            if _uuid7_counter > 0xFFF:
+                # Counter exhausted: borrow the next millisecond.
+                _uuid7_last_ms += 1
+                _uuid7_counter = 0
+        timestamp_ms, counter = _uuid7_last_ms, _uuid7_counter
+
+    rand_b = int.from_bytes(os.urandom(8)) & ((1 << 62) - 1)
+    value = (
+        (timestamp_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | counter << 64
+        | 0b10 << 62
+        | rand_b
+    )
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp_ms(value: uuid.UUID) -> int:
+    """Return the Unix time in milliseconds embedded in a version 7 UUID."""
+    return value.int >> 80
+
+
+def uuid7_lower_bound(timestamp_ms: int) -> uuid.UUID:
+    """Return a UUID that sorts before every version 7 UUID from ``timestamp_ms``.
+
+    Useful as an exclusive keyset cursor for "created since" queries.
+    """
+    return uuid.UUID(int=max(timestamp_ms, 0) << 80)
+
+
+def parse_uuid(value: str) -> uuid.UUID | None:
+    """Parse a UUID string, returning None if it is malformed."""
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        return None
+
+
+class BinaryUUID(TypeDecorator[uuid.UUID]):
+    """UUID stored natively on PostgreSQL and as 16 raw bytes elsewhere.
+
+    Compared to ``String(36)`` this halves the key size (and every index that
+    contains it) on SQLite and lets PostgreSQL use its 16-byte ``uuid`` type.
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> TypeEngine[Any]:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(
+        self, value: uuid.UUID | str | None, dialect: Dialect
+    ) -> uuid.UUID | bytes | None:
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(value)
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(
+        self, value: uuid.UUID | bytes | None, dialect: Dialect
+    ) -> uuid.UUID | None:
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return uuid.UUID(bytes=bytes(value))
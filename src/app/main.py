@@ -1,14 +1,27 @@
 """FastAPI application entry point."""
 
+import logging
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from prometheus_fastapi_instrumentator import Instrumentator
 
 from app.api.health import router as health_router
+from app.api.metrics import router as metrics_router
 from app.api.routes import router as api_router
+from app.core.compression import CompressionMiddleware
 from app.core.config import get_settings
+from app.core.drain import (
+    DrainMiddleware,
+    get_drain_state,
+    install_drain_signal_handler,
+)
+from app.core.http_metrics import HttpMetricsMiddleware, get_http_metrics
+from app.core.loop_lag import EventLoopLagMonitor
+from app.core.metrics import HTTP_REQUESTS_IN_FLIGHT, HTTP_STREAMS_OPEN
+from app.services.change_feed import get_change_feed
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -21,10 +34,48 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
         await init_db()
 
+    feed = get_change_feed()
+    await feed.start()
+
+    loop_lag = EventLoopLagMonitor(settings.event_loop_lag_interval_seconds)
+    loop_lag.start()
+
+    drain = get_drain_state()
+    drain.reset()
+    restore_signal_handler = install_drain_signal_handler(
+        drain, feed.stop, settings.shutdown_drain_delay_seconds
+    )
+
     yield
 
-    # Shutdown: Cleanup if needed
-    pass
+    # Shutdown: refuse new work, end change-feed streams, wait for in-flight
+    # requests up to the deadline, then release database connections.
+    restore_signal_handler()
+    drain.stop_accepting()
+    await feed.stop()
+    # The deadline counts from when new work was refused. Under uvicorn its
+    # --timeout-graceful-shutdown (set from the same setting) has already
+    # spent it, so this only waits when the server did not.
+    remaining = await drain.wait_idle(
+        max(0.0, settings.shutdown_drain_timeout_seconds - drain.refusing_for)
+    )
+
+    from app.db.database import dispose_engine
+
+    await dispose_engine()
+    await loop_lag.stop()
+    # The listener is closed by now, so report the outcome in the log rather
+    # than in metrics nobody can scrape.
+    if drain.aborted or remaining:
+        logger.warning(
+            "Drained in %.2fs: %d request(s) aborted at the deadline, "
+            "%d still in flight",
+            drain.elapsed,
+            drain.aborted,
+            remaining,
+        )
+    else:
+        logger.info("Drained in %.2fs", drain.elapsed)
 
 
 app = FastAPI(
@@ -34,14 +85,41 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+settings = get_settings()
+
+# Negotiated zstd/br/gzip compression for large responses
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+    zstd_level=settings.compression_zstd_level,
+    exclude_paths=settings.compression_exclude_paths,
+    cache_size=settings.compression_cache_size,
+)
+
+# Count in-flight requests and refuse new ones while draining; probes and
+# metrics stay reachable until the process exits. Event streams and WebSockets
+# are counted apart so the autoscaling gauge only reflects request load.
+app.add_middleware(
+    DrainMiddleware,
+    state=get_drain_state(),
+    exempt_paths=("/health", "/ready", "/metrics"),
+    streaming_paths=("/api/v1/items/changes",),
+)
+HTTP_REQUESTS_IN_FLIGHT.set_function(lambda: get_drain_state().requests_in_flight)
+HTTP_STREAMS_OPEN.set_function(lambda: get_drain_state().streams)
+
+# Request count, duration and size per route template. Added last so it is the
+# outermost middleware and times the full request, as seen by the server.
+app.add_middleware(
+    HttpMetricsMiddleware,
+    metrics=get_http_metrics(),
+    routes=[*health_router.routes, *api_router.routes, *metrics_router.routes],
+    size_sample_rate=settings.http_metrics_size_sample_rate,
+)
+
 # Include routers
 app.include_router(health_router)
 app.include_router(api_router)
-
-# Prometheus metrics instrumentation
-# This adds automatic metrics for all requests:
-# - http_requests_total (counter)
-# - http_request_duration_seconds (histogram)
-# - http_request_size_bytes (summary)
-# - http_response_size_bytes (summary)
-Instrumentator().instrument(app).expose(app, endpoint="/metrics")
+app.include_router(metrics_router)
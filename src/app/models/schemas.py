@@ -1,5 +1,6 @@
 """Pydantic models for request/response validation."""
 
+import uuid
 from enum import Enum
 
 from pydantic import BaseModel
@@ -15,11 +16,38 @@ class ItemCreate(BaseModel):
 class ItemResponse(BaseModel):
     """Schema for item response."""
 
-    id: str
+    id: uuid.UUID
     name: str
     description: str
 
 
+class ItemCountResponse(BaseModel):
+    """Schema for the number of items."""
+
+    count: int
+    exact: bool
+
+
+class ImportRowError(BaseModel):
+    """A source row rejected by a bulk import."""
+
+    row: int
+    message: str
+
+
+class ImportResult(BaseModel):
+    """Summary of a bulk item import."""
+
+    rows: int
+    imported: int
+    rejected: int
+    skipped: int
+    errors: list[ImportRowError]
+    checkpoint: str
+    complete: bool
+    elapsed_seconds: float
+
+
 class Operation(str, Enum):
     """Supported calculator operations."""
 
@@ -37,6 +65,12 @@ class CalculateRequest(BaseModel):
     operation: Operation
 
 
+class CalculateStreamRequest(CalculateRequest):
+    """Schema for a calculation sent over the streaming WebSocket."""
+
+    id: str | int | None = None
+
+
 class CalculateResponse(BaseModel):
     """Schema for calculate response."""
 
@@ -44,3 +78,27 @@ class CalculateResponse(BaseModel):
     b: int | float
     operation: str
     result: int | float
+
+
+class QuantileEstimate(BaseModel):
+    """Estimated value of one quantile."""
+
+    q: float
+    value: float | None
+
+
+class AggregateResponse(BaseModel):
+    """Statistics of a stream of numbers.
+
+    Everything but ``count`` and ``sum`` is None for an empty stream, and
+    ``variance``/``stddev`` (sample statistics) need at least two values.
+    """
+
+    count: int
+    sum: float
+    mean: float | None
+    variance: float | None
+    stddev: float | None
+    min: float | None
+    max: float | None
+    quantiles: list[QuantileEstimate]
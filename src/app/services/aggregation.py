@@ -0,0 +1,343 @@
+"""Single-pass statistics over streamed numbers in constant memory.
+
+``RunningStats`` keeps count, sum, mean, variance and extremes with Welford's
+algorithm, folding whole chunks in with Chan's parallel update. ``TDigest``
+estimates quantiles from a bounded set of centroids: a merging t-digest whose
+centroids are small near the tails and large near the median, so extreme
+quantiles stay accurate. Neither keeps the input values.
+"""
+
+import copy
+import json
+import math
+import sys
+from array import array
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
+
+from app.core.streams import iter_lines
+
+SUPPORTED_FORMATS = ("ndjson", "float64")
+
+# Values folded into the statistics at a time.
+_BATCH_SIZE = 4096
+_FLOAT64_SIZE = 8
+
+
+class AggregationError(ValueError):
+    """Raised when the input stream is not a sequence of finite numbers."""
+
+
+def _require_finite(*numbers: float) -> None:
+    if not all(map(math.isfinite, numbers)):
+        raise OverflowError("Result is out of the range of a 64-bit float")
+
+
+class RunningStats:
+    """Count, sum, mean, variance, minimum and maximum of a stream.
+
+    Updates that would take the sum, mean or variance out of the range of a
+    64-bit float raise ``OverflowError`` and leave the state unchanged.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._m2 = 0.0
+        # Neumaier-compensated running sum.
+        self._sum = 0.0
+        self._sum_error = 0.0
+
+    def add(self, value: float) -> None:
+        """Fold in one value (Welford's update)."""
+        count = self.count + 1
+        delta = value - self.mean
+        mean = self.mean + delta / count
+        m2 = self._m2 + delta * (value - mean)
+        _require_finite(delta, mean, m2, self._sum + value)
+        self.count, self.mean, self._m2 = count, mean, m2
+        self._add_to_sum(value)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def update(self, values: Sequence[float]) -> None:
+        """Fold in a batch of values.
+
+        The batch's own mean and squared deviations are computed exactly and
+        combined with the running state using Chan et al.'s pairwise update.
+        """
+        if not values:
+            return
+        count = len(values)
+        batch_sum = math.fsum(values)
+        batch_mean = batch_sum / count
+        batch_m2 = math.fsum((value - batch_mean) ** 2 for value in values)
+
+        total = self.count + count
+        delta = batch_mean - self.mean
+        mean = self.mean + delta * count / total
+        m2 = self._m2 + batch_m2 + delta * delta * self.count * count / total
+        _require_finite(mean, m2, self._sum + batch_sum)
+        self.mean, self._m2, self.count = mean, m2, total
+        self._add_to_sum(batch_sum)
+        self.minimum = min(self.minimum, min(values))
+        self.maximum = max(self.maximum, max(values))
+
+    def _add_to_sum(self, value: float) -> None:
+        total = self._sum + value
+        if abs(self._sum) >= abs(value):
+            self._sum_error += (self._sum - total) + value
+        else:
+            self._sum_error += (value - total) + self._sum
+        self._sum = total
+
+    @property
+    def sum(self) -> float:
+        """Sum of all values."""
+        return self._sum + self._sum_error
+
+    @property
+    def variance(self) -> float | None:
+        """Sample variance, or None for fewer than two values."""
+        if self.count < 2:
+            return None
+        return self._m2 / (self.count - 1)
+
+
+class TDigest:
+    """Merging t-digest for streaming quantile estimates.
+
+    Args:
+        compression: Size bound of the digest: it holds at most about
+            ``compression`` centroids, and a larger value trades memory for
+            accuracy.
+    """
+
+    def __init__(self, compression: float = 100.0) -> None:
+        if compression < 10:
+            raise ValueError("compression must be at least 10")
+        self.compression = compression
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._means: list[float] = []
+        self._weights: list[float] = []
+        self._buffer: list[float] = []
+        self._buffer_limit = int(compression * 5)
+
+    def add(self, value: float) -> None:
+        """Add one value."""
+        self._buffer.append(value)
+        if len(self._buffer) >= self._buffer_limit:
+            self._merge()
+
+    def update(self, values: Sequence[float]) -> None:
+        """Add a batch of values."""
+        for start in range(0, len(values), self._buffer_limit):
+            self._buffer.extend(values[start : start + self._buffer_limit])
+            if len(self._buffer) >= self._buffer_limit:
+                self._merge()
+
+    @property
+    def centroid_count(self) -> int:
+        """Number of centroids after merging buffered values."""
+        self._merge()
+        return len(self._means)
+
+    def _k(self, q: float) -> float:
+        # Scale function k1: centroid size shrinks towards q = 0 and q = 1.
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _merge(self) -> None:
+        """Merge buffered values into the centroids."""
+        if not self._buffer:
+            return
+        self.count += len(self._buffer)
+        self.minimum = min(self.minimum, min(self._buffer))
+        self.maximum = max(self.maximum, max(self._buffer))
+        points = sorted(
+            [*zip(self._means, self._weights, strict=True)]
+            + [(value, 1.0) for value in self._buffer]
+        )
+        self._buffer = []
+
+        total = float(self.count)
+        means: list[float] = []
+        weights: list[float] = []
+        mean, weight = points[0]
+        q_left = 0.0
+        q_limit = self._k_inverse(self._k(q_left) + 1)
+        for point_mean, point_weight in points[1:]:
+            if (q_left * total + weight + point_weight) / total <= q_limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                q_left += weight / total
+                q_limit = self._k_inverse(self._k(q_left) + 1)
+                mean, weight = point_mean, point_weight
+        means.append(mean)
+        weights.append(weight)
+        self._means = means
+        self._weights = weights
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate the ``q`` quantile, or None if no value was added.
+
+        Raises:
+            ValueError: If ``q`` is outside ``[0, 1]``.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("Quantiles must be between 0 and 1")
+        self._merge()
+        if not self._means:
+            return None
+        means, weights = self._means, self._weights
+        if len(means) == 1:
+            return means[0]
+
+        # Interpolate between centroid centers; the exact extremes bound the
+        # halves of the outermost centroids.
+        index = q * self.count
+        if index <= weights[0] / 2:
+            return self.minimum + (means[0] - self.minimum) * index / (weights[0] / 2)
+        if index >= self.count - weights[-1] / 2:
+            tail = (self.count - index) / (weights[-1] / 2)
+            return self.maximum - (self.maximum - means[-1]) * tail
+        cumulative = weights[0] / 2
+        for i in range(len(means) - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if cumulative + step >= index:
+                fraction = (index - cumulative) / step
+                return means[i] + (means[i + 1] - means[i]) * fraction
+            cumulative += step
+        return self.maximum
+
+
+@dataclass
+class Aggregation:
+    """Running statistics and quantile sketch fed from one stream."""
+
+    stats: RunningStats
+    digest: TDigest
+
+    def update(self, values: Sequence[float], first_position: int) -> None:
+        """Fold in a batch of values.
+
+        Args:
+            values: Values to add.
+            first_position: One-based position of ``values[0]`` in the
+                stream, for error messages.
+
+        Raises:
+            AggregationError: If a value is NaN or infinite, or takes the
+                statistics out of the range of a 64-bit float.
+        """
+        if not all(map(math.isfinite, values)):
+            offset = next(i for i, v in enumerate(values) if not math.isfinite(v))
+            raise AggregationError(
+                f"Value {first_position + offset} is not a finite number"
+            )
+        try:
+            self.stats.update(values)
+        except OverflowError:
+            # Fold one value at a time to find the one that overflows.
+            stats = copy.copy(self.stats)
+            for offset, value in enumerate(values):
+                try:
+                    stats.add(value)
+                except OverflowError:
+                    raise AggregationError(
+                        f"Value {first_position + offset} is out of range: the "
+                        "statistics exceed the range of a 64-bit float"
+                    ) from None
+            self.stats = stats
+        self.digest.update(values)
+
+
+async def _ndjson_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[float]]:
+    batch: list[float] = []
+    line_number = 0
+    async for line in iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError:
+            value = None
+        except ValueError:
+            # An integer over Python's int conversion digit limit.
+            raise AggregationError(
+                f"Line {line_number} is out of the range of a 64-bit float"
+            ) from None
+        if isinstance(value, bool) or not isinstance(value, int | float):
+            raise AggregationError(f"Line {line_number} is not a JSON number")
+        try:
+            batch.append(float(value))
+        except OverflowError:
+            raise AggregationError(
+                f"Line {line_number} is out of the range of a 64-bit float"
+            ) from None
+        if len(batch) >= _BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _float64_batches(
+    chunks: AsyncIterator[bytes],
+) -> AsyncIterator[Sequence[float]]:
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % _FLOAT64_SIZE
+        if usable:
+            values = array("d", pending[:usable])
+            if sys.byteorder == "big":
+                values.byteswap()
+            pending = pending[usable:]
+            yield values
+    if pending:
+        raise AggregationError(
+            f"Stream length is not a multiple of {_FLOAT64_SIZE} bytes"
+        )
+
+
+async def aggregate(
+    chunks: AsyncIterator[bytes], fmt: str, compression: float = 100.0
+) -> Aggregation:
+    """Compute statistics over a stream of numbers in one pass.
+
+    Args:
+        chunks: Raw body chunks.
+        fmt: ``ndjson`` (one JSON number per line) or ``float64`` (packed
+            little-endian IEEE 754 doubles).
+        compression: Compression of the quantile sketch.
+
+    Returns:
+        The statistics and quantile sketch of the stream.
+
+    Raises:
+        AggregationError: If the stream is malformed or holds a non-finite
+            value.
+    """
+    batches: AsyncIterator[Sequence[float]]
+    if fmt == "ndjson":
+        batches = _ndjson_batches(chunks)
+    elif fmt == "float64":
+        batches = _float64_batches(chunks)
+    else:
+        raise AggregationError(f"Unsupported format: {fmt}")
+
+    aggregation = Aggregation(RunningStats(), TDigest(compression))
+    async for batch in batches:
+        aggregation.update(batch, aggregation.stats.count + 1)
+    return aggregation
@@ -0,0 +1,462 @@
+"""Item change feed: in-process fan-out with a pluggable cross-replica transport.
+
+Committed item creations are handed to a transport, which delivers them to the
+``ChangeFeed`` of every replica (just this one for ``InMemoryTransport``, all
+replicas listening on the channel for ``PostgresNotifyTransport``). The feed
+copies each event into a bounded buffer per subscriber; a subscriber that
+falls behind is ended with an overflow instead of growing without bound, and
+resumes from its last event ID.
+
+Event IDs are item IDs, assigned when the item is flushed and from the clock
+of whichever replica created it, so items can commit slightly out of ID order.
+Resuming therefore replays an overlap window before the last event ID, and
+the stream drops live events it already replayed; clients may see an event
+again after reconnecting and should ignore IDs they have processed.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db import repository
+from app.db.database import read_session
+from app.db.types import uuid7_lower_bound, uuid7_timestamp_ms
+from app.models.schemas import ItemResponse
+
+logger = logging.getLogger(__name__)
+
+ITEM_CREATED = "item.created"
+
+# asyncpg NOTIFY payloads must stay below 8000 bytes.
+_MAX_NOTIFY_PAYLOAD = 7900
+_PENDING_EVENTS_KEY = "pending_item_events"
+
+
+@dataclass(frozen=True)
+class ItemEvent:
+    """A change to one item, identified by the item's time-ordered ID."""
+
+    id: str
+    event: str
+    data: str
+
+    @classmethod
+    def created(cls, item: ItemResponse) -> "ItemEvent":
+        """Build the event announcing a newly created item."""
+        return cls(str(item.id), ITEM_CREATED, item.model_dump_json())
+
+    def to_sse(self) -> str:
+        """Format the event as a Server-Sent Events message."""
+        return f"id: {self.id}\nevent: {self.event}\ndata: {self.data}\n\n"
+
+
+class SubscriptionEnded(Exception):
+    """Raised once a subscription has been closed or has overflowed."""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class Subscription:
+    """Bounded buffer of events for one subscriber."""
+
+    def __init__(self, buffer_size: int) -> None:
+        self._queue: asyncio.Queue[ItemEvent | None] = asyncio.Queue(buffer_size)
+        self.overflowed = False
+        self.interrupted = False
+        self.closed = False
+
+    @property
+    def _end_reason(self) -> str:
+        if self.overflowed:
+            return "overflow"
+        return "interrupted" if self.interrupted else "closed"
+
+    def offer(self, item_event: ItemEvent) -> None:
+        """Buffer an event, marking the subscription overflowed if full."""
+        if self.closed or self.overflowed or self.interrupted:
+            return
+        try:
+            self._queue.put_nowait(item_event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def close(self) -> None:
+        """End the subscription once buffered events are consumed."""
+        self.closed = True
+        self._wake()
+
+    def interrupt(self) -> None:
+        """End the subscription because the feed may have missed events."""
+        self.interrupted = True
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def next_event(self, timeout: float) -> ItemEvent | None:
+        """Return the next buffered event, or None if ``timeout`` elapses.
+
+        Raises:
+            SubscriptionEnded: When the buffer is drained after an overflow,
+                interruption or close.
+        """
+        if self._queue.empty() and (self.overflowed or self.interrupted or self.closed):
+            raise SubscriptionEnded(self._end_reason)
+        try:
+            item_event = await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+        if item_event is None:
+            raise SubscriptionEnded(self._end_reason)
+        return item_event
+
+
+class ChangeTransport(Protocol):
+    """Carries committed events to the feed of every replica.
+
+    ``start`` receives the feed's ``deliver`` callback for incoming events and
+    an ``interrupted`` callback to call whenever events may have been lost.
+    """
+
+    async def start(
+        self,
+        deliver: Callable[[ItemEvent], None],
+        interrupted: Callable[[], None],
+    ) -> None: ...
+
+    async def publish(self, item_event: ItemEvent) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class InMemoryTransport:
+    """Single-process transport that delivers events straight to the feed."""
+
+    def __init__(self) -> None:
+        self._deliver: Callable[[ItemEvent], None] | None = None
+
+    async def start(
+        self,
+        deliver: Callable[[ItemEvent], None],
+        interrupted: Callable[[], None],
+    ) -> None:
+        self._deliver = deliver
+
+    async def publish(self, item_event: ItemEvent) -> None:
+        if self._deliver is not None:
+            self._deliver(item_event)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class PostgresNotifyTransport:
+    """Cross-replica transport over PostgreSQL ``LISTEN`` / ``NOTIFY``.
+
+    Events larger than a NOTIFY payload are sent without their data and
+    reloaded by each listener through ``load_event``.
+
+    Notifications sent while the listening connection is down are lost, so
+    losing it interrupts the feed, and the transport reconnects with
+    exponential backoff. The feed is interrupted again once the listener is
+    back, which ends streams opened during the outage; every client resumes
+    from its last event ID and the replay covers the gap.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str,
+        load_event: Callable[[str], Awaitable[ItemEvent | None]],
+        reconnect_min_seconds: float = 0.5,
+        reconnect_max_seconds: float = 30.0,
+    ) -> None:
+        self.dsn = dsn
+        self.channel = channel
+        self.load_event = load_event
+        self.reconnect_min_seconds = reconnect_min_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._connection: Any = None
+        self._lock = asyncio.Lock()
+        self._deliver: Callable[[ItemEvent], None] | None = None
+        self._interrupted: Callable[[], None] | None = None
+        self._pending: set[asyncio.Task[None]] = set()
+        self._reconnecting: asyncio.Task[None] | None = None
+        self._stopping = False
+
+    async def start(
+        self,
+        deliver: Callable[[ItemEvent], None],
+        interrupted: Callable[[], None],
+    ) -> None:
+        self._deliver = deliver
+        self._interrupted = interrupted
+        self._stopping = False
+        await self._connect()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        connection.add_termination_listener(self._on_terminated)
+        await connection.add_listener(self.channel, self._on_notify)
+        self._connection = connection
+
+    def _on_terminated(self, connection: Any) -> None:
+        if self._stopping or connection is not self._connection:
+            return
+        logger.warning("Change feed connection lost; reconnecting")
+        self._connection = None
+        if self._interrupted is not None:
+            self._interrupted()
+        self._reconnecting = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = self.reconnect_min_seconds
+        while not self._stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+            except Exception as exc:
+                logger.warning(
+                    "Change feed reconnect failed, retrying in %.1fs: %s",
+                    min(delay * 2, self.reconnect_max_seconds),
+                    exc,
+                )
+                delay = min(delay * 2, self.reconnect_max_seconds)
+                continue
+            logger.info("Change feed connection restored")
+            if self._interrupted is not None:
+                self._interrupted()
+            return
+
+    async def publish(self, item_event: ItemEvent) -> None:
+        payload = json.dumps(
+            {"id": item_event.id, "event": item_event.event, "data": item_event.data}
+        )
+        if len(payload.encode()) > _MAX_NOTIFY_PAYLOAD:
+            payload = json.dumps({"id": item_event.id, "event": item_event.event})
+        async with self._lock:
+            if self._connection is None:
+                raise ConnectionError("Change feed connection is down")
+            await self._connection.execute(
+                "SELECT pg_notify($1, $2)", self.channel, payload
+            )
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._reconnecting is not None:
+            self._reconnecting.cancel()
+            self._reconnecting = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            await connection.remove_listener(self.channel, self._on_notify)
+            await connection.close()
+        self._deliver = None
+        self._interrupted = None
+
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        message = json.loads(payload)
+        if "data" in message:
+            self._dispatch(ItemEvent(message["id"], message["event"], message["data"]))
+            return
+        task = asyncio.get_running_loop().create_task(self._load(message["id"]))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _load(self, event_id: str) -> None:
+        item_event = await self.load_event(event_id)
+        if item_event is not None:
+            self._dispatch(item_event)
+
+    def _dispatch(self, item_event: ItemEvent) -> None:
+        if self._deliver is not None:
+            self._deliver(item_event)
+
+
+class ChangeFeed:
+    """Fans committed item events out to local subscribers."""
+
+    def __init__(self, transport: ChangeTransport, buffer_size: int) -> None:
+        self.transport = transport
+        self.buffer_size = buffer_size
+        self._subscriptions: set[Subscription] = set()
+        self._publishing: set[asyncio.Task[None]] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of currently connected subscribers."""
+        return len(self._subscriptions)
+
+    async def start(self) -> None:
+        """Start receiving events from the transport."""
+        await self.transport.start(self.dispatch, self.interrupt)
+
+    async def stop(self) -> None:
+        """Finish pending publishes, stop the transport and end every subscription."""
+        if self._publishing:
+            await asyncio.wait(self._publishing)
+        await self.transport.stop()
+        for subscription in self._subscriptions:
+            subscription.close()
+
+    def subscribe(self) -> Subscription:
+        """Register a new subscriber with a bounded buffer."""
+        subscription = Subscription(self.buffer_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber."""
+        self._subscriptions.discard(subscription)
+
+    def interrupt(self) -> None:
+        """End every subscription after the transport may have lost events.
+
+        Subscribers are told to reconnect, and their replay from the database
+        covers whatever the transport missed.
+        """
+        for subscription in self._subscriptions:
+            subscription.interrupt()
+
+    def dispatch(self, item_event: ItemEvent) -> None:
+        """Copy an event into every local subscriber's buffer."""
+        for subscription in self._subscriptions:
+            subscription.offer(item_event)
+
+    def publish_nowait(self, item_events: list[ItemEvent]) -> None:
+        """Hand committed events to the transport from synchronous code."""
+        loop = asyncio.get_running_loop()
+        for item_event in item_events:
+            task = loop.create_task(self.transport.publish(item_event))
+            self._publishing.add(task)
+            task.add_done_callback(self._on_published)
+
+    def _on_published(self, task: asyncio.Task[None]) -> None:
+        self._publishing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Failed to publish item event", exc_info=task.exception())
+
+
+def publish_on_commit(session: AsyncSession, item_event: ItemEvent) -> None:
+    """Publish ``item_event`` once the session's transaction commits.
+
+    Nothing is published if the transaction rolls back, so subscribers never
+    see an item that does not exist.
+    """
+    session.sync_session.info.setdefault(_PENDING_EVENTS_KEY, []).append(item_event)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session: Session) -> None:
+    item_events = session.info.pop(_PENDING_EVENTS_KEY, None)
+    if item_events:
+        get_change_feed().publish_nowait(item_events)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_events(session: Session, previous_transaction: Any) -> None:
+    session.info.pop(_PENDING_EVENTS_KEY, None)
+
+
+def resume_cursor(last_event_id: uuid.UUID, overlap_seconds: float) -> uuid.UUID:
+    """Return the replay cursor for a client resuming from ``last_event_id``.
+
+    The cursor lies ``overlap_seconds`` before the last event ID, so items
+    that committed after the client's last event but carry a smaller ID are
+    replayed instead of skipped.
+    """
+    overlap_ms = round(overlap_seconds * 1000)
+    return uuid7_lower_bound(uuid7_timestamp_ms(last_event_id) - overlap_ms)
+
+
+async def item_event_stream(
+    subscription: Subscription,
+    replay: AsyncIterator[list[ItemEvent]],
+    heartbeat_seconds: float,
+    overlap_seconds: float = 0.0,
+) -> AsyncIterator[str]:
+    """Yield Server-Sent Events: the replayed backlog, then live events.
+
+    Live events that were also replayed are skipped. Late commits mean a live
+    event can carry a smaller ID than the last replayed one, so repeats are
+    matched by ID rather than by order. Only replayed IDs that could still
+    arrive live, those within ``overlap_seconds`` of the subscription, are
+    remembered.
+
+    Args:
+        subscription: Live subscription, opened before the replay query so no
+            event falls between the two.
+        replay: Pages of events after the client's resume cursor.
+        heartbeat_seconds: Idle time after which a comment keeps the
+            connection open.
+        overlap_seconds: How far out of ID order items may commit.
+    """
+    horizon_ms = time.time_ns() // 1_000_000 - round(overlap_seconds * 1000)
+    yield "retry: 1000\n\n"
+    replayed_ids: set[str] = set()
+    async for page in replay:
+        for replayed in page:
+            if uuid7_timestamp_ms(uuid.UUID(replayed.id)) >= horizon_ms:
+                replayed_ids.add(replayed.id)
+            yield replayed.to_sse()
+
+    while True:
+        try:
+            item_event = await subscription.next_event(heartbeat_seconds)
+        except SubscriptionEnded as ended:
+            if ended.reason != "closed":
+                # Events were dropped: tell the client to reconnect with its
+                # Last-Event-ID.
+                yield "event: reset\ndata: {}\n\n"
+            return
+        if item_event is None:
+            yield ": keep-alive\n\n"
+        elif item_event.id in replayed_ids:
+            replayed_ids.discard(item_event.id)
+        else:
+            yield item_event.to_sse()
+
+
+async def _load_item_event(event_id: str) -> ItemEvent | None:
+    """Rebuild an event from the database for oversized NOTIFY payloads."""
+    async with read_session() as session:
+        item = await repository.get_item(session, uuid.UUID(event_id))
+    if item is None:
+        return None
+    return ItemEvent.created(
+        ItemResponse(id=item.id, name=item.name, description=item.description)
+    )
+
+
+@lru_cache
+def get_change_feed() -> ChangeFeed:
+    """Get the process-wide change feed configured from settings."""
+    settings = get_settings()
+    transport: ChangeTransport
+    if settings.change_feed_transport == "postgres":
+        transport = PostgresNotifyTransport(
+            settings.database_url.replace("postgresql+asyncpg://", "postgresql://"),
+            settings.change_feed_channel,
+            _load_item_event,
+            reconnect_max_seconds=settings.change_feed_reconnect_max_seconds,
+        )
+    else:
+        transport = InMemoryTransport()
+    return ChangeFeed(transport, settings.change_feed_buffer_size)
@@ -0,0 +1,355 @@
+"""Idempotency keys for retried POST requests.
+
+A client sends the same ``Idempotency-Key`` header on every retry of one
+logical request. The first attempt reserves the key together with a
+fingerprint of the request; once it succeeds, its response is stored under the
+key, and retries get that response back without running the handler again.
+
+Keys expire after a TTL. ``InMemoryIdempotencyStore`` serves a single replica;
+``DatabaseIdempotencyStore`` shares keys between replicas through the
+``idempotency_keys`` table. Its unfinished reservations hold only a short lease,
+renewed while the request runs, so a replica that dies mid-request does not
+lock the key for the whole TTL.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Protocol
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.db.database import get_session_factory
+from app.db.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Longest accepted Idempotency-Key header value.
+MAX_KEY_LENGTH = 255
+# The database store deletes all expired keys once every this many reservations.
+_PRUNE_EVERY = 100
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    """A completed response kept for replay."""
+
+    status_code: int
+    content: Any
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class IdempotencyRecord:
+    """An existing reservation: in progress until ``response`` is set."""
+
+    fingerprint: str
+    response: StoredResponse | None
+
+
+class IdempotencyConflict(Exception):
+    """Raised when a key cannot be used for this request.
+
+    ``reason`` is ``"in_progress"`` while the first attempt is still running,
+    or ``"mismatch"`` when the key was used for a different request.
+    """
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
+
+
+class IdempotencyStoreFull(Exception):
+    """Raised when no key can be reserved until running requests finish."""
+
+
+class IdempotencyStore(Protocol):
+    """Bounded TTL store of idempotency keys and their responses."""
+
+    @property
+    def lease_seconds(self) -> float | None:
+        """Seconds an unfinished reservation lasts unless renewed, or None."""
+        ...
+
+    async def reserve(self, key: str, fingerprint: str) -> IdempotencyRecord | None:
+        """Reserve ``key``, or return its existing record if already taken.
+
+        Raises:
+            IdempotencyStoreFull: If the store has no room for the key.
+        """
+        ...
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        """Store the response of the request holding ``key``."""
+        ...
+
+    async def release(self, key: str) -> None:
+        """Drop an unfinished reservation so the request can be retried."""
+        ...
+
+    async def renew(self, key: str) -> None:
+        """Extend the lease of an unfinished reservation."""
+        ...
+
+
+def request_fingerprint(method: str, path: str, query: str, body: bytes) -> str:
+    """Hash the parts of a request a retry must repeat exactly."""
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query.encode(), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class InMemoryIdempotencyStore:
+    """Process-local store holding at most ``max_entries`` keys.
+
+    When full, the oldest completed key is evicted; reservations of running
+    requests are never evicted, so a retry cannot run them twice. They need
+    no lease either: they die with the process that holds them.
+    """
+
+    lease_seconds = None
+
+    def __init__(self, ttl_seconds: float, max_entries: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, IdempotencyRecord]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def reserve(self, key: str, fingerprint: str) -> IdempotencyRecord | None:
+        now = time.monotonic()
+        # Entries are kept in reservation order, so expired ones are in front.
+        while self._entries:
+            expires_at, _ = next(iter(self._entries.values()))
+            if expires_at > now:
+                break
+            self._entries.popitem(last=False)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry[1]
+        if len(self._entries) >= self.max_entries:
+            oldest_completed = next(
+                (k for k, (_, r) in self._entries.items() if r.response is not None),
+                None,
+            )
+            if oldest_completed is None:
+                raise IdempotencyStoreFull
+            del self._entries[oldest_completed]
+        self._entries[key] = (
+            now + self.ttl_seconds,
+            IdempotencyRecord(fingerprint, None),
+        )
+        return None
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, record = entry
+            self._entries[key] = (
+                expires_at,
+                IdempotencyRecord(record.fingerprint, response),
+            )
+
+    async def release(self, key: str) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1].response is None:
+            del self._entries[key]
+
+    async def renew(self, key: str) -> None:
+        pass
+
+
+class DatabaseIdempotencyStore:
+    """Store shared by all replicas through the ``idempotency_keys`` table.
+
+    Reservations are committed on their own, before the request runs, so two
+    replicas racing on one key are serialized by the primary key. They expire
+    after ``lease_seconds`` unless renewed; completed keys after
+    ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        ttl_seconds: float,
+        lease_seconds: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self._reservations = 0
+
+    async def reserve(self, key: str, fingerprint: str) -> IdempotencyRecord | None:
+        now = datetime.now(UTC)
+        self._reservations += 1
+        async with self.session_factory() as session:
+            expired = IdempotencyKey.expires_at <= now
+            if self._reservations % _PRUNE_EVERY == 0:
+                await session.execute(delete(IdempotencyKey).where(expired))
+            else:
+                await session.execute(
+                    delete(IdempotencyKey).where(IdempotencyKey.key == key, expired)
+                )
+            session.add(
+                IdempotencyKey(
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=self.lease_seconds),
+                )
+            )
+            try:
+                await session.commit()
+                return None
+            except IntegrityError:
+                await session.rollback()
+
+            row = (
+                await session.execute(
+                    select(IdempotencyKey).where(IdempotencyKey.key == key)
+                )
+            ).scalar_one_or_none()
+        if row is None:
+            # Released between our insert and select; report it as in
+            # progress rather than racing again.
+            return IdempotencyRecord(fingerprint, None)
+        response = None
+        if row.status_code is not None:
+            stored = json.loads(row.response or "{}")
+            response = StoredResponse(
+                row.status_code, stored.get("content"), stored.get("headers", {})
+            )
+        return IdempotencyRecord(row.fingerprint, response)
+
+    async def complete(self, key: str, response: StoredResponse) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key)
+                .values(
+                    status_code=response.status_code,
+                    response=json.dumps(
+                        {"content": response.content, "headers": response.headers}
+                    ),
+                    expires_at=datetime.now(UTC) + timedelta(seconds=self.ttl_seconds),
+                )
+            )
+            await session.commit()
+
+    async def release(self, key: str) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+                )
+            )
+            await session.commit()
+
+    async def renew(self, key: str) -> None:
+        async with self.session_factory() as session:
+            await session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None))
+                .values(
+                    expires_at=datetime.now(UTC) + timedelta(seconds=self.lease_seconds)
+                )
+            )
+            await session.commit()
+
+
+class IdempotentCall:
+    """One request's use of an idempotency key.
+
+    ``begin`` reserves the key or loads the response to replay; ``finish``
+    stores the recorded response, or releases the reservation when the
+    request failed, recorded nothing or recorded a non-2xx response, so a
+    retry runs again. In between, a leased reservation is renewed every third
+    of its lease. Without a key every method is a no-op.
+    """
+
+    def __init__(
+        self, store: IdempotencyStore, key: str | None, fingerprint: str
+    ) -> None:
+        self.store = store
+        self.key = key
+        self.fingerprint = fingerprint
+        self.replay: StoredResponse | None = None
+        self._response: StoredResponse | None = None
+        self._renewal: asyncio.Task[None] | None = None
+
+    async def begin(self) -> None:
+        """Reserve the key, or set ``replay`` if the request already completed.
+
+        Raises:
+            IdempotencyConflict: If the key is held by an unfinished request
+                or was used for a different request.
+            IdempotencyStoreFull: If the store has no room for the key.
+        """
+        if self.key is None:
+            return
+        record = await self.store.reserve(self.key, self.fingerprint)
+        if record is None:
+            if self.store.lease_seconds is not None:
+                self._renewal = asyncio.create_task(
+                    self._renew(self.key, self.store.lease_seconds / 3)
+                )
+            return
+        if record.fingerprint != self.fingerprint:
+            raise IdempotencyConflict("mismatch")
+        if record.response is None:
+            raise IdempotencyConflict("in_progress")
+        self.replay = record.response
+
+    async def _renew(self, key: str, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.store.renew(key)
+            except Exception:
+                logger.warning("Failed to renew Idempotency-Key lease", exc_info=True)
+
+    def record(self, response: StoredResponse) -> None:
+        """Set the response to store for replays."""
+        self._response = response
+
+    async def finish(self, failed: bool) -> None:
+        """Store the recorded response or release the reservation."""
+        if self.key is None or self.replay is not None:
+            return
+        if self._renewal is not None:
+            self._renewal.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._renewal
+        response = self._response
+        if not failed and response is not None and 200 <= response.status_code < 300:
+            await self.store.complete(self.key, response)
+        else:
+            await self.store.release(self.key)
+
+
+@lru_cache
+def get_idempotency_store() -> IdempotencyStore:
+    """Get the process-wide idempotency store configured from settings."""
+    settings = get_settings()
+    if settings.idempotency_store == "database":
+        return DatabaseIdempotencyStore(
+            get_session_factory(),
+            settings.idempotency_ttl_seconds,
+            settings.idempotency_lease_seconds,
+        )
+    return InMemoryIdempotencyStore(
+        settings.idempotency_ttl_seconds, settings.idempotency_max_entries
+    )
@@ -0,0 +1,566 @@
+"""Bulk item import from CSV or NDJSON streams.
+
+Source bytes are read in chunks, split into records and grouped into batches
+of ``batch_size`` records. Each batch is validated with ``ItemCreate`` in one
+pass and loaded in its own transaction: with ``COPY`` on PostgreSQL (asyncpg)
+and a batched executemany elsewhere. Up to ``parallelism`` batches load
+concurrently while the next ones are parsed.
+
+Batch boundaries depend only on record positions, so a checkpoint listing the
+committed batches lets an interrupted import resume from the same source
+without loading any record twice. Item IDs combine a time-ordered base, taken
+when the batch is dispatched, with each record's row number. The bases of
+unfinished batches are kept in the checkpoint, so with sharding every record
+is routed to the same shard on every run; each shard's part of a batch commits
+on its own and is checkpointed as it does. Committed items are published to
+the change feed like items created one at a time.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.streams import iter_lines
+from app.db.database import item_shard_router
+from app.db.models import Item
+from app.db.repository import add_to_item_count
+from app.db.types import uuid7
+from app.models.schemas import ImportResult, ImportRowError, ItemCreate, ItemResponse
+from app.services.change_feed import ItemEvent, publish_on_commit
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+_ITEM_COLUMNS = ("id", "name", "description", "version", "updated_at")
+_items_adapter = TypeAdapter(list[ItemCreate])
+# Low bits of a batch's ID base replaced by the row number.
+_ROW_BITS = 40
+
+
+class ImportFormatError(ValueError):
+    """Raised for an unsupported format, a bad CSV header or a bad checkpoint."""
+
+
+class ImportFailed(Exception):
+    """Raised when a batch cannot be loaded.
+
+    Batches committed before the failure stay committed; ``checkpoint``
+    resumes the import after them.
+    """
+
+    def __init__(self, progress: "ImportProgress", checkpoint: "ImportCheckpoint"):
+        super().__init__("Item import stopped after a failed batch")
+        self.progress = progress
+        self.checkpoint = checkpoint
+
+
+@dataclass(frozen=True)
+class ParseError:
+    """A source record that could not be parsed."""
+
+    message: str
+
+
+@dataclass(frozen=True)
+class RowError:
+    """A source record that could not be imported."""
+
+    row: int
+    message: str
+
+
+@dataclass
+class ImportCheckpoint:
+    """Committed batches of an import, for resuming it.
+
+    Batches finish out of order when loaded in parallel, so the checkpoint
+    keeps the first unfinished batch plus any finished batches after it, the
+    shards that committed their part of a batch that is not finished, and the
+    ID bases of batches that were started but are not finished.
+
+    Attributes:
+        batch_size: Records per batch.
+        next_batch: First batch that is not committed.
+        done: Committed batches after ``next_batch``.
+        shards_done: Shards that committed their part of unfinished batches.
+        id_bases: Time-ordered UUIDs the item IDs of unfinished batches
+            derive from.
+    """
+
+    batch_size: int
+    next_batch: int = 0
+    done: set[int] = field(default_factory=set)
+    shards_done: dict[int, set[str]] = field(default_factory=dict)
+    id_bases: dict[int, uuid.UUID] = field(default_factory=dict)
+
+    def is_done(self, batch: int, shard_id: str | None = None) -> bool:
+        """Check whether a batch, or one shard's part of it, is committed."""
+        if batch < self.next_batch or batch in self.done:
+            return True
+        return shard_id is not None and shard_id in self.shards_done.get(batch, ())
+
+    def mark_done(self, batch: int) -> None:
+        """Record a committed batch."""
+        self.shards_done.pop(batch, None)
+        self.id_bases.pop(batch, None)
+        self.done.add(batch)
+        while self.next_batch in self.done:
+            self.done.remove(self.next_batch)
+            self.next_batch += 1
+
+    def mark_shard_done(self, batch: int, shard_id: str) -> None:
+        """Record that one shard committed its part of a batch."""
+        self.shards_done.setdefault(batch, set()).add(shard_id)
+
+    def item_id(self, batch: int, row: int) -> uuid.UUID:
+        """Return the item ID for a 1-based source row of ``batch``.
+
+        The batch's ID base is taken from the clock on first use, so its items
+        sort with those created while it loads, and kept until the batch is
+        committed, so a resumed run gives every row the same ID.
+        """
+        base = self.id_bases.setdefault(batch, uuid7())
+        high = base.int & ~((1 << _ROW_BITS) - 1)
+        return uuid.UUID(int=high | row)
+
+    def to_token(self) -> str:
+        """Serialize as ``batch_size:next_batch[:entries]``.
+
+        ``entries`` lists committed batches, then ``batch/shard`` for each
+        shard part of an unfinished batch, then ``batch@id_base`` for each
+        unfinished batch that was started.
+        """
+        token = f"{self.batch_size}:{self.next_batch}"
+        entries = [str(batch) for batch in sorted(self.done)]
+        entries += [
+            f"{batch}/{shard_id}"
+            for batch, shard_ids in sorted(self.shards_done.items())
+            for shard_id in sorted(shard_ids)
+        ]
+        entries += [
+            f"{batch}@{base.hex}" for batch, base in sorted(self.id_bases.items())
+        ]
+        if entries:
+            token += ":" + ",".join(entries)
+        return token
+
+    @classmethod
+    def from_token(cls, token: str) -> "ImportCheckpoint":
+        """Parse a token produced by ``to_token``.
+
+        Raises:
+            ImportFormatError: If the token is malformed.
+        """
+        try:
+            parts = token.split(":")
+            if len(parts) not in (2, 3):
+                raise ValueError(token)
+            checkpoint = cls(int(parts[0]), int(parts[1]))
+            for entry in parts[2].split(",") if len(parts) == 3 else ():
+                if "@" in entry:
+                    batch, _, base = entry.partition("@")
+                    checkpoint.id_bases[int(batch)] = uuid.UUID(base)
+                    continue
+                batch, _, shard_id = entry.partition("/")
+                if shard_id:
+                    checkpoint.mark_shard_done(int(batch), shard_id)
+                else:
+                    checkpoint.done.add(int(batch))
+        except ValueError as exc:
+            raise ImportFormatError(f"Invalid import checkpoint: {token!r}") from exc
+        if checkpoint.batch_size <= 0 or checkpoint.next_batch < 0:
+            raise ImportFormatError(f"Invalid import checkpoint: {token!r}")
+        return checkpoint
+
+
+@dataclass
+class ImportProgress:
+    """Running totals of an import."""
+
+    rows: int = 0
+    imported: int = 0
+    rejected: int = 0
+    skipped: int = 0
+    errors: list[RowError] = field(default_factory=list)
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the import started."""
+        return time.perf_counter() - self.started_at
+
+    def to_result(self, checkpoint: "ImportCheckpoint", complete: bool) -> ImportResult:
+        """Build the API summary of this import."""
+        return ImportResult(
+            rows=self.rows,
+            imported=self.imported,
+            rejected=self.rejected,
+            skipped=self.skipped,
+            errors=[ImportRowError(row=e.row, message=e.message) for e in self.errors],
+            checkpoint=checkpoint.to_token(),
+            complete=complete,
+            elapsed_seconds=round(self.elapsed, 3),
+        )
+
+
+class _NeedMoreLines(Exception):
+    """Raised to ``csv.reader`` when a record continues past the fed lines."""
+
+
+class _LineFeed(Iterator[str]):
+    """Line iterator for ``csv.reader`` that is fed from async code."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise _NeedMoreLines
+        return self.lines.popleft() + "\n"
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Any]:
+    header: list[str] | None = None
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    buffered: list[str] = []
+    async for line in lines:
+        buffered.append(line)
+        if len(buffered) == 1 and not line.strip():
+            buffered = []
+            continue
+        # Feed the record's lines again until csv.reader stops asking for
+        # more: it only does so inside a quoted field. A field that never
+        # closes ends at csv's field size limit and is reported.
+        feed.lines.extend(buffered)
+        try:
+            values = next(reader)
+        except _NeedMoreLines:
+            continue
+        except csv.Error as exc:
+            feed.lines.clear()
+            buffered = []
+            yield ParseError(f"Invalid CSV: {exc}")
+            continue
+        buffered = []
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            missing = {"name", "description"} - set(header)
+            if missing:
+                raise ImportFormatError(
+                    f"CSV header is missing column(s): {', '.join(sorted(missing))}"
+                )
+            continue
+        if len(values) != len(header):
+            yield ParseError(f"Expected {len(header)} fields, got {len(values)}")
+        else:
+            yield dict(zip(header, values, strict=True))
+    if buffered:
+        yield ParseError("Unterminated quoted field")
+
+
+async def _ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Any]:
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield ParseError(f"Invalid JSON: {exc.msg}")
+
+
+def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Any]:
+    """Parse a byte stream into records.
+
+    Each record is a ``dict`` (or any JSON value for NDJSON), or a
+    ``ParseError`` describing why it could not be parsed.
+
+    Raises:
+        ImportFormatError: If ``fmt`` is not supported.
+    """
+    if fmt == "csv":
+        return _csv_records(iter_lines(chunks))
+    if fmt == "ndjson":
+        return _ndjson_records(iter_lines(chunks))
+    raise ImportFormatError(
+        f"Unsupported import format {fmt!r}; expected one of {SUPPORTED_FORMATS}"
+    )
+
+
+def _describe(error: Any) -> str:
+    """Format a list validation error without its leading list index."""
+    where = ".".join(map(str, error["loc"][1:]))
+    return f"{where}: {error['msg']}" if where else error["msg"]
+
+
+def validate_batch(
+    records: list[Any], first_row: int
+) -> tuple[list[ItemCreate], list[RowError]]:
+    """Validate a batch of parsed records.
+
+    Args:
+        records: Parsed records (or ``ParseError``) in source order.
+        first_row: 1-based row number of the first record.
+
+    Returns:
+        The valid items and one error per rejected record.
+    """
+    errors = [
+        RowError(first_row + index, record.message)
+        for index, record in enumerate(records)
+        if isinstance(record, ParseError)
+    ]
+    candidates = [
+        (first_row + index, record)
+        for index, record in enumerate(records)
+        if not isinstance(record, ParseError)
+    ]
+    try:
+        return _items_adapter.validate_python([r for _, r in candidates]), errors
+    except ValidationError as exc:
+        # Rare slow path: keep the valid records and report the rest.
+        invalid: dict[int | str, str] = {}
+        for error in exc.errors():
+            invalid.setdefault(error["loc"][0], _describe(error))
+
+    items = []
+    for index, (row, record) in enumerate(candidates):
+        if index in invalid:
+            errors.append(RowError(row, invalid[index]))
+        else:
+            items.append(ItemCreate.model_validate(record))
+    errors.sort(key=lambda error: error.row)
+    return items, errors
+
+
+def _item_rows(
+    items: list[ItemCreate], ids: Sequence[uuid.UUID] | None
+) -> list[tuple[Any, ...]]:
+    now = datetime.now(UTC)
+    if ids is None:
+        ids = [uuid7() for _ in items]
+    return [
+        (item_id, item.name, item.description, 1, now)
+        for item_id, item in zip(ids, items, strict=True)
+    ]
+
+
+async def load_items(
+    session: AsyncSession,
+    items: list[ItemCreate],
+    ids: Sequence[uuid.UUID] | None = None,
+) -> None:
+    """Insert items in the session's transaction using the fastest path.
+
+    PostgreSQL through asyncpg uses ``COPY``; other databases use a single
+    executemany ``INSERT``, and the item counter is updated in the same
+    transaction. With item sharding, rows are split by owning shard and each
+    shard gets its own ``COPY`` or ``INSERT``; the shards commit separately,
+    so a batch is only atomic per shard.
+
+    Args:
+        session: Session whose transaction the rows are inserted in.
+        items: Validated items.
+        ids: IDs for the items; new UUIDv7 values by default.
+    """
+    rows = _item_rows(items, ids)
+    router = item_shard_router(session)
+    if router is None:
+        await _load_rows(session, rows, {})
+        return
+    by_shard: dict[str, list[tuple[Any, ...]]] = {}
+    for row in rows:
+        by_shard.setdefault(router.shard_for(row[0]), []).append(row)
+    for shard_id, shard_rows in by_shard.items():
+        await _load_rows(session, shard_rows, {"shard_id": shard_id})
+
+
+async def _load_rows(
+    session: AsyncSession, rows: list[tuple[Any, ...]], bind_arguments: dict[str, Any]
+) -> None:
+    connection = await session.connection(bind_arguments=bind_arguments)
+    if (
+        connection.dialect.name == "postgresql"
+        and connection.dialect.driver == "asyncpg"
+    ):
+        raw = await connection.get_raw_connection()
+        driver_connection: Any = raw.driver_connection
+        await driver_connection.copy_records_to_table(
+            Item.__tablename__, records=rows, columns=_ITEM_COLUMNS
+        )
+    else:
+        # A Core executemany on the shard's connection; the ORM bulk INSERT
+        # path does not support sharded sessions.
+        await connection.execute(
+            insert(Item),
+            [dict(zip(_ITEM_COLUMNS, row, strict=True)) for row in rows],
+        )
+    await add_to_item_count(connection, len(rows))
+
+
+class ItemImporter:
+    """Streams records into the items table in parallel batches.
+
+    Args:
+        session_factory: Factory for the session each batch is loaded with.
+        batch_size: Records per batch and transaction.
+        parallelism: Maximum number of batches loading at once.
+        max_errors: Maximum number of row errors kept for reporting; all
+            rejections are still counted.
+        checkpoint: Checkpoint of an earlier, interrupted run of the same
+            source. Its batch size takes precedence over ``batch_size``.
+        on_progress: Called after every committed batch.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        *,
+        batch_size: int = 5000,
+        parallelism: int = 4,
+        max_errors: int = 100,
+        checkpoint: ImportCheckpoint | None = None,
+        on_progress: Callable[[ImportProgress, ImportCheckpoint], None] | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.checkpoint = checkpoint or ImportCheckpoint(batch_size)
+        self.batch_size = self.checkpoint.batch_size
+        self.max_errors = max_errors
+        self.on_progress = on_progress
+        self.progress = ImportProgress()
+        self._slots = asyncio.Semaphore(max(1, parallelism))
+        self._loading: set[asyncio.Task[None]] = set()
+        self._failure: BaseException | None = None
+
+    async def run(self, chunks: AsyncIterator[bytes], fmt: str) -> ImportProgress:
+        """Import every record of a byte stream.
+
+        Args:
+            chunks: Source bytes, in any chunking.
+            fmt: ``"csv"`` (with a header row) or ``"ndjson"``.
+
+        Returns:
+            The final totals.
+
+        Raises:
+            ImportFormatError: If the format or CSV header is invalid.
+            ImportFailed: If a batch could not be loaded.
+        """
+        batch: list[Any] = []
+        try:
+            async for record in iter_records(chunks, fmt):
+                batch.append(record)
+                self.progress.rows += 1
+                if len(batch) == self.batch_size:
+                    await self._dispatch(batch)
+                    batch = []
+                if self._failure is not None:
+                    break
+            else:
+                if batch:
+                    await self._dispatch(batch)
+        finally:
+            if self._loading:
+                await asyncio.wait(self._loading)
+
+        if self._failure is not None:
+            raise ImportFailed(self.progress, self.checkpoint) from self._failure
+        return self.progress
+
+    async def _dispatch(self, records: list[Any]) -> None:
+        """Validate a full batch and start loading it once a slot is free."""
+        first_row = self.progress.rows - len(records) + 1
+        index = (first_row - 1) // self.batch_size
+        if self.checkpoint.is_done(index):
+            self.progress.skipped += len(records)
+            return
+
+        # Validation is CPU-bound; keep the event loop serving requests.
+        items, errors = await asyncio.to_thread(validate_batch, records, first_row)
+        self.progress.rejected += len(errors)
+        room = self.max_errors - len(self.progress.errors)
+        self.progress.errors.extend(errors[: max(0, room)])
+        rejected_rows = {error.row for error in errors}
+
+        await self._slots.acquire()
+        if self._failure is not None:
+            self._slots.release()
+            return
+        # IDs are taken now, just before loading, so imported items do not
+        # sort before items created while earlier batches were loading.
+        ids = [
+            self.checkpoint.item_id(index, row)
+            for row in range(first_row, first_row + len(records))
+            if row not in rejected_rows
+        ]
+        task = asyncio.get_running_loop().create_task(self._load(index, items, ids))
+        self._loading.add(task)
+        task.add_done_callback(self._loading.discard)
+
+    async def _by_shard(
+        self, items: list[ItemCreate], ids: list[uuid.UUID]
+    ) -> dict[str | None, tuple[list[ItemCreate], list[uuid.UUID]]]:
+        """Group a batch by owning shard; one group keyed None when unsharded."""
+        async with self.session_factory() as session:
+            router = item_shard_router(session)
+        if router is None:
+            return {None: (items, ids)}
+        groups: dict[str | None, tuple[list[ItemCreate], list[uuid.UUID]]] = {}
+        for item, item_id in zip(items, ids, strict=True):
+            group = groups.setdefault(router.shard_for(item_id), ([], []))
+            group[0].append(item)
+            group[1].append(item_id)
+        return groups
+
+    async def _load(
+        self, index: int, items: list[ItemCreate], ids: list[uuid.UUID]
+    ) -> None:
+        try:
+            groups = await self._by_shard(items, ids) if items else {}
+            for shard_id, (shard_items, shard_item_ids) in groups.items():
+                # Shards commit separately, so each shard's part of the batch
+                # is checkpointed on its own and skipped when resuming.
+                if self.checkpoint.is_done(index, shard_id):
+                    self.progress.skipped += len(shard_items)
+                    continue
+                async with self.session_factory() as session:
+                    await load_items(session, shard_items, shard_item_ids)
+                    for item_id, item in zip(shard_item_ids, shard_items, strict=True):
+                        publish_on_commit(
+                            session,
+                            ItemEvent.created(
+                                ItemResponse(
+                                    id=item_id,
+                                    name=item.name,
+                                    description=item.description,
+                                )
+                            ),
+                        )
+                    await session.commit()
+                self.progress.imported += len(shard_items)
+                if shard_id is not None:
+                    self.checkpoint.mark_shard_done(index, shard_id)
+        except Exception as exc:
+            logger.exception("Failed to load import batch %d", index)
+            if self._failure is None:
+                self._failure = exc
+            return
+        finally:
+            self._slots.release()
+
+        self.checkpoint.mark_done(index)
+        if self.on_progress is not None:
+            self.on_progress(self.progress, self.checkpoint)
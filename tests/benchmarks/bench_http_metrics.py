@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Compare per-request overhead of HTTP metrics instrumentation.
+
+Drives the same small FastAPI app through ASGI directly, without a server or
+network, once bare, once with prometheus-fastapi-instrumentator's defaults
+and once with ``HttpMetricsMiddleware``. The instrumentator is a development
+dependency (``requirements-dev.txt``).
+
+Usage:
+    PYTHONPATH=src python tests/benchmarks/bench_http_metrics.py
+"""
+
+import asyncio
+import time
+from typing import Any
+
+from fastapi import FastAPI
+from prometheus_client import CollectorRegistry
+from prometheus_fastapi_instrumentator import Instrumentator
+
+from app.core.config import get_settings
+from app.core.http_metrics import HttpMetrics, HttpMetricsMiddleware
+
+REQUESTS = 20_000
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str) -> dict[str, str]:
+        return {"id": item_id}
+
+    for index in range(20):
+        # Other routes, so route matching is not trivially short.
+        app.get(f"/other{index}/{{key}}")(lambda key: key)
+    return app
+
+
+def _apps() -> dict[str, Any]:
+    bare = _build_app()
+
+    instrumented = _build_app()
+    Instrumentator(registry=CollectorRegistry()).instrument(instrumented)
+
+    custom = _build_app()
+    custom.add_middleware(
+        HttpMetricsMiddleware,
+        metrics=HttpMetrics(
+            get_settings().http_metrics_buckets, registry=CollectorRegistry()
+        ),
+        routes=custom.routes,
+    )
+
+    sampled = _build_app()
+    sampled.add_middleware(
+        HttpMetricsMiddleware,
+        metrics=HttpMetrics(
+            get_settings().http_metrics_buckets, registry=CollectorRegistry()
+        ),
+        routes=sampled.routes,
+        size_sample_rate=0.01,
+    )
+    return {
+        "bare": bare,
+        "instrumentator": instrumented,
+        "HttpMetricsMiddleware": custom,
+        "HttpMetricsMiddleware 1% sizes": sampled,
+    }
+
+
+async def _request(app: Any, path: str) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"content-length", b"0")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        pass
+
+    await app(scope, receive, send)
+
+
+async def _time(app: Any, path: str) -> float:
+    """Return the best mean time per request in microseconds over 3 runs."""
+    for _ in range(500):
+        await _request(app, path)
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            await _request(app, path)
+        best = min(best, (time.perf_counter() - started) / REQUESTS * 1e6)
+    return best
+
+
+async def main() -> None:
+    """Print per-request time and overhead over the bare app."""
+    apps = _apps()
+    header = f"{'app':<32}{'path':<14}{'us/request':>12}{'overhead us':>13}"
+    print(header)
+    print("-" * len(header))
+    for path in ("/items/42", "/missing/42"):
+        bare_us = await _time(apps["bare"], path)
+        for name, app in apps.items():
+            us = bare_us if name == "bare" else await _time(app, path)
+            print(f"{name:<32}{path:<14}{us:>12.1f}{us - bare_us:>13.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Measure per-query CPU for item lookups with and without statement reuse.
+
+Variants:
+    rebuilt, no cache   select(Item).where(...) built per call, compiled cache off
+    rebuilt, cached     select(Item).where(...) built per call (previous code)
+    prebuilt, cached    repository.ITEM_BY_ID with a bound parameter
+
+Runs the lookups against an in-memory SQLite database through the sync ORM so
+driver I/O stays negligible and the difference is SQLAlchemy CPU time.
+
+Usage:
+    PYTHONPATH=src python tests/benchmarks/bench_statement_cache.py [lookups]
+"""
+
+import sys
+import time
+from collections.abc import Callable
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+from app.db.models import Item
+from app.db.repository import ITEM_BY_ID
+
+LOOKUPS = 20_000
+
+
+def _measure(
+    name: str, query_cache_size: int, lookup: Callable[[Session, object], object]
+) -> float:
+    engine = create_engine("sqlite://", query_cache_size=query_cache_size)
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        items = [Item(name=f"item {i}", description="bench") for i in range(100)]
+        session.add_all(items)
+        session.commit()
+        keys = [item.id for item in items]
+
+        lookups = int(sys.argv[1]) if len(sys.argv) > 1 else LOOKUPS
+        start = time.process_time()
+        for i in range(lookups):
+            lookup(session, keys[i % len(keys)])
+            session.expunge_all()
+        per_query = (time.process_time() - start) / lookups * 1e6
+    engine.dispose()
+    print(f"{name:<22}{per_query:>10.1f} us")
+    return per_query
+
+
+def main() -> None:
+    """Run all variants and print CPU microseconds per lookup."""
+
+    def rebuilt(session: Session, key: object) -> object:
+        return session.execute(select(Item).where(Item.id == key)).scalar_one()
+
+    def prebuilt(session: Session, key: object) -> object:
+        return session.execute(ITEM_BY_ID, {"item_id": key}).scalar_one()
+
+    print(f"{'variant':<22}{'cpu/query':>13}")
+    uncached = _measure("rebuilt, no cache", 0, rebuilt)
+    cached = _measure("rebuilt, cached", 500, rebuilt)
+    reused = _measure("prebuilt, cached", 500, prebuilt)
+    print(
+        f"\nprebuilt saves {cached - reused:.1f} us/query vs rebuilt, "
+        f"{uncached - reused:.1f} us/query vs uncached compilation"
+    )
+
+
+if __name__ == "__main__":
+    main()
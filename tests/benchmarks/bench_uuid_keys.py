@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare insert throughput and index size for item primary-key layouts.
+
+Variants:
+    text-v4    String(36) keys from uuid4 (the previous layout)
+    binary-v4  16-byte keys from uuid4
+    binary-v7  16-byte keys from time-ordered uuid7 (the current layout)
+
+Each variant inserts ROWS items into a fresh SQLite file in small
+transactions, then reports rows/s and the size of the primary-key index.
+
+Usage:
+    PYTHONPATH=src python tests/benchmarks/bench_uuid_keys.py [rows]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+
+from app.db.types import uuid7
+
+ROWS = 200_000
+BATCH = 100
+
+
+def _run(
+    name: str, column_type: str, make_key: Callable[[], object], rows: int
+) -> None:
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute(
+            f"CREATE TABLE items (id {column_type} PRIMARY KEY, name TEXT,"
+            " description TEXT)"
+        )
+        start = time.perf_counter()
+        for _ in range(rows // BATCH):
+            conn.executemany(
+                "INSERT INTO items VALUES (?, ?, ?)",
+                [(make_key(), "item", "benchmark row") for _ in range(BATCH)],
+            )
+            conn.commit()
+        elapsed = time.perf_counter() - start
+
+        index = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+            " AND tbl_name = 'items'"
+        ).fetchone()[0]
+        try:
+            pages = conn.execute(
+                "SELECT count(*) FROM dbstat WHERE name = ?", (index,)
+            ).fetchone()[0]
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            index_size = f"{pages * page_size / 1024:>10.0f} KiB"
+        except sqlite3.OperationalError:
+            index_size = "   (no dbstat)"
+        conn.close()
+        file_size = os.path.getsize(path) / 1024
+        print(
+            f"{name:<11}{rows / elapsed:>12.0f}{index_size:>16}"
+            f"{file_size:>12.0f} KiB"
+        )
+    finally:
+        os.unlink(path)
+
+
+def main() -> None:
+    """Run all variants and print a comparison table."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    print(f"{'variant':<11}{'rows/s':>12}{'pk index':>16}{'file':>16}")
+    _run("text-v4", "VARCHAR(36)", lambda: str(uuid.uuid4()), rows)
+    _run("binary-v4", "BLOB", lambda: uuid.uuid4().bytes, rows)
+    _run("binary-v7", "BLOB", lambda: uuid7().bytes, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Compare JSON and MessagePack payload size and encode/decode time.
+
+Usage:
+    PYTHONPATH=src python tests/benchmarks/bench_wire_formats.py
+"""
+
+import json
+import timeit
+import uuid
+from collections.abc import Callable
+from typing import Any
+
+from app.api.wire import packb, unpackb
+from app.models.schemas import CalculateRequest, ItemResponse
+
+ROUNDS = 2000
+
+
+def _payloads() -> dict[str, Any]:
+    item = ItemResponse(
+        id=str(uuid.uuid4()), name="Widget", description="A reasonably sized text."
+    ).model_dump(mode="json")
+    return {
+        "CalculateRequest": CalculateRequest(
+            a=12.5, b=3, operation="multiply"
+        ).model_dump(mode="json"),
+        "ItemResponse": item,
+        "list[ItemResponse] x1000": [item] * 1000,
+    }
+
+
+def _json_dumps(content: Any) -> bytes:
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def _time(func: Callable[[], object], rounds: int) -> float:
+    """Return the best per-call time in microseconds over three repeats."""
+    return min(timeit.repeat(func, number=rounds, repeat=3)) / rounds * 1e6
+
+
+def main() -> None:
+    """Print a comparison table for each payload."""
+    header = (
+        f"{'payload':<26}{'format':<10}{'bytes':>9}{'encode us':>12}{'decode us':>12}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, content in _payloads().items():
+        rounds = ROUNDS if not name.startswith("list") else ROUNDS // 100
+        for fmt, dumps, loads in (
+            ("json", _json_dumps, json.loads),
+            ("msgpack", packb, unpackb),
+        ):
+            encoded = dumps(content)
+            encode_us = _time(lambda d=dumps, c=content: d(c), rounds)
+            decode_us = _time(lambda lo=loads, e=encoded: lo(e), rounds)
+            print(
+                f"{name:<26}{fmt:<10}{len(encoded):>9}"
+                f"{encode_us:>12.2f}{decode_us:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,13 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 
-from app.db.database import Base, get_db
+from app.db.database import (
+    Base,
+    ReadOnlySession,
+    get_db,
+    get_read_db,
+    get_session_factory,
+)
 from app.main import app
 
 # Create a temporary file for SQLite database
@@ -33,6 +39,13 @@ TestingSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+TestingReadOnlySessionLocal = async_sessionmaker(
+    async_engine,
+    class_=ReadOnlySession,
+    expire_on_commit=False,
+    autoflush=False,
+)
+
 # Sync engine for table creation (TestClient runs in sync context)
 SYNC_DATABASE_URL = f"sqlite:///{_db_path}"
 
@@ -53,6 +66,12 @@ async def override_get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+async def override_get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Override read-only database dependency for testing."""
+    async with TestingReadOnlySessionLocal() as session:
+        yield session
+
+
 @pytest.fixture(autouse=True)
 def setup_test_db():
     """Create tables before each test and drop after."""
@@ -72,6 +91,8 @@ def setup_test_db():
 def client() -> TestClient:
     """Create a test client for the FastAPI application."""
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
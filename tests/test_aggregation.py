@@ -0,0 +1,223 @@
+"""Tests for streaming statistical aggregation."""
+
+import math
+import random
+import statistics
+import struct
+from collections.abc import AsyncIterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.aggregation import (
+    AggregationError,
+    RunningStats,
+    TDigest,
+    aggregate,
+)
+
+
+async def _chunks(data: bytes, size: int = 5) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _float64(values: list[float]) -> bytes:
+    return struct.pack(f"<{len(values)}d", *values)
+
+
+class TestRunningStats:
+    """Tests for Welford's running statistics."""
+
+    def test_single_values_and_batches_agree(self) -> None:
+        """Test that per-value and batched updates give the same results."""
+        values = [random.Random(1).uniform(-100, 100) for _ in range(1000)]
+        one_by_one, batched = RunningStats(), RunningStats()
+        for value in values:
+            one_by_one.add(value)
+        for start in range(0, len(values), 64):
+            batched.update(values[start : start + 64])
+
+        for stats in (one_by_one, batched):
+            assert stats.count == 1000
+            assert stats.mean == pytest.approx(statistics.fmean(values))
+            assert stats.variance == pytest.approx(statistics.variance(values))
+            assert stats.sum == pytest.approx(math.fsum(values))
+            assert (stats.minimum, stats.maximum) == (min(values), max(values))
+
+    def test_variance_is_stable_for_large_offsets(self) -> None:
+        """Test that a large mean does not swamp a small variance."""
+        stats = RunningStats()
+        stats.update([1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16])
+        assert stats.variance == pytest.approx(30.0)
+
+    def test_variance_needs_two_values(self) -> None:
+        """Test that the sample variance is undefined for one value."""
+        stats = RunningStats()
+        stats.add(3.0)
+        assert stats.variance is None
+
+    def test_overflow_leaves_state_unchanged(self) -> None:
+        """Test that a sum or variance out of float range is refused."""
+        stats = RunningStats()
+        stats.update([1.0, 2.0])
+        with pytest.raises(OverflowError):
+            stats.update([1e308, 1e308])
+        with pytest.raises(OverflowError):
+            stats.add(1e160)
+        assert (stats.count, stats.sum, stats.variance) == (2, 3.0, 0.5)
+
+
+class TestTDigest:
+    """Tests for the quantile sketch."""
+
+    def test_quantiles_are_accurate_in_bounded_memory(self) -> None:
+        """Test quantile error and centroid count on a large uniform sample."""
+        rng = random.Random(7)
+        values = [rng.random() for _ in range(50_000)]
+        digest = TDigest(compression=100)
+        digest.update(values)
+        ordered = sorted(values)
+
+        assert digest.centroid_count <= 100
+        for q in (0.001, 0.01, 0.25, 0.5, 0.75, 0.99, 0.999):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            assert digest.quantile(q) == pytest.approx(exact, abs=0.005)
+        assert digest.quantile(0) == ordered[0]
+        assert digest.quantile(1) == ordered[-1]
+
+    def test_small_inputs_interpolate(self) -> None:
+        """Test that a few values interpolate between the exact points."""
+        digest = TDigest()
+        for value in (1.0, 2.0, 3.0):
+            digest.add(value)
+        assert [digest.quantile(q) for q in (0, 0.5, 1)] == [1.0, 2.0, 3.0]
+
+    def test_empty_and_invalid(self) -> None:
+        """Test the empty digest and out-of-range quantiles."""
+        digest = TDigest()
+        assert digest.quantile(0.5) is None
+        with pytest.raises(ValueError):
+            digest.quantile(1.5)
+
+
+class TestAggregate:
+    """Tests for parsing streamed input."""
+
+    @pytest.mark.asyncio
+    async def test_float64_values_split_across_chunks(self) -> None:
+        """Test that doubles spanning chunk boundaries are reassembled."""
+        result = await aggregate(_chunks(_float64([1.5, -2.0, 4.5]), 3), "float64")
+        assert (result.stats.count, result.stats.sum) == (3, 4.0)
+
+    @pytest.mark.asyncio
+    async def test_float64_trailing_bytes(self) -> None:
+        """Test that a truncated double is rejected."""
+        with pytest.raises(AggregationError):
+            await aggregate(_chunks(_float64([1.0]) + b"\x00"), "float64")
+
+    @pytest.mark.asyncio
+    async def test_ndjson_numbers(self) -> None:
+        """Test that integers, floats and blank lines are accepted."""
+        result = await aggregate(_chunks(b"1\n2.5\n\n-3e1\n"), "ndjson")
+        assert (result.stats.count, result.stats.minimum) == (3, -30.0)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("line", [b'"1"', b"true", b"[1]", b"NaN", b"oops"])
+    async def test_ndjson_rejects_non_numbers(self, line: bytes) -> None:
+        """Test that anything but a finite JSON number is refused."""
+        with pytest.raises(AggregationError):
+            await aggregate(_chunks(b"1\n" + line + b"\n"), "ndjson")
+
+    @pytest.mark.asyncio
+    async def test_float64_rejects_non_finite(self) -> None:
+        """Test that NaN and infinity are reported with their position."""
+        with pytest.raises(AggregationError, match="Value 3 "):
+            await aggregate(_chunks(_float64([1.0, 2.0, math.inf])), "float64")
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("body", "message"),
+        [
+            (b"1e308\n1e308\n", "Value 2 is out of range"),
+            (b"1e160\n-1e160\n", "Value 2 is out of range"),
+            (b"1\n" + b"9" * 401 + b"\n", "Line 2 is out of the range"),
+            (b"1\n" + b"9" * 5000 + b"\n", "Line 2 is out of the range"),
+        ],
+    )
+    async def test_overflow_is_reported_with_its_position(
+        self, body: bytes, message: str
+    ) -> None:
+        """Test that finite input overflowing a float is a reported error."""
+        with pytest.raises(AggregationError, match=message):
+            await aggregate(_chunks(body), "ndjson")
+
+
+class TestAggregateEndpoint:
+    """Tests for POST /api/v1/calculate/aggregate."""
+
+    def test_ndjson_body(self, client: TestClient) -> None:
+        """Test the statistics of an NDJSON body."""
+        response = client.post(
+            "/api/v1/calculate/aggregate?q=0&q=0.5&q=1",
+            content=b"2\n4\n4\n4\n5\n5\n7\n9\n",
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["count"], data["sum"], data["mean"]) == (8, 40.0, 5.0)
+        assert data["variance"] == pytest.approx(32 / 7)
+        assert data["stddev"] == pytest.approx(math.sqrt(32 / 7))
+        assert (data["min"], data["max"]) == (2.0, 9.0)
+        assert [(e["q"], e["value"]) for e in data["quantiles"]] == [
+            (0.0, 2.0),
+            (0.5, 4.5),
+            (1.0, 9.0),
+        ]
+
+    def test_binary_body(self, client: TestClient) -> None:
+        """Test that a packed float64 body is streamed in."""
+        values = [float(i) for i in range(10_000)]
+        response = client.post(
+            "/api/v1/calculate/aggregate",
+            content=_float64(values),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+
+        data = response.json()
+        assert data["count"] == 10_000
+        assert data["mean"] == pytest.approx(4999.5)
+        assert data["quantiles"][0]["value"] == pytest.approx(4999.5, rel=0.01)
+
+    def test_empty_body(self, client: TestClient) -> None:
+        """Test that an empty stream has no statistics beyond its count."""
+        response = client.post("/api/v1/calculate/aggregate?format=ndjson")
+
+        data = response.json()
+        assert (data["count"], data["sum"], data["mean"]) == (0, 0.0, None)
+        assert data["quantiles"][0]["value"] is None
+
+    def test_invalid_input(self, client: TestClient) -> None:
+        """Test that malformed input and quantiles are client errors."""
+        bad_line = client.post(
+            "/api/v1/calculate/aggregate?format=ndjson", content=b"1\nx\n"
+        )
+        overflow = client.post(
+            "/api/v1/calculate/aggregate?format=ndjson", content=b"1e308\n1e308\n"
+        )
+        bad_quantile = client.post(
+            "/api/v1/calculate/aggregate?format=ndjson&q=2", content=b"1\n"
+        )
+        unknown = client.post(
+            "/api/v1/calculate/aggregate",
+            content=b"1",
+            headers={"Content-Type": "text/plain"},
+        )
+
+        assert bad_line.status_code == 400
+        assert bad_line.json()["detail"] == "Line 2 is not a JSON number"
+        assert overflow.status_code == 400
+        assert overflow.json()["detail"].startswith("Value 2 is out of range")
+        assert bad_quantile.status_code == 400
+        assert unknown.status_code == 415
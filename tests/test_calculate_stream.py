@@ -0,0 +1,92 @@
+"""Tests for the streaming calculator WebSocket."""
+
+import json
+
+import msgpack
+from fastapi.testclient import TestClient
+
+WS_URL = "/api/v1/calculate/ws"
+
+
+class TestCalculateStream:
+    """Tests for /api/v1/calculate/ws."""
+
+    def test_replies_carry_correlation_ids(self, client: TestClient) -> None:
+        """Test that pipelined messages are answered in order with their IDs."""
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": "a", "a": 1, "b": 2, "operation": "add"})
+            ws.send_json({"id": 7, "a": 6, "b": 7, "operation": "multiply"})
+            first = ws.receive_json()
+            second = ws.receive_json()
+
+        assert first == {
+            "id": "a",
+            "a": 1,
+            "b": 2,
+            "operation": "add",
+            "result": 3,
+        }
+        assert second["id"] == 7
+        assert second["result"] == 42
+
+    def test_errors_are_reported_per_message(self, client: TestClient) -> None:
+        """Test that bad messages get an error reply without closing the stream."""
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "a": 1, "b": 0, "operation": "divide"})
+            ws.send_json({"id": 2, "a": 1, "operation": "add"})
+            ws.send_text("not json")
+            ws.send_json({"id": 3, "a": 9, "b": 3, "operation": "divide"})
+            replies = [ws.receive_json() for _ in range(4)]
+
+        assert replies[0] == {"id": 1, "detail": "Cannot divide by zero"}
+        assert replies[1]["id"] == 2
+        assert replies[1]["detail"][0]["loc"] == ["b"]
+        assert replies[2]["id"] is None
+        assert replies[3]["result"] == 3.0
+
+    def test_client_side_batch_frame(self, client: TestClient) -> None:
+        """Test that a frame holding a list of messages is fully answered."""
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json(
+                [{"id": i, "a": i, "b": 1, "operation": "subtract"} for i in range(3)]
+            )
+            replies = [ws.receive_json() for _ in range(3)]
+
+        assert [reply["result"] for reply in replies] == [-1, 0, 1]
+
+    def test_micro_batched_replies(self, client: TestClient) -> None:
+        """Test that max_batch coalesces replies into list frames."""
+        with client.websocket_connect(
+            f"{WS_URL}?max_batch=10&batch_window_ms=50"
+        ) as ws:
+            ws.send_json(
+                [{"id": i, "a": i, "b": i, "operation": "add"} for i in range(5)]
+            )
+            received: list[dict] = []
+            while len(received) < 5:
+                frame = ws.receive_json()
+                assert isinstance(frame, list)
+                received.extend(frame)
+
+        assert [reply["id"] for reply in received] == list(range(5))
+        assert [reply["result"] for reply in received] == [0, 2, 4, 6, 8]
+
+    def test_binary_frames_use_msgpack(self, client: TestClient) -> None:
+        """Test that binary frames are decoded and answered as MessagePack."""
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_bytes(
+                msgpack.packb({"id": "m", "a": 2.5, "b": 2, "operation": "multiply"})
+            )
+            reply = msgpack.unpackb(ws.receive_bytes())
+
+        assert reply["id"] == "m"
+        assert reply["result"] == 5.0
+
+    def test_overflowing_result_is_json_null(self, client: TestClient) -> None:
+        """Test that a non-finite result is sent as null, as over HTTP."""
+        with client.websocket_connect(WS_URL) as ws:
+            ws.send_json({"id": 1, "a": 1e308, "b": 1e308, "operation": "multiply"})
+            text = ws.receive_text()
+
+        assert "Infinity" not in text
+        assert json.loads(text)["result"] is None
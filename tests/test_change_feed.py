@@ -0,0 +1,326 @@
+"""Tests for the item change feed and its SSE stream."""
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.routes import _replay_pages
+from app.db import repository
+from app.db.types import uuid7
+from app.models.schemas import ItemResponse
+from app.services import change_feed
+from app.services.change_feed import (
+    ChangeFeed,
+    InMemoryTransport,
+    ItemEvent,
+    PostgresNotifyTransport,
+    Subscription,
+    SubscriptionEnded,
+    item_event_stream,
+    publish_on_commit,
+    resume_cursor,
+)
+from tests.conftest import TestingReadOnlySessionLocal, TestingSessionLocal
+
+
+def _event(name: str = "item") -> ItemEvent:
+    return ItemEvent.created(ItemResponse(id=uuid7(), name=name, description="d"))
+
+
+async def _pages(*pages: list[ItemEvent]) -> AsyncIterator[list[ItemEvent]]:
+    for page in pages:
+        yield page
+
+
+async def _collect(stream: AsyncIterator[str]) -> list[str]:
+    return [message async for message in stream]
+
+
+class TestSubscription:
+    """Tests for bounded per-subscriber buffers."""
+
+    @pytest.mark.asyncio
+    async def test_overflow_drains_then_ends(self) -> None:
+        """Test that a full buffer keeps its events and then ends."""
+        subscription = Subscription(buffer_size=2)
+        first, second, third = _event("1"), _event("2"), _event("3")
+        for item_event in (first, second, third):
+            subscription.offer(item_event)
+
+        assert subscription.overflowed
+        assert await subscription.next_event(1) == first
+        assert await subscription.next_event(1) == second
+        with pytest.raises(SubscriptionEnded) as ended:
+            await subscription.next_event(1)
+        assert ended.value.reason == "overflow"
+
+    @pytest.mark.asyncio
+    async def test_interrupt_drains_then_ends(self) -> None:
+        """Test that an interrupted subscription keeps its events and then ends."""
+        subscription = Subscription(buffer_size=2)
+        buffered = _event()
+        subscription.offer(buffered)
+        subscription.interrupt()
+        subscription.offer(_event())
+
+        assert await subscription.next_event(1) == buffered
+        with pytest.raises(SubscriptionEnded) as ended:
+            await subscription.next_event(1)
+        assert ended.value.reason == "interrupted"
+
+    @pytest.mark.asyncio
+    async def test_timeout_returns_none(self) -> None:
+        """Test that an idle subscription times out for heartbeats."""
+        assert await Subscription(buffer_size=1).next_event(0.01) is None
+
+
+class TestChangeFeed:
+    """Tests for in-process fan-out."""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_to_all_subscribers(self) -> None:
+        """Test that every subscriber receives published events."""
+        feed = ChangeFeed(InMemoryTransport(), buffer_size=4)
+        await feed.start()
+        a, b = feed.subscribe(), feed.subscribe()
+        item_event = _event()
+
+        await feed.transport.publish(item_event)
+        assert await a.next_event(1) == item_event
+        assert await b.next_event(1) == item_event
+
+        feed.unsubscribe(b)
+        assert feed.subscriber_count == 1
+        await feed.stop()
+        with pytest.raises(SubscriptionEnded):
+            await a.next_event(1)
+
+    @pytest.mark.asyncio
+    async def test_publishes_only_after_commit(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that events are published on commit and dropped on rollback."""
+        feed = ChangeFeed(InMemoryTransport(), buffer_size=4)
+        await feed.start()
+        monkeypatch.setattr(change_feed, "get_change_feed", lambda: feed)
+        subscription = feed.subscribe()
+
+        async with TestingSessionLocal() as session:
+            await repository.create_item(session, "rolled back", "d")
+            publish_on_commit(session, _event("rolled back"))
+            await session.rollback()
+            await repository.create_item(session, "committed", "d")
+            committed = _event("committed")
+            publish_on_commit(session, committed)
+            await asyncio.sleep(0)
+            assert await subscription.next_event(0.01) is None
+            await session.commit()
+
+        assert await subscription.next_event(1) == committed
+        assert await subscription.next_event(0.01) is None
+
+
+class TestItemEventStream:
+    """Tests for the SSE message stream."""
+
+    @pytest.mark.asyncio
+    async def test_replay_then_live_without_duplicates(self) -> None:
+        """Test that live events already covered by the replay are skipped."""
+        old, replayed, live = _event("old"), _event("replayed"), _event("live")
+        subscription = Subscription(buffer_size=4)
+        subscription.offer(replayed)
+        subscription.offer(live)
+        subscription.close()
+
+        messages = await _collect(
+            item_event_stream(subscription, _pages([replayed]), heartbeat_seconds=1)
+        )
+
+        assert messages[0] == "retry: 1000\n\n"
+        assert messages[1:] == [replayed.to_sse(), live.to_sse()]
+        assert old.to_sse() not in messages
+
+    @pytest.mark.asyncio
+    async def test_late_commit_with_smaller_id_is_delivered(self) -> None:
+        """Test that a live event older than the replay is not dropped."""
+        late, replayed = _event("late"), _event("replayed")
+        subscription = Subscription(buffer_size=4)
+        subscription.offer(replayed)
+        subscription.offer(late)
+        subscription.close()
+
+        messages = await _collect(
+            item_event_stream(
+                subscription,
+                _pages([replayed]),
+                heartbeat_seconds=1,
+                overlap_seconds=5,
+            )
+        )
+
+        assert messages[1:] == [replayed.to_sse(), late.to_sse()]
+
+    @pytest.mark.asyncio
+    async def test_overflow_sends_reset(self) -> None:
+        """Test that a slow subscriber is told to reconnect."""
+        subscription = Subscription(buffer_size=1)
+        subscription.offer(_event())
+        subscription.offer(_event())
+
+        messages = await _collect(
+            item_event_stream(subscription, _pages(), heartbeat_seconds=1)
+        )
+        assert messages[-1] == "event: reset\ndata: {}\n\n"
+
+    @pytest.mark.asyncio
+    async def test_interrupt_sends_reset(self) -> None:
+        """Test that subscribers are told to reconnect when the feed lost events."""
+        feed = ChangeFeed(InMemoryTransport(), buffer_size=4)
+        subscription = feed.subscribe()
+        feed.interrupt()
+
+        messages = await _collect(
+            item_event_stream(subscription, _pages(), heartbeat_seconds=1)
+        )
+        assert messages[-1] == "event: reset\ndata: {}\n\n"
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_when_idle(self) -> None:
+        """Test that idle streams emit keep-alive comments."""
+        subscription = Subscription(buffer_size=1)
+        stream = item_event_stream(subscription, _pages(), heartbeat_seconds=0.01)
+        assert await anext(stream) == "retry: 1000\n\n"
+        assert await anext(stream) == ": keep-alive\n\n"
+        await stream.aclose()
+
+    def test_sse_format(self) -> None:
+        """Test the wire format of a single event."""
+        item_event = _event("formatted")
+        lines = item_event.to_sse().splitlines()
+        assert lines[0] == f"id: {item_event.id}"
+        assert lines[1] == "event: item.created"
+        assert lines[2].startswith("data: {")
+
+
+class TestReplay:
+    """Tests for Last-Event-ID replay from the database."""
+
+    @pytest.mark.asyncio
+    async def test_replays_items_after_cursor_in_pages(
+        self, client: TestClient
+    ) -> None:
+        """Test that every item after the cursor is replayed, oldest first."""
+        ids = [
+            client.post(
+                "/api/v1/items", json={"name": f"Item {i}", "description": "d"}
+            ).json()["id"]
+            for i in range(4)
+        ]
+
+        async with TestingReadOnlySessionLocal() as session:
+            pages = [
+                page
+                async for page in _replay_pages(session, uuid.UUID(ids[0]), page_size=2)
+            ]
+
+        assert [[e.id for e in page] for page in pages] == [ids[1:3], ids[3:]]
+
+    @pytest.mark.asyncio
+    async def test_resume_replays_overlap_window(self, client: TestClient) -> None:
+        """Test that resuming also replays items just before the last event ID."""
+        ids = [
+            client.post(
+                "/api/v1/items", json={"name": f"Item {i}", "description": "d"}
+            ).json()["id"]
+            for i in range(2)
+        ]
+
+        async with TestingReadOnlySessionLocal() as session:
+            cursor = resume_cursor(uuid.UUID(ids[1]), overlap_seconds=5)
+            pages = [page async for page in _replay_pages(session, cursor, 10)]
+
+        assert [e.id for e in pages[0]] == ids
+
+    @pytest.mark.asyncio
+    async def test_no_replay_without_cursor(self) -> None:
+        """Test that new subscribers start with live events only."""
+        async with TestingReadOnlySessionLocal() as session:
+            assert [page async for page in _replay_pages(session, None, 10)] == []
+            assert await repository.list_items_after(session, uuid7(), 10) == []
+
+
+class _FakeConnection:
+    """Stands in for an asyncpg connection."""
+
+    def __init__(self) -> None:
+        self.termination_listeners: list[Callable[[Any], None]] = []
+        self.closed = False
+
+    def add_termination_listener(self, callback: Callable[[Any], None]) -> None:
+        self.termination_listeners.append(callback)
+
+    async def add_listener(self, channel: str, callback: Callable[..., None]) -> None:
+        pass
+
+    async def remove_listener(
+        self, channel: str, callback: Callable[..., None]
+    ) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+    def terminate(self) -> None:
+        for callback in self.termination_listeners:
+            callback(self)
+
+
+class TestPostgresNotifyTransport:
+    """Tests for reconnecting the LISTEN connection."""
+
+    @pytest.mark.asyncio
+    async def test_reconnects_and_interrupts_streams(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a lost connection ends streams and is re-established."""
+        import asyncpg
+
+        connections: list[_FakeConnection] = []
+        failures = [OSError("connection refused")]
+
+        async def connect(dsn: str) -> _FakeConnection:
+            if len(connections) == 1 and failures:
+                raise failures.pop()
+            connections.append(_FakeConnection())
+            return connections[-1]
+
+        monkeypatch.setattr(asyncpg, "connect", connect)
+        transport = PostgresNotifyTransport(
+            "postgresql://", "items", change_feed._load_item_event, 0.01, 0.02
+        )
+        feed = ChangeFeed(transport, buffer_size=4)
+        await feed.start()
+        before = feed.subscribe()
+
+        connections[0].terminate()
+        with pytest.raises(SubscriptionEnded) as ended:
+            await before.next_event(1)
+        assert ended.value.reason == "interrupted"
+        with pytest.raises(ConnectionError):
+            await transport.publish(_event())
+
+        during = feed.subscribe()
+        for _ in range(100):
+            if len(connections) == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert len(connections) == 2
+        with pytest.raises(SubscriptionEnded):
+            await during.next_event(1)
+
+        await feed.stop()
+        assert connections[1].closed
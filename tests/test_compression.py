@@ -0,0 +1,144 @@
+"""Tests for negotiated response compression."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.compression import (
+    CompressedBodyCache,
+    CompressionMiddleware,
+    available_encodings,
+)
+from app.core.negotiation import negotiate
+
+
+def _create_items(client: TestClient, count: int = 20) -> None:
+    for i in range(count):
+        client.post(
+            "/api/v1/items",
+            json={"name": f"Item {i}", "description": "A fairly long text. " * 5},
+        )
+
+
+class TestNegotiate:
+    """Tests for Accept-style header negotiation."""
+
+    def test_prefers_server_order_on_ties(self) -> None:
+        """Test that equal client weights fall back to server preference."""
+        assert negotiate("gzip, br, zstd", ["zstd", "br", "gzip"]) == "zstd"
+
+    def test_respects_quality_values(self) -> None:
+        """Test that a higher q value wins over server preference."""
+        assert negotiate("zstd;q=0.5, gzip", ["zstd", "br", "gzip"]) == "gzip"
+
+    def test_rejects_zero_quality(self) -> None:
+        """Test that q=0 excludes an offer."""
+        assert negotiate("gzip;q=0", ["gzip"]) is None
+
+    def test_wildcard(self) -> None:
+        """Test that wildcards match any offer unless overridden."""
+        assert negotiate("*, zstd;q=0", ["zstd", "gzip"]) == "gzip"
+        assert negotiate("application/*", ["application/json"]) == ("application/json")
+
+    def test_missing_header(self) -> None:
+        """Test that an absent header yields no choice."""
+        assert negotiate(None, ["gzip"]) is None
+
+
+class TestCompressedBodyCache:
+    """Tests for the compressed body LRU."""
+
+    def test_evicts_least_recently_used(self) -> None:
+        """Test that the cache stays within its entry bound."""
+        cache = CompressedBodyCache(max_entries=2)
+        json = "application/json"
+        cache.put(("/a", json, '"1"', "gzip"), b"a")
+        cache.put(("/b", json, '"2"', "gzip"), b"b")
+        assert cache.get(("/a", json, '"1"', "gzip")) == b"a"
+        cache.put(("/c", json, '"3"', "gzip"), b"c")
+        assert len(cache) == 2
+        assert cache.get(("/b", json, '"2"', "gzip")) is None
+        assert cache.get(("/a", json, '"1"', "gzip")) == b"a"
+
+
+class TestCompressionMiddleware:
+    """Tests for the compression middleware on the application."""
+
+    @pytest.mark.parametrize("encoding", available_encodings())
+    def test_compresses_large_item_list(
+        self, client: TestClient, encoding: str
+    ) -> None:
+        """Test that large list responses are compressed with the coding."""
+        _create_items(client)
+        response = client.get("/api/v1/items", headers={"Accept-Encoding": encoding})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["Vary"]
+        assert len(response.json()) == 20
+
+    def test_compressed_etag_is_weak_and_revalidates(self, client: TestClient) -> None:
+        """Test that compressed responses carry a weak ETag usable for 304s."""
+        _create_items(client)
+        response = client.get("/api/v1/items", headers={"Accept-Encoding": "gzip"})
+        etag = response.headers["ETag"]
+        assert etag.startswith('W/"')
+
+        revalidated = client.get(
+            "/api/v1/items",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+        )
+        assert revalidated.status_code == 304
+
+    def test_reuses_cached_compressed_body(self) -> None:
+        """Test that a representation with a strong ETag is compressed once."""
+        body = b"x" * 4096
+
+        async def app(scope: dict, receive: object, send: object) -> None:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"etag", b'"v1"'),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+
+        middleware = CompressionMiddleware(app)
+        calls = []
+        compress = middleware._compressors["gzip"]
+        middleware._compressors["gzip"] = lambda data: calls.append(data) or (
+            compress(data)
+        )
+
+        test_client = TestClient(middleware)
+        first = test_client.get("/", headers={"Accept-Encoding": "gzip"})
+        second = test_client.get("/", headers={"Accept-Encoding": "gzip"})
+
+        assert first.content == second.content == body
+        assert len(calls) == 1
+        assert len(middleware.cache) == 1
+
+    def test_small_payload_is_not_compressed(self, client: TestClient) -> None:
+        """Test that responses below the size threshold are sent as-is."""
+        client.post("/api/v1/items", json={"name": "Tiny", "description": "x"})
+        response = client.get("/api/v1/items", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+
+    def test_excluded_paths_are_not_compressed(self, client: TestClient) -> None:
+        """Test that /health and /calculate skip compression entirely."""
+        response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+        response = client.post(
+            "/api/v1/calculate",
+            json={"a": 1, "b": 2, "operation": "add"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        assert "Content-Encoding" not in response.headers
+
+    def test_identity_when_not_accepted(self, client: TestClient) -> None:
+        """Test that clients without Accept-Encoding get identity bodies."""
+        _create_items(client)
+        response = client.get("/api/v1/items", headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in response.headers
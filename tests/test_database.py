@@ -0,0 +1,169 @@
+"""Tests for session management and connection instrumentation."""
+
+import asyncio
+import os
+import tempfile
+from collections.abc import AsyncGenerator
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from prometheus_client import REGISTRY
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from starlette.requests import Request
+
+from app.core.config import get_settings
+from app.db import database
+from app.db.database import ReadOnlySession, TimedQueuePool, instrument_engine
+
+
+@pytest_asyncio.fixture
+async def engine() -> AsyncGenerator[AsyncEngine, None]:
+    """Create an instrumented engine on a throwaway SQLite file."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    instrument_engine(engine)
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        await conn.execute(text("INSERT INTO t VALUES (1), (2)"))
+    yield engine
+    await engine.dispose()
+    os.unlink(path)
+
+
+def _hold_count(route: str, method: str = "GET") -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "db_connection_hold_seconds_count", {"method": method, "route": route}
+        )
+        or 0.0
+    )
+
+
+class TestReadOnlySession:
+    """Tests for the read-only session fast path."""
+
+    @pytest.mark.asyncio
+    async def test_connection_released_after_each_query(
+        self, engine: AsyncEngine
+    ) -> None:
+        """Test that the connection goes back to the pool right after a query."""
+        factory = async_sessionmaker(engine, class_=ReadOnlySession)
+        async with factory() as session:
+            assert engine.pool.checkedout() == 0
+            result = await session.execute(select(text("x")).select_from(text("t")))
+            assert engine.pool.checkedout() == 0
+            assert result.scalars().all() == [1, 2]
+
+    @pytest.mark.asyncio
+    async def test_writes_are_rejected(self, engine: AsyncEngine) -> None:
+        """Test that flushing a read-only session fails loudly."""
+        factory = async_sessionmaker(engine, class_=ReadOnlySession)
+        async with factory() as session:
+            with pytest.raises(RuntimeError):
+                await session.flush()
+
+
+class TestConnectionHoldMetrics:
+    """Tests for per-route connection hold time."""
+
+    @pytest.mark.asyncio
+    async def test_hold_time_recorded_per_route(self, engine: AsyncEngine) -> None:
+        """Test that each checkout/checkin pair is observed under its route."""
+        route = "/api/v1/test-hold"
+        before = _hold_count(route)
+
+        database._current_route.set(("GET", route))
+        factory = async_sessionmaker(engine, class_=ReadOnlySession)
+        async with factory() as session:
+            await session.execute(text("SELECT 1"))
+            await session.execute(text("SELECT 2"))
+
+        assert _hold_count(route) == before + 2
+
+    @pytest.mark.asyncio
+    async def test_methods_on_one_route_are_separate(self, engine: AsyncEngine) -> None:
+        """Test that reads and writes on the same path get their own series."""
+        route = "/api/v1/test-methods"
+        for method in ("GET", "POST"):
+            database._set_current_route(
+                Request(
+                    {
+                        "type": "http",
+                        "method": method,
+                        "headers": [],
+                        "route": SimpleNamespace(path=route),
+                    }
+                )
+            )
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+
+        assert _hold_count(route, "GET") == 1
+        assert _hold_count(route, "POST") == 1
+
+
+class TestPoolSaturationMetrics:
+    """Tests for pool wait time, queued checkouts and checked-out gauges."""
+
+    @pytest.mark.asyncio
+    async def test_queued_checkout_wait_is_recorded(self) -> None:
+        """Test that a checkout blocked on a full pool is counted and timed."""
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}",
+            poolclass=TimedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+        )
+        instrument_engine(engine)
+        before = REGISTRY.get_sample_value("db_pool_wait_seconds_count") or 0.0
+        try:
+            async with engine.connect() as first:
+                await first.execute(text("SELECT 1"))
+                assert REGISTRY.get_sample_value("db_pool_checked_out") == 1
+
+                second = asyncio.create_task(engine.connect().start())
+                await asyncio.sleep(0.05)
+                assert REGISTRY.get_sample_value("db_pool_waiting") == 1
+            await (await second).close()
+
+            assert REGISTRY.get_sample_value("db_pool_waiting") == 0
+            assert REGISTRY.get_sample_value("db_pool_checked_out") == 0
+            assert REGISTRY.get_sample_value("db_pool_wait_seconds_count") == before + 2
+            assert (REGISTRY.get_sample_value("db_pool_wait_seconds_sum") or 0) > 0.05
+        finally:
+            await engine.dispose()
+            os.unlink(path)
+
+
+class TestAlembicScriptLocation:
+    """Tests for finding the migration scripts."""
+
+    def test_default_and_configured_location(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        """Test the checkout's alembic.ini and an ALEMBIC_CONFIG override."""
+        get_settings.cache_clear()
+        assert Path(database.alembic_script_location(), "env.py").is_file()
+
+        ini = tmp_path / "conf" / "alembic.ini"
+        ini.parent.mkdir()
+        ini.write_text("[alembic]\nscript_location = ../migrations\n")
+        monkeypatch.setenv("ALEMBIC_CONFIG", str(ini))
+        get_settings.cache_clear()
+        try:
+            assert Path(database.alembic_script_location()).resolve() == (
+                tmp_path / "migrations"
+            )
+            monkeypatch.setenv("ALEMBIC_CONFIG", str(tmp_path / "missing.ini"))
+            get_settings.cache_clear()
+            with pytest.raises(FileNotFoundError, match="ALEMBIC_CONFIG"):
+                database.alembic_script_location()
+        finally:
+            monkeypatch.undo()
+            get_settings.cache_clear()
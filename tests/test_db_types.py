@@ -0,0 +1,79 @@
+"""Tests for custom column types and key generation."""
+
+import time
+import uuid
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.db.types import (
+    BinaryUUID,
+    parse_uuid,
+    uuid7,
+    uuid7_lower_bound,
+    uuid7_timestamp_ms,
+)
+
+
+class TestUUID7:
+    """Tests for time-ordered UUID generation."""
+
+    def test_version_and_variant(self) -> None:
+        """Test that generated IDs are RFC 9562 version 7 UUIDs."""
+        value = uuid7()
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+    def test_ids_are_monotonic(self) -> None:
+        """Test that IDs from one process sort in generation order."""
+        ids = [uuid7() for _ in range(5000)]
+        assert ids == sorted(ids)
+        assert len(set(ids)) == len(ids)
+
+    def test_binary_order_matches_generation_order(self) -> None:
+        """Test that the 16-byte form used for storage is also ordered."""
+        ids = [uuid7().bytes for _ in range(1000)]
+        assert ids == sorted(ids)
+
+    def test_timestamp_and_lower_bound(self) -> None:
+        """Test that a lower bound sorts before every ID from its millisecond."""
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        timestamp_ms = uuid7_timestamp_ms(value)
+
+        assert timestamp_ms >= before
+        assert uuid7_lower_bound(timestamp_ms) < value
+        assert uuid7_lower_bound(timestamp_ms + 1) > value
+
+
+class TestParseUUID:
+    """Tests for lenient UUID parsing."""
+
+    def test_parses_canonical_and_uppercase(self) -> None:
+        """Test that valid spellings are parsed to the same UUID."""
+        value = uuid7()
+        assert parse_uuid(str(value)) == value
+        assert parse_uuid(str(value).upper()) == value
+
+    def test_rejects_malformed(self) -> None:
+        """Test that malformed IDs yield None instead of raising."""
+        assert parse_uuid("nonexistent-id-12345") is None
+
+
+class TestBinaryUUID:
+    """Tests for dialect-specific UUID storage."""
+
+    def test_sqlite_stores_16_bytes(self) -> None:
+        """Test that SQLite binds and loads UUIDs as 16-byte blobs."""
+        column_type = BinaryUUID()
+        value = uuid7()
+        stored = column_type.process_bind_param(value, sqlite.dialect())
+        assert stored == value.bytes
+        assert column_type.process_result_value(stored, sqlite.dialect()) == value
+
+    def test_postgres_uses_native_uuid(self) -> None:
+        """Test that PostgreSQL binds UUID objects to its native type."""
+        column_type = BinaryUUID()
+        dialect = postgresql.dialect()
+        value = uuid7()
+        assert isinstance(column_type.load_dialect_impl(dialect), postgresql.UUID)
+        assert column_type.process_bind_param(str(value), dialect) == value
@@ -0,0 +1,213 @@
+"""Tests for graceful draining."""
+
+import asyncio
+import os
+import signal
+from collections.abc import Iterator
+from types import FrameType
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.types import Message, Receive, Scope, Send
+
+from app.core.drain import (
+    DrainMiddleware,
+    DrainState,
+    get_drain_state,
+    install_drain_signal_handler,
+)
+from app.main import app
+
+
+async def _receive() -> Message:
+    return {"type": "http.request", "body": b""}
+
+
+async def _send(message: Message) -> None:
+    pass
+
+
+@pytest.fixture
+def drain_app() -> Iterator[tuple[TestClient, DrainState]]:
+    """App with one slow and one exempt route behind the drain middleware."""
+    state = DrainState()
+    inner = FastAPI()
+
+    @inner.get("/work")
+    async def work() -> dict[str, int]:
+        return {"in_flight": state.in_flight}
+
+    @inner.get("/stream")
+    async def stream() -> dict[str, int]:
+        return {"in_flight": state.in_flight, "streams": state.streams}
+
+    @inner.get("/health")
+    async def health() -> dict[str, str]:
+        return {"status": "healthy"}
+
+    inner.add_middleware(
+        DrainMiddleware,
+        state=state,
+        exempt_paths=("/health",),
+        streaming_paths=("/stream",),
+    )
+    yield TestClient(inner), state
+
+
+class TestDrainMiddleware:
+    """Tests for in-flight tracking and refusal of new work."""
+
+    def test_counts_in_flight_requests(
+        self, drain_app: tuple[TestClient, DrainState]
+    ) -> None:
+        """Test that a request is in flight while it runs."""
+        client, state = drain_app
+        assert client.get("/work").json() == {"in_flight": 1}
+        assert state.in_flight == 0
+
+    def test_streams_are_counted_apart(
+        self, drain_app: tuple[TestClient, DrainState]
+    ) -> None:
+        """Test that event streams are in flight but not request load."""
+        client, state = drain_app
+        assert client.get("/stream").json() == {"in_flight": 1, "streams": 1}
+        assert state.streams == 0
+
+    def test_serves_while_draining_until_refusing(
+        self, drain_app: tuple[TestClient, DrainState]
+    ) -> None:
+        """Test that draining only fails readiness until new work is refused."""
+        client, state = drain_app
+        state.begin()
+        assert client.get("/work").status_code == 200
+
+        state.stop_accepting()
+        response = client.get("/work")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert response.headers["connection"] == "close"
+
+    def test_exempt_paths_stay_reachable(
+        self, drain_app: tuple[TestClient, DrainState]
+    ) -> None:
+        """Test that probes are answered after new work is refused."""
+        client, state = drain_app
+        state.stop_accepting()
+        assert client.get("/health").status_code == 200
+
+
+class TestDrainState:
+    """Tests for waiting on in-flight work."""
+
+    @pytest.mark.asyncio
+    async def test_wait_idle_returns_when_requests_finish(self) -> None:
+        """Test that waiting ends as soon as the last request finishes."""
+        state = DrainState()
+        state.request_started()
+        asyncio.get_running_loop().call_later(0.01, state.request_finished)
+        assert await state.wait_idle(1) == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_idle_reports_remaining_after_deadline(self) -> None:
+        """Test that the deadline bounds the wait."""
+        state = DrainState()
+        state.request_started()
+        assert await state.wait_idle(0.01) == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_requests_count_as_aborted(self) -> None:
+        """Test that requests cut off during a drain are counted for the exit log."""
+        state = DrainState()
+        started = asyncio.Event()
+
+        async def slow_app(scope: Scope, receive: Receive, send: Send) -> None:
+            started.set()
+            await asyncio.sleep(10)
+
+        middleware = DrainMiddleware(slow_app, state=state)
+        scope = {"type": "http", "path": "/work"}
+        request = asyncio.create_task(middleware(scope, _receive, _send))
+        await started.wait()
+        state.stop_accepting()
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+        assert state.aborted == 1
+        assert state.in_flight == 0
+        assert state.refusing_for > 0
+        state.reset()
+        assert state.aborted == 0
+        assert state.refusing_for == 0
+
+
+class TestSignalHandler:
+    """Tests for starting a drain on SIGTERM."""
+
+    @pytest.mark.asyncio
+    async def test_sigterm_drains_before_server_shutdown(self) -> None:
+        """Test that readiness fails first and the server handler runs last."""
+        calls: list[str] = []
+
+        def server_handler(sig: int, frame: FrameType | None) -> None:
+            calls.append("server")
+
+        async def on_drain() -> None:
+            calls.append("drain")
+
+        original = signal.signal(signal.SIGTERM, server_handler)
+        state = DrainState()
+        try:
+            restore = install_drain_signal_handler(state, on_drain, delay=0.01)
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0)
+            assert state.draining and state.accepting
+
+            await asyncio.sleep(0.05)
+            assert calls == ["drain", "server"]
+            assert not state.accepting
+
+            restore()
+            assert signal.getsignal(signal.SIGTERM) is server_handler
+        finally:
+            signal.signal(signal.SIGTERM, original)
+
+
+class TestInFlightGauge:
+    """Tests for the in-flight requests gauge used for autoscaling."""
+
+    def test_metrics_export_in_flight_requests(self, client: TestClient) -> None:
+        """Test that /metrics reports requests in flight, excluding itself."""
+        response = client.get("/metrics")
+        assert "\nhttp_requests_in_flight 0.0\n" in response.text
+
+    def test_websockets_are_not_request_load(self, client: TestClient) -> None:
+        """Test that an open WebSocket counts as a stream, not a request."""
+        with client.websocket_connect("/api/v1/calculate/ws"):
+            assert get_drain_state().requests_in_flight == 0
+            assert get_drain_state().streams == 1
+            response = client.get("/metrics")
+        assert "\nhttp_requests_in_flight 0.0\n" in response.text
+        assert "\nhttp_streams_open 1.0\n" in response.text
+
+
+class TestReadiness:
+    """Tests for the /ready endpoint."""
+
+    def test_ready_when_serving(self, client: TestClient) -> None:
+        """Test that a running app reports ready."""
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+    def test_not_ready_after_shutdown(self) -> None:
+        """Test that readiness fails once the app has drained."""
+        with TestClient(app) as client:
+            pass
+        try:
+            response = client.get("/ready")
+            assert response.status_code == 503
+            assert response.json()["status"] == "draining"
+        finally:
+            get_drain_state().reset()
@@ -0,0 +1,124 @@
+"""Tests for the HTTP metrics middleware."""
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from prometheus_client import CollectorRegistry
+
+from app.core.http_metrics import HttpMetrics, HttpMetricsMiddleware
+
+
+def _build(size_sample_rate: float = 1.0) -> tuple[TestClient, CollectorRegistry]:
+    registry = CollectorRegistry()
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: str) -> dict[str, str]:
+        if item_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    @app.post("/echo")
+    async def echo(body: dict[str, str]) -> dict[str, str]:
+        return body
+
+    @app.get("/boom")
+    async def boom() -> None:
+        raise RuntimeError("boom")
+
+    app.add_middleware(
+        HttpMetricsMiddleware,
+        metrics=HttpMetrics([0.1, 1.0], registry=registry),
+        routes=app.routes,
+        size_sample_rate=size_sample_rate,
+    )
+    return TestClient(app, raise_server_exceptions=False), registry
+
+
+def _requests(registry: CollectorRegistry, handler: str, method: str, status: str):
+    return registry.get_sample_value(
+        "http_requests_total",
+        {"handler": handler, "method": method, "status": status},
+    )
+
+
+class TestHttpMetricsMiddleware:
+    """Tests for request labelling and recording."""
+
+    def test_requests_are_labelled_with_the_route_template(self) -> None:
+        """Test that path parameters do not create new series."""
+        client, registry = _build()
+        for item_id in ("a", "b", "missing"):
+            client.get(f"/items/{item_id}")
+
+        assert _requests(registry, "/items/{item_id}", "GET", "2xx") == 2
+        assert _requests(registry, "/items/{item_id}", "GET", "4xx") == 1
+        assert (
+            registry.get_sample_value(
+                "http_request_duration_seconds_count",
+                {"handler": "/items/{item_id}", "method": "GET"},
+            )
+            == 3
+        )
+
+    def test_unmatched_paths_and_methods_share_one_series(self) -> None:
+        """Test that unknown paths and methods cannot grow cardinality."""
+        client, registry = _build()
+        for path in ("/a", "/b/c", "/d?e=f"):
+            client.get(path)
+        client.request("BREW", "/items/1")
+
+        assert _requests(registry, "none", "GET", "4xx") == 3
+        assert _requests(registry, "/items/{item_id}", "OTHER", "4xx") == 1
+
+    def test_children_are_preallocated(self) -> None:
+        """Test that declared routes export zeroed series before being hit."""
+        client, registry = _build()
+        client.get("/items/a")
+        assert _requests(registry, "/echo", "POST", "2xx") == 0
+        assert _requests(registry, "/items/{item_id}", "GET", "5xx") == 0
+
+    def test_unhandled_errors_count_as_5xx(self) -> None:
+        """Test that an exception escaping the app is recorded as a 500."""
+        client, registry = _build()
+        assert client.get("/boom").status_code == 500
+        assert _requests(registry, "/boom", "GET", "5xx") == 1
+
+    def test_sizes_from_content_length(self) -> None:
+        """Test that request and response sizes are observed."""
+        client, registry = _build()
+        client.post("/echo", json={"a": "b"})
+
+        labels = {"handler": "/echo"}
+        assert registry.get_sample_value("http_request_size_bytes_sum", labels) == 9
+        assert registry.get_sample_value("http_response_size_bytes_sum", labels) == 9
+
+    @pytest.mark.parametrize("rate, expected", [(0.0, 0), (1.0, 5)])
+    def test_size_sampling(self, rate: float, expected: int) -> None:
+        """Test that sizes are only observed for sampled requests."""
+        client, registry = _build(size_sample_rate=rate)
+        for _ in range(5):
+            client.get("/items/a")
+
+        labels = {"handler": "/items/{item_id}"}
+        assert (
+            registry.get_sample_value("http_response_size_bytes_count", labels)
+            == expected
+        )
+        assert _requests(registry, "/items/{item_id}", "GET", "2xx") == 5
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics on the application."""
+
+    def test_exposes_http_metrics(self, client: TestClient) -> None:
+        """Test that the dashboard's metric families are exported."""
+        client.get("/health")
+        body = client.get("/metrics").text
+
+        assert 'http_requests_total{handler="/health",method="GET",status="2xx"}' in (
+            body
+        )
+        assert "http_request_duration_seconds_bucket" in body
+        assert "http_request_size_bytes_count" in body
+        assert "http_response_size_bytes_count" in body
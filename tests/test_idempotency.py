@@ -0,0 +1,289 @@
+"""Tests for Idempotency-Key handling."""
+
+import asyncio
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.core.config import get_settings
+from app.db.models import Item
+from app.services.idempotency import (
+    DatabaseIdempotencyStore,
+    IdempotencyConflict,
+    IdempotencyStoreFull,
+    IdempotentCall,
+    InMemoryIdempotencyStore,
+    StoredResponse,
+    get_idempotency_store,
+    request_fingerprint,
+)
+from tests.conftest import TestingSessionLocal
+
+ITEM = {"name": "a", "description": "d"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_store() -> Iterator[None]:
+    """Give every test an empty process-wide store."""
+    get_idempotency_store.cache_clear()
+    yield
+    get_idempotency_store.cache_clear()
+
+
+async def _count_items() -> int:
+    async with TestingSessionLocal() as session:
+        return (
+            await session.execute(select(func.count()).select_from(Item))
+        ).scalar_one()
+
+
+class TestInMemoryIdempotencyStore:
+    """Tests for the process-local store."""
+
+    @pytest.mark.asyncio
+    async def test_reserve_complete_and_replay(self) -> None:
+        """Test that a completed key returns its response."""
+        store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=10)
+        assert await store.reserve("k", "fp") is None
+        await store.complete("k", StoredResponse(201, {"id": "x"}))
+
+        record = await store.reserve("k", "fp")
+        assert record is not None
+        assert record.response == StoredResponse(201, {"id": "x"})
+
+    @pytest.mark.asyncio
+    async def test_expired_and_evicted_keys_are_forgotten(self) -> None:
+        """Test the TTL and the entry bound."""
+        expiring = InMemoryIdempotencyStore(ttl_seconds=0, max_entries=10)
+        await expiring.reserve("k", "fp")
+        assert await expiring.reserve("k", "other") is None
+
+        bounded = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=2)
+        for key in ("a", "b", "c"):
+            await bounded.reserve(key, "fp")
+            await bounded.complete(key, StoredResponse(201, {}))
+        assert len(bounded) == 2
+        assert await bounded.reserve("a", "fp") is None
+
+    @pytest.mark.asyncio
+    async def test_running_requests_are_never_evicted(self) -> None:
+        """Test that a full store evicts completed keys, then refuses new ones."""
+        store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=2)
+        await store.reserve("running", "fp")
+        await store.reserve("done", "fp")
+        await store.complete("done", StoredResponse(201, {}))
+
+        assert await store.reserve("new", "fp") is None
+        with pytest.raises(IdempotencyStoreFull):
+            await store.reserve("another", "fp")
+        record = await store.reserve("running", "fp")
+        assert record is not None and record.response is None
+
+    @pytest.mark.asyncio
+    async def test_release_keeps_completed_keys(self) -> None:
+        """Test that only unfinished reservations are released."""
+        store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=10)
+        await store.reserve("done", "fp")
+        await store.complete("done", StoredResponse(200, {}))
+        await store.reserve("open", "fp")
+        await store.release("done")
+        await store.release("open")
+
+        assert await store.reserve("done", "fp") is not None
+        assert await store.reserve("open", "fp") is None
+
+
+class TestDatabaseIdempotencyStore:
+    """Tests for the store shared through the database."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip(self) -> None:
+        """Test reserving, completing and replaying through the table."""
+        store = DatabaseIdempotencyStore(
+            TestingSessionLocal, ttl_seconds=60, lease_seconds=60
+        )
+        assert await store.reserve("k", "fp") is None
+
+        in_progress = await store.reserve("k", "fp")
+        assert in_progress is not None and in_progress.response is None
+
+        await store.complete("k", StoredResponse(201, {"id": "x"}, {"ETag": '"1"'}))
+        record = await store.reserve("k", "fp")
+        assert record is not None
+        assert record.response == StoredResponse(201, {"id": "x"}, {"ETag": '"1"'})
+
+    @pytest.mark.asyncio
+    async def test_expired_key_is_reserved_again(self) -> None:
+        """Test that an expired row is replaced by a new reservation."""
+        store = DatabaseIdempotencyStore(
+            TestingSessionLocal, ttl_seconds=0, lease_seconds=60
+        )
+        await store.reserve("k", "fp")
+        await store.complete("k", StoredResponse(201, {}))
+        assert await store.reserve("k", "other") is None
+
+    @pytest.mark.asyncio
+    async def test_unfinished_reservation_holds_a_lease(self) -> None:
+        """Test that an abandoned reservation lapses after its lease."""
+        store = DatabaseIdempotencyStore(
+            TestingSessionLocal, ttl_seconds=60, lease_seconds=0
+        )
+        await store.reserve("k", "fp")
+        assert await store.reserve("k", "other") is None
+
+        await store.complete("k", StoredResponse(201, {}))
+        record = await store.reserve("k", "other")
+        assert record is not None and record.fingerprint == "other"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_reservations(self) -> None:
+        """Test that only one of several racing requests gets the key."""
+        store = DatabaseIdempotencyStore(
+            TestingSessionLocal, ttl_seconds=60, lease_seconds=60
+        )
+        results = await asyncio.gather(*(store.reserve("k", "fp") for _ in range(5)))
+        assert results.count(None) == 1
+
+
+class TestIdempotentCall:
+    """Tests for applying a key around a request."""
+
+    @pytest.mark.asyncio
+    async def test_conflicts(self) -> None:
+        """Test in-progress and mismatched keys."""
+        store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=10)
+        await IdempotentCall(store, "k", "fp").begin()
+
+        with pytest.raises(IdempotencyConflict) as in_progress:
+            await IdempotentCall(store, "k", "fp").begin()
+        with pytest.raises(IdempotencyConflict) as mismatch:
+            await IdempotentCall(store, "k", "other").begin()
+        assert (in_progress.value.reason, mismatch.value.reason) == (
+            "in_progress",
+            "mismatch",
+        )
+
+    @pytest.mark.asyncio
+    async def test_failures_release_the_key(self) -> None:
+        """Test that failed and non-2xx requests can be retried."""
+        store = InMemoryIdempotencyStore(ttl_seconds=60, max_entries=10)
+        failed = IdempotentCall(store, "k", "fp")
+        await failed.begin()
+        await failed.finish(failed=True)
+
+        rejected = IdempotentCall(store, "k", "fp")
+        await rejected.begin()
+        rejected.record(StoredResponse(500, {}))
+        await rejected.finish(failed=False)
+
+        assert len(store) == 0
+
+    @pytest.mark.asyncio
+    async def test_lease_is_renewed_while_running(self) -> None:
+        """Test that a running request keeps its key past the lease."""
+        store = DatabaseIdempotencyStore(
+            TestingSessionLocal, ttl_seconds=60, lease_seconds=0.3
+        )
+        running = IdempotentCall(store, "k", "fp")
+        await running.begin()
+        await asyncio.sleep(0.5)
+
+        with pytest.raises(IdempotencyConflict, match="in_progress"):
+            await IdempotentCall(store, "k", "fp").begin()
+        running.record(StoredResponse(201, {}))
+        await running.finish(failed=False)
+        assert running._renewal is not None and running._renewal.done()
+
+    def test_fingerprint_separates_parts(self) -> None:
+        """Test that moving bytes between parts changes the fingerprint."""
+        assert request_fingerprint("POST", "/a", "b=1", b"") != request_fingerprint(
+            "POST", "/a", "", b"b=1"
+        )
+
+
+class TestIdempotentEndpoints:
+    """Tests for the Idempotency-Key header on POST endpoints."""
+
+    def test_retry_replays_create(self, client: TestClient) -> None:
+        """Test that a retried create returns the same item without a new row."""
+        headers = {"Idempotency-Key": "create-1"}
+        first = client.post("/api/v1/items", json=ITEM, headers=headers)
+        retry = client.post("/api/v1/items", json=ITEM, headers=headers)
+
+        assert (first.status_code, retry.status_code) == (201, 201)
+        assert retry.json() == first.json()
+        assert retry.headers["ETag"] == first.headers["ETag"]
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in first.headers
+        assert asyncio.run(_count_items()) == 1
+
+    def test_full_store_is_unavailable(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that no room for a new key is a retryable 503."""
+        monkeypatch.setenv("IDEMPOTENCY_MAX_ENTRIES", "0")
+        get_settings.cache_clear()
+        try:
+            response = client.post(
+                "/api/v1/items", json=ITEM, headers={"Idempotency-Key": "k"}
+            )
+        finally:
+            monkeypatch.undo()
+            get_settings.cache_clear()
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+        assert asyncio.run(_count_items()) == 0
+
+    def test_key_reused_for_other_request(self, client: TestClient) -> None:
+        """Test that a different body under the same key is refused."""
+        headers = {"Idempotency-Key": "create-1"}
+        client.post("/api/v1/items", json=ITEM, headers=headers)
+        response = client.post(
+            "/api/v1/items", json={**ITEM, "name": "b"}, headers=headers
+        )
+
+        assert response.status_code == 422
+        assert asyncio.run(_count_items()) == 1
+
+    def test_key_in_progress(self, client: TestClient) -> None:
+        """Test that a retry racing the first attempt gets 409."""
+        body = b'{"name":"a","description":"d"}'
+        fingerprint = request_fingerprint("POST", "/api/v1/items", "", body)
+        asyncio.run(get_idempotency_store().reserve("create-1", fingerprint))
+
+        response = client.post(
+            "/api/v1/items",
+            json=ITEM,
+            headers={"Idempotency-Key": "create-1"},
+        )
+
+        assert response.status_code == 409
+        assert response.headers["Retry-After"] == "1"
+        assert asyncio.run(_count_items()) == 0
+
+    def test_without_key(self, client: TestClient) -> None:
+        """Test that requests without a key are never deduplicated."""
+        for _ in range(2):
+            assert client.post("/api/v1/items", json=ITEM).status_code == 201
+        assert asyncio.run(_count_items()) == 2
+
+    def test_overlong_key(self, client: TestClient) -> None:
+        """Test that keys longer than the column are refused."""
+        response = client.post(
+            "/api/v1/items", json=ITEM, headers={"Idempotency-Key": "k" * 256}
+        )
+        assert response.status_code == 400
+
+    def test_retry_replays_import(self, client: TestClient) -> None:
+        """Test that a retried import returns its summary without loading again."""
+        headers = {"Idempotency-Key": "import-1", "Content-Type": "text/csv"}
+        body = b"name,description\na,\nb,x\n"
+        first = client.post("/api/v1/items/import", content=body, headers=headers)
+        retry = client.post("/api/v1/items/import", content=body, headers=headers)
+
+        assert retry.json() == first.json()
+        assert retry.headers["Idempotent-Replayed"] == "true"
+        assert asyncio.run(_count_items()) == 2
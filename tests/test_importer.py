@@ -0,0 +1,380 @@
+"""Tests for bulk item import."""
+
+import csv
+import json
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import cli
+from app.core.config import get_settings
+from app.core.streams import iter_lines
+from app.db import repository
+from app.db.models import Item
+from app.models.schemas import ItemCreate
+from app.services import change_feed, importer
+from app.services.change_feed import ITEM_CREATED, ChangeFeed, InMemoryTransport
+from app.services.importer import (
+    ImportCheckpoint,
+    ImportFailed,
+    ImportFormatError,
+    ItemImporter,
+    ParseError,
+    iter_records,
+    validate_batch,
+)
+from tests.conftest import ASYNC_DATABASE_URL, TestingSessionLocal
+
+
+async def _chunks(data: bytes, size: int = 7) -> AsyncIterator[bytes]:
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+async def _collect(iterator: AsyncIterator[object]) -> list[object]:
+    return [value async for value in iterator]
+
+
+def _ndjson(count: int) -> bytes:
+    return b"".join(
+        json.dumps({"name": f"Item {i}", "description": f"Row {i}"}).encode() + b"\n"
+        for i in range(count)
+    )
+
+
+async def _item_names() -> list[str]:
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(Item.name).order_by(Item.name))
+        return list(result.scalars())
+
+
+class TestParsing:
+    """Tests for streaming record parsing."""
+
+    @pytest.mark.asyncio
+    async def test_lines_survive_chunk_boundaries(self) -> None:
+        """Test that lines and multi-byte characters split across chunks."""
+        data = "﻿café\r\nnaïve\nlast".encode()
+        lines = await _collect(iter_lines(_chunks(data, size=3)))
+        assert lines == ["café", "naïve", "last"]
+
+    @pytest.mark.asyncio
+    async def test_csv_quoted_fields_may_span_lines(self) -> None:
+        """Test that quoted newlines, commas and quotes stay in one field."""
+        data = b'Name,Description\nA,"multi\nline, with ""quotes"""\nB,plain\n'
+        records = await _collect(iter_records(_chunks(data), "csv"))
+        assert records == [
+            {"name": "A", "description": 'multi\nline, with "quotes"'},
+            {"name": "B", "description": "plain"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_csv_bad_rows_become_parse_errors(self) -> None:
+        """Test that a row with the wrong field count is reported, not fatal."""
+        data = b"name,description\nA\nB,ok\n"
+        records = await _collect(iter_records(_chunks(data), "csv"))
+        assert records == [
+            ParseError("Expected 2 fields, got 1"),
+            {"name": "B", "description": "ok"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_csv_quotes_inside_fields_are_literal(self) -> None:
+        """Test that a quote in the middle of a field does not open a field."""
+        data = b'name,description\nTV,"27"" screen"\nMonitor,24" screen\nB,ok\n'
+        records = await _collect(iter_records(_chunks(data), "csv"))
+        assert records == [
+            {"name": "TV", "description": '27" screen'},
+            {"name": "Monitor", "description": '24" screen'},
+            {"name": "B", "description": "ok"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_csv_unterminated_quote_is_reported(self) -> None:
+        """Test that a quoted field left open is reported, not silently dropped."""
+        data = b'name,description\nA,"never closed\nB,ok\n'
+        records = await _collect(iter_records(_chunks(data), "csv"))
+        assert records == [ParseError("Unterminated quoted field")]
+
+    @pytest.mark.asyncio
+    async def test_csv_oversized_field_is_reported_and_parsing_resumes(self) -> None:
+        """Test that an open quote stops at the field size limit."""
+        limit = csv.field_size_limit(64)
+        try:
+            data = b'name,description\nA,"open\n' + b"x" * 80 + b"\nB,ok\n"
+            records = await _collect(iter_records(_chunks(data), "csv"))
+        finally:
+            csv.field_size_limit(limit)
+        assert isinstance(records[0], ParseError)
+        assert "field larger than field limit" in records[0].message
+        assert records[1:] == [{"name": "B", "description": "ok"}]
+
+    @pytest.mark.asyncio
+    async def test_csv_header_must_name_item_fields(self) -> None:
+        """Test that a CSV without the item columns is rejected up front."""
+        with pytest.raises(ImportFormatError):
+            await _collect(iter_records(_chunks(b"title,body\nA,B\n"), "csv"))
+
+    @pytest.mark.asyncio
+    async def test_ndjson_invalid_lines_become_parse_errors(self) -> None:
+        """Test that invalid JSON is reported per line and blank lines skipped."""
+        data = b'{"name": "A", "description": "a"}\n\n{oops\n"just a string"\n'
+        records = await _collect(iter_records(_chunks(data), "ndjson"))
+        assert records[0] == {"name": "A", "description": "a"}
+        assert isinstance(records[1], ParseError)
+        assert records[2] == "just a string"
+
+    def test_unknown_format(self) -> None:
+        """Test that unsupported formats are refused."""
+        with pytest.raises(ImportFormatError):
+            iter_records(_chunks(b""), "xml")
+
+
+class TestValidateBatch:
+    """Tests for batch validation with ItemCreate."""
+
+    def test_valid_and_invalid_rows_are_separated(self) -> None:
+        """Test that invalid rows are reported with their source row numbers."""
+        items, errors = validate_batch(
+            [
+                {"name": "A", "description": "a"},
+                {"name": "B"},
+                ParseError("Invalid JSON"),
+                "just a string",
+                {"name": "C", "description": "c"},
+            ],
+            first_row=11,
+        )
+
+        assert items == [
+            ItemCreate(name="A", description="a"),
+            ItemCreate(name="C", description="c"),
+        ]
+        assert [error.row for error in errors] == [12, 13, 14]
+        assert errors[0].message == "description: Field required"
+        assert errors[1].message == "Invalid JSON"
+
+
+class TestImportCheckpoint:
+    """Tests for resumable import checkpoints."""
+
+    def test_out_of_order_batches(self) -> None:
+        """Test that the watermark only advances over contiguous batches."""
+        checkpoint = ImportCheckpoint(batch_size=10)
+        checkpoint.mark_done(1)
+        checkpoint.mark_done(3)
+        assert checkpoint.to_token() == "10:0:1,3"
+
+        checkpoint.mark_done(0)
+        assert checkpoint.to_token() == "10:2:3"
+        assert checkpoint.is_done(1) and checkpoint.is_done(3)
+        assert not checkpoint.is_done(2)
+
+    def test_shard_parts_of_unfinished_batches(self) -> None:
+        """Test that shard parts are tracked until their batch completes."""
+        checkpoint = ImportCheckpoint(batch_size=10)
+        checkpoint.mark_shard_done(0, "shard1")
+        assert checkpoint.is_done(0, "shard1")
+        assert not checkpoint.is_done(0, "shard0") and not checkpoint.is_done(0)
+        assert checkpoint.to_token().endswith(":0:0/shard1")
+
+        checkpoint.mark_done(0)
+        assert checkpoint.shards_done == {}
+
+    def test_token_round_trip(self) -> None:
+        """Test that a token restores the same checkpoint."""
+        base = uuid.UUID("01890a5d-ac96-774b-bcce-b302099a8057")
+        checkpoint = ImportCheckpoint.from_token(f"500:4:6,9,7/shard1,7@{base.hex}")
+        assert checkpoint == ImportCheckpoint(
+            500, 4, {6, 9}, {7: {"shard1"}}, {7: base}
+        )
+        assert ImportCheckpoint.from_token(checkpoint.to_token()) == checkpoint
+
+    def test_item_ids_are_stable_and_ordered(self) -> None:
+        """Test that a resumed batch gives every row the same ID."""
+        checkpoint = ImportCheckpoint(batch_size=10)
+        ids = [checkpoint.item_id(0, row) for row in range(1, 11)]
+        resumed = ImportCheckpoint.from_token(checkpoint.to_token())
+        assert ids == [resumed.item_id(0, row) for row in range(1, 11)]
+        later = [checkpoint.item_id(1, row) for row in range(11, 21)]
+        assert ids + later == sorted(ids + later)
+        assert len(set(ids + later)) == 20
+        assert all(item_id.version == 7 for item_id in ids)
+
+        checkpoint.mark_done(0)
+        assert 0 not in checkpoint.id_bases
+
+    @pytest.mark.parametrize(
+        "token", ["", "abc", "0:1", "10", "10:-1", "10:1:x", "10:1:2@nothex"]
+    )
+    def test_invalid_tokens(self, token: str) -> None:
+        """Test that malformed tokens are rejected."""
+        with pytest.raises(ImportFormatError):
+            ImportCheckpoint.from_token(token)
+
+
+class TestItemImporter:
+    """Tests for loading batches into the database."""
+
+    @pytest.mark.asyncio
+    async def test_imports_all_rows_in_parallel_batches(self) -> None:
+        """Test that every valid row is loaded once and progress is reported."""
+        reported: list[int] = []
+        item_importer = ItemImporter(
+            TestingSessionLocal,
+            batch_size=10,
+            parallelism=3,
+            on_progress=lambda progress, _: reported.append(progress.imported),
+        )
+
+        progress = await item_importer.run(_chunks(_ndjson(25), 64), "ndjson")
+
+        assert (progress.rows, progress.imported, progress.rejected) == (25, 25, 0)
+        assert len(reported) == 3 and max(reported) == 25
+        assert (item_importer.checkpoint.next_batch, item_importer.checkpoint.done) == (
+            3,
+            set(),
+        )
+        assert len(await _item_names()) == 25
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_resumes_without_duplicates(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a resumed import loads only the batches that failed."""
+        load_items = importer.load_items
+
+        async def flaky_load(
+            session: AsyncSession,
+            items: list[ItemCreate],
+            ids: Sequence[uuid.UUID] | None = None,
+        ) -> None:
+            if items[0].name == "Item 10":
+                raise RuntimeError("connection lost")
+            await load_items(session, items, ids)
+
+        monkeypatch.setattr(importer, "load_items", flaky_load)
+        with pytest.raises(ImportFailed) as failed:
+            await ItemImporter(TestingSessionLocal, batch_size=10, parallelism=1).run(
+                _chunks(_ndjson(30)), "ndjson"
+            )
+        assert failed.value.progress.imported == 10
+        token = failed.value.checkpoint.to_token()
+        assert failed.value.checkpoint.next_batch == 1
+
+        monkeypatch.setattr(importer, "load_items", load_items)
+        resumed = ItemImporter(
+            TestingSessionLocal,
+            batch_size=10,
+            checkpoint=ImportCheckpoint.from_token(token),
+        )
+        progress = await resumed.run(_chunks(_ndjson(30)), "ndjson")
+
+        assert (progress.skipped, progress.imported) == (10, 20)
+        names = await _item_names()
+        assert len(names) == len(set(names)) == 30
+
+    @pytest.mark.asyncio
+    async def test_items_sort_after_earlier_creations_and_are_published(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that imported IDs are taken at load time and announced."""
+        feed = ChangeFeed(InMemoryTransport(), buffer_size=16)
+        await feed.start()
+        monkeypatch.setattr(change_feed, "get_change_feed", lambda: feed)
+        subscription = feed.subscribe()
+        # A checkpoint made before an item is created, as when resuming.
+        checkpoint = ImportCheckpoint(batch_size=5)
+        async with TestingSessionLocal() as session:
+            live = await repository.create_item(session, "live", "d")
+            await session.commit()
+
+        await ItemImporter(TestingSessionLocal, checkpoint=checkpoint).run(
+            _chunks(_ndjson(10)), "ndjson"
+        )
+
+        events = [await subscription.next_event(1) for _ in range(10)]
+        assert [e.event for e in events if e] == [ITEM_CREATED] * 10
+        assert all(e and uuid.UUID(e.id) > live.id for e in events)
+        await feed.stop()
+
+
+class TestImportEndpoint:
+    """Tests for POST /api/v1/items/import."""
+
+    def test_import_csv(self, client: TestClient) -> None:
+        """Test that a CSV body is imported and bad rows are reported."""
+        body = b"name,description\nA,first\nB\nC,third\n"
+        response = client.post(
+            "/api/v1/items/import",
+            content=body,
+            headers={"Content-Type": "text/csv"},
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["complete"] is True
+        assert (data["rows"], data["imported"], data["rejected"]) == (3, 2, 1)
+        assert data["errors"] == [{"row": 2, "message": "Expected 2 fields, got 1"}]
+        names = {item["name"] for item in client.get("/api/v1/items").json()}
+        assert names == {"A", "C"}
+
+    def test_format_query_overrides_content_type(self, client: TestClient) -> None:
+        """Test that ?format= works for clients that cannot set Content-Type."""
+        response = client.post(
+            "/api/v1/items/import?format=ndjson",
+            content=_ndjson(3),
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.json()["imported"] == 3
+
+    def test_unknown_content_type(self, client: TestClient) -> None:
+        """Test that an undetectable format is refused with 415."""
+        response = client.post(
+            "/api/v1/items/import",
+            content=b"x",
+            headers={"Content-Type": "application/octet-stream"},
+        )
+        assert response.status_code == 415
+
+    def test_bad_csv_header(self, client: TestClient) -> None:
+        """Test that an unusable CSV header is a client error."""
+        response = client.post(
+            "/api/v1/items/import",
+            content=b"title\nA\n",
+            headers={"Content-Type": "text/csv"},
+        )
+        assert response.status_code == 400
+
+
+class TestImportCli:
+    """Tests for the import-items command."""
+
+    def test_imports_file_and_removes_checkpoint(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys
+    ) -> None:
+        """Test a full CLI import against the test database."""
+        source = tmp_path / "items.ndjson"
+        source.write_bytes(_ndjson(12))
+        monkeypatch.setenv("DATABASE_URL", ASYNC_DATABASE_URL)
+        monkeypatch.setenv("ENVIRONMENT", "test")
+        get_settings.cache_clear()
+        try:
+            exit_code = cli.main(["import-items", str(source), "--batch-size", "5"])
+        finally:
+            get_settings.cache_clear()
+
+        assert exit_code == 0
+        assert json.loads(capsys.readouterr().out)["imported"] == 12
+        assert not (tmp_path / "items.ndjson.checkpoint").exists()
+
+    def test_unknown_extension(self, tmp_path: Path) -> None:
+        """Test that the format must be given when it cannot be inferred."""
+        source = tmp_path / "items.txt"
+        source.write_text("")
+        assert cli.main(["import-items", str(source)]) == 2
@@ -0,0 +1,184 @@
+"""Tests for item counts and paginated item listings."""
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app import cli
+from app.core.config import get_settings
+from app.db import repository
+from app.db.database import ReadOnlySession
+from app.db.models import Item, ItemCount
+from app.models.schemas import ItemCreate
+from app.services.importer import load_items
+from tests.conftest import ASYNC_DATABASE_URL, TestingSessionLocal, async_engine
+
+
+def _create(client: TestClient, count: int) -> list[str]:
+    return [
+        client.post(
+            "/api/v1/items", json={"name": f"Item {i}", "description": "d"}
+        ).json()["id"]
+        for i in range(count)
+    ]
+
+
+class TestItemCounter:
+    """Tests for the incrementally maintained item count."""
+
+    @pytest.mark.asyncio
+    async def test_inserts_are_counted(self) -> None:
+        """Test that single and bulk inserts update the counter."""
+        async with TestingSessionLocal() as session:
+            await repository.create_item(session, "a", "d")
+            await load_items(session, [ItemCreate(name="b", description="d")] * 5)
+            await session.commit()
+
+        async with TestingSessionLocal() as session:
+            assert await repository.count_items(session) == 6
+
+    @pytest.mark.asyncio
+    async def test_rolled_back_inserts_are_not_counted(self) -> None:
+        """Test that the counter commits and rolls back with the items."""
+        async with TestingSessionLocal() as session:
+            await repository.create_item(session, "a", "d")
+            await session.rollback()
+            assert await repository.count_items(session) == 0
+
+    @pytest.mark.asyncio
+    async def test_recount_repairs_drift(self) -> None:
+        """Test that a recount matches rows removed behind the counter's back."""
+        async with TestingSessionLocal() as session:
+            for name in "abc":
+                await repository.create_item(session, name, "d")
+            await session.execute(delete(Item).where(Item.name == "a"))
+            await session.commit()
+            assert await repository.count_items(session) == 3
+
+            assert await repository.recount_items(session) == 2
+            await session.commit()
+            assert await repository.count_items(session) == 2
+
+    @pytest.mark.asyncio
+    async def test_writes_bump_the_revision(self) -> None:
+        """Test that every write, and a recount, moves the collection revision."""
+        async with TestingSessionLocal() as session:
+            await repository.create_item(session, "a", "d")
+            await load_items(session, [ItemCreate(name="b", description="d")] * 5)
+            await session.commit()
+            after_writes = await repository.items_revision(session)
+            await repository.recount_items(session)
+            await session.commit()
+
+            assert after_writes == 2
+            assert await repository.items_revision(session) > after_writes
+
+    @pytest.mark.asyncio
+    async def test_no_estimate_without_postgresql(self) -> None:
+        """Test that the approximate count is unavailable on SQLite."""
+        async with TestingSessionLocal() as session:
+            assert await repository.estimate_item_count(session) is None
+
+    @pytest.mark.asyncio
+    async def test_estimate_holds_no_connection(self) -> None:
+        """Test that estimating on a read-only session leaves no connection out."""
+        factory = async_sessionmaker(async_engine, class_=ReadOnlySession)
+        async with factory() as session:
+            await repository.estimate_item_count(session)
+            assert not session.in_transaction()
+
+
+class TestRecountCli:
+    """Tests for the recount-items command."""
+
+    def test_resets_counter(
+        self, client: TestClient, monkeypatch: pytest.MonkeyPatch, capsys
+    ) -> None:
+        """Test that the command restores a counter that drifted."""
+        _create(client, 2)
+
+        async def corrupt() -> None:
+            async with TestingSessionLocal() as session:
+                await session.execute(update(ItemCount).values(count=7))
+                await session.commit()
+
+        asyncio.run(corrupt())
+        monkeypatch.setenv("DATABASE_URL", ASYNC_DATABASE_URL)
+        monkeypatch.setenv("ENVIRONMENT", "test")
+        get_settings.cache_clear()
+        try:
+            exit_code = cli.main(["recount-items"])
+        finally:
+            get_settings.cache_clear()
+
+        assert exit_code == 0
+        assert capsys.readouterr().out.strip() == "2"
+        assert client.get("/api/v1/items/count").json()["count"] == 2
+
+
+class TestCountEndpoint:
+    """Tests for GET /api/v1/items/count."""
+
+    def test_exact_count(self, client: TestClient) -> None:
+        """Test the count after some creations."""
+        _create(client, 3)
+        response = client.get("/api/v1/items/count")
+
+        assert response.status_code == 200
+        assert response.json() == {"count": 3, "exact": True}
+
+    def test_approximate_falls_back_to_exact(self, client: TestClient) -> None:
+        """Test that approximate mode is exact where no estimate exists."""
+        _create(client, 2)
+        response = client.get("/api/v1/items/count?mode=approximate")
+        assert response.json() == {"count": 2, "exact": True}
+
+    def test_unknown_mode(self, client: TestClient) -> None:
+        """Test that an unknown mode is rejected."""
+        assert client.get("/api/v1/items/count?mode=fast").status_code == 422
+
+
+class TestPaginatedItems:
+    """Tests for pages and totals on GET /api/v1/items."""
+
+    def test_pages_with_total(self, client: TestClient) -> None:
+        """Test walking pages by ID with the total alongside."""
+        ids = _create(client, 5)
+
+        first = client.get("/api/v1/items?limit=2&total=exact")
+        second = client.get(f"/api/v1/items?limit=2&after={ids[1]}")
+        last = client.get(f"/api/v1/items?limit=2&after={ids[3]}")
+
+        assert [item["id"] for item in first.json()] == ids[:2]
+        assert first.headers["X-Total-Count"] == "5"
+        assert [item["id"] for item in second.json()] == ids[2:4]
+        assert "X-Total-Count" not in second.headers
+        assert [item["id"] for item in last.json()] == ids[4:]
+
+    def test_total_on_full_listing(self, client: TestClient) -> None:
+        """Test the total header without pagination."""
+        _create(client, 2)
+        response = client.get("/api/v1/items?total=approximate")
+        assert response.headers["X-Total-Count"] == "2"
+
+    def test_page_revalidation(self, client: TestClient) -> None:
+        """Test that a page's ETag is distinct and revalidates."""
+        _create(client, 3)
+        page = client.get("/api/v1/items?limit=2")
+        full = client.get("/api/v1/items")
+
+        assert page.headers["ETag"] != full.headers["ETag"]
+        cached = client.get(
+            "/api/v1/items?limit=2", headers={"If-None-Match": page.headers["ETag"]}
+        )
+        assert cached.status_code == 304
+
+    def test_invalid_pagination(self, client: TestClient) -> None:
+        """Test that after needs a limit and limits are bounded."""
+        after = client.get(f"/api/v1/items?after={'0' * 8}-0000-0000-0000-{'0' * 12}")
+        assert after.status_code == 400
+        assert client.get("/api/v1/items?limit=0").status_code == 422
+        assert client.get("/api/v1/items?limit=1001").status_code == 422
@@ -0,0 +1,36 @@
+"""Tests for the event loop lag probe."""
+
+import asyncio
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.loop_lag import EventLoopLagMonitor
+
+
+class TestEventLoopLagMonitor:
+    """Tests for measuring event loop scheduling delay."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_shows_as_lag(self) -> None:
+        """Test that blocking the loop is reported as lag."""
+        monitor = EventLoopLagMonitor(interval=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0)
+            time.sleep(0.2)
+            # The probe wakes up late on the next loop iteration.
+            await asyncio.sleep(0.01)
+            assert (REGISTRY.get_sample_value("event_loop_lag_seconds") or 0) >= 0.1
+        finally:
+            await monitor.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_is_idempotent(self) -> None:
+        """Test that stopping twice, or before starting, is harmless."""
+        monitor = EventLoopLagMonitor(interval=0.01)
+        await monitor.stop()
+        monitor.start()
+        await monitor.stop()
+        await monitor.stop()
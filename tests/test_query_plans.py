@@ -0,0 +1,189 @@
+"""Tests for query-plan capture and the plan regression guard."""
+
+import asyncio
+import os
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from app import cli
+from app.db.query_plans import (
+    DEFAULT_ROWS,
+    PlanSnapshot,
+    QueryPlan,
+    _postgresql_plan,
+    capture,
+    compare_plans,
+)
+from app.db.repository import QUERIES
+from tests.conftest import ASYNC_DATABASE_URL
+
+SNAPSHOTS = Path(__file__).parent / "query_plans"
+# Scratch PostgreSQL database to check the PostgreSQL plans against.
+POSTGRES_URL = os.getenv("QUERY_PLANS_POSTGRES_URL")
+UPDATE_HINT = (
+    "If the change is intended, run: PYTHONPATH=src python -m app.cli "
+    "explain-queries --snapshot {path} --update"
+)
+
+
+@pytest.fixture(scope="module")
+def sqlite_plans() -> Iterator[PlanSnapshot]:
+    """Plan every registered query on a seeded scratch SQLite database."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.unlink(path)
+    try:
+        yield asyncio.run(capture(f"sqlite+aiosqlite:///{path}", DEFAULT_ROWS))
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def _snapshot(**plans: QueryPlan) -> PlanSnapshot:
+    return PlanSnapshot("postgresql", 1000, dict(plans))
+
+
+# EXPLAIN (FORMAT JSON) output as asyncpg returns it.
+POSTGRESQL_EXPLAIN = (
+    '[{"Plan": {"Node Type": "Limit", "Total Cost": 12.5, "Plans": ['
+    '{"Node Type": "Index Scan", "Relation Name": "items", '
+    '"Index Name": "items_pkey", "Total Cost": 12.0},'
+    '{"Node Type": "Seq Scan", "Relation Name": "item_counts", '
+    '"Total Cost": 1.2}]}}]'
+)
+
+INDEXED = QueryPlan(
+    ("Index Scan on items using items_pkey",), 8.4, indexes=frozenset({"items_pkey"})
+)
+
+
+class TestRegisteredQueries:
+    """Guards on the plans of the repository's registered queries."""
+
+    def test_every_query_is_planned(self, sqlite_plans: PlanSnapshot) -> None:
+        """Test that the capture covers the whole registry."""
+        assert set(sqlite_plans.plans) == set(QUERIES)
+
+    def test_plans_match_snapshot(self, sqlite_plans: PlanSnapshot) -> None:
+        """Test that no query lost an index since the saved SQLite plans."""
+        path = SNAPSHOTS / "sqlite.json"
+        problems = compare_plans(PlanSnapshot.load(path), sqlite_plans)
+        assert not problems, "\n".join([*problems, UPDATE_HINT.format(path=path)])
+
+    def test_lookups_use_the_primary_key(self, sqlite_plans: PlanSnapshot) -> None:
+        """Test that lookups and pages never scan the items table."""
+        for name in ("item_by_id", "item_version_by_id", "items_after", "all_items"):
+            assert "items" not in sqlite_plans.plans[name].seq_scans, name
+
+    @pytest.mark.skipif(
+        POSTGRES_URL is None, reason="QUERY_PLANS_POSTGRES_URL is not set"
+    )
+    def test_postgresql_plans_match_snapshot(self) -> None:
+        """Test estimated costs and indexes against the saved PostgreSQL plans."""
+        path = SNAPSHOTS / "postgresql.json"
+        assert POSTGRES_URL is not None
+        current = asyncio.run(capture(POSTGRES_URL, DEFAULT_ROWS))
+        if not path.exists():
+            pytest.skip(f"No saved PostgreSQL plans. {UPDATE_HINT.format(path=path)}")
+        problems = compare_plans(PlanSnapshot.load(path), current)
+        assert not problems, "\n".join([*problems, UPDATE_HINT.format(path=path)])
+
+
+class TestComparePlans:
+    """Tests for detecting plan regressions."""
+
+    def test_unchanged_plans(self) -> None:
+        """Test that identical plans and small cost changes pass."""
+        current = QueryPlan(INDEXED.steps, 10.0, indexes=INDEXED.indexes)
+        assert compare_plans(_snapshot(q=INDEXED), _snapshot(q=current)) == []
+
+    def test_new_full_scan_and_lost_index(self) -> None:
+        """Test that falling back to a sequential scan is reported."""
+        scan = QueryPlan(("Seq Scan on items",), 8.0, seq_scans=frozenset({"items"}))
+        assert compare_plans(_snapshot(q=INDEXED), _snapshot(q=scan)) == [
+            "q: now reads items by a full scan",
+            "q: no longer uses index items_pkey",
+        ]
+
+    def test_cost_growth(self) -> None:
+        """Test that costs beyond the tolerance are reported."""
+        costly = QueryPlan(INDEXED.steps, 20.0, indexes=INDEXED.indexes)
+        assert compare_plans(_snapshot(q=INDEXED), _snapshot(q=costly)) == [
+            "q: estimated cost 20.0 is over 1.5x the saved 8.4"
+        ]
+        assert compare_plans(_snapshot(q=INDEXED), _snapshot(q=costly), 3.0) == []
+
+    def test_unsaved_query_and_other_dataset(self) -> None:
+        """Test that new queries and mismatched snapshots are reported."""
+        assert compare_plans(_snapshot(), _snapshot(q=INDEXED)) == [
+            "q: no saved plan; update the snapshot"
+        ]
+        other = PlanSnapshot("sqlite", 1000, {"q": INDEXED})
+        assert compare_plans(other, _snapshot(q=INDEXED)) == [
+            "Snapshot is for sqlite with 1000 rows, not postgresql with 1000 rows"
+        ]
+
+    def test_snapshot_round_trip(self, sqlite_plans: PlanSnapshot) -> None:
+        """Test that snapshots survive serialization."""
+        assert PlanSnapshot.from_json(sqlite_plans.to_json()) == sqlite_plans
+
+
+class TestPostgresqlPlans:
+    """Tests for reducing EXPLAIN (FORMAT JSON) output."""
+
+    def test_nested_plan(self) -> None:
+        """Test that nodes, indexes, scans and the root cost are extracted."""
+        assert _postgresql_plan(POSTGRESQL_EXPLAIN) == QueryPlan(
+            (
+                "Limit",
+                "  Index Scan on items using items_pkey",
+                "  Seq Scan on item_counts",
+            ),
+            12.5,
+            frozenset({"item_counts"}),
+            frozenset({"items_pkey"}),
+        )
+
+    def test_cost_growth_fails_the_check(self) -> None:
+        """Test the cost ratio on plans reduced from EXPLAIN output."""
+        baseline = _snapshot(q=_postgresql_plan(POSTGRESQL_EXPLAIN))
+        grown = _snapshot(
+            q=_postgresql_plan(
+                POSTGRESQL_EXPLAIN.replace('"Total Cost": 12.5', '"Total Cost": 40.0')
+            )
+        )
+
+        assert compare_plans(baseline, grown) == [
+            "q: estimated cost 40.0 is over 1.5x the saved 12.5"
+        ]
+        assert compare_plans(baseline, grown, cost_tolerance=4.0) == []
+
+
+class TestExplainCli:
+    """Tests for the explain-queries command."""
+
+    def test_update_then_check(self, tmp_path: Path, capsys) -> None:
+        """Test saving plans and checking a later run against them."""
+        snapshot = tmp_path / "plans.json"
+        args = ["explain-queries", "--rows", "500", "--snapshot", str(snapshot)]
+
+        assert cli.main([*args, "--update"]) == 0
+        assert cli.main(args) == 0
+        assert "item_by_id\n    SEARCH items" in capsys.readouterr().out
+
+        saved = PlanSnapshot.load(snapshot)
+        saved.plans["item_by_id"] = QueryPlan(
+            ("SCAN items",), None, frozenset(), frozenset({"missing_index"})
+        )
+        saved.save(snapshot)
+        assert cli.main(args) == 1
+        assert "item_by_id: no longer uses index missing_index" in (
+            capsys.readouterr().err
+        )
+
+    def test_refuses_populated_database(self, tmp_path: Path) -> None:
+        """Test that an existing schema is never seeded."""
+        assert cli.main(["explain-queries", "--database-url", ASYNC_DATABASE_URL]) == 2
@@ -0,0 +1,50 @@
+"""Tests for the item repository's prebuilt statements."""
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.db import repository
+from app.db.database import Base
+from app.db.models import Item
+
+
+class TestPrebuiltStatements:
+    """Tests for statement reuse in the item repository."""
+
+    def test_registry_lists_read_queries(self) -> None:
+        """Test that every read query is registered by name."""
+        assert repository.QUERIES["item_by_id"] is repository.ITEM_BY_ID
+        assert set(repository.QUERIES) == {
+            "item_by_id",
+            "item_version_by_id",
+            "all_items",
+            "items_after",
+            "items_revision",
+            "item_count",
+        }
+
+    def test_lookup_compiles_once(self) -> None:
+        """Test that lookups with different keys share one compiled form."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        compiled = []
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            compiled.append(context.compiled)
+
+        with Session(engine) as session:
+            items = [Item(name=n, description="d") for n in ("a", "b")]
+            session.add_all(items)
+            session.commit()
+            keys = [item.id for item in items]
+            compiled.clear()
+
+            for key in keys:
+                found = session.execute(
+                    repository.ITEM_BY_ID, {"item_id": key}
+                ).scalar_one()
+                assert found.id == key
+
+        assert len(compiled) == 2
+        assert compiled[0] is compiled[1]
@@ -53,6 +53,23 @@ class TestItemsAPI:
         assert data["name"] == "Specific Item"
         assert data["description"] == "For lookup"
 
+    def test_get_item_by_id_accepts_uppercase_id(self, client: TestClient) -> None:
+        """Test that GET /api/v1/items/{id} is not sensitive to UUID case."""
+        item_id = client.post(
+            "/api/v1/items", json={"name": "Upper", "description": "Case"}
+        ).json()["id"]
+
+        response = client.get(f"/api/v1/items/{item_id.upper()}")
+        assert response.status_code == 200
+        assert response.json()["id"] == item_id
+
+    def test_get_item_by_id_returns_404_for_unknown_uuid(
+        self, client: TestClient
+    ) -> None:
+        """Test that a well-formed but unknown UUID returns 404."""
+        response = client.get("/api/v1/items/00000000-0000-7000-8000-000000000000")
+        assert response.status_code == 404
+
     def test_get_item_by_id_returns_404_for_nonexistent(
         self, client: TestClient
     ) -> None:
@@ -94,6 +111,95 @@ class TestItemsAPI:
         assert response.status_code == 422
 
 
+class TestItemsConditionalGet:
+    """Tests for ETag / If-None-Match handling on the items endpoints."""
+
+    def _create(self, client: TestClient, name: str = "Cached") -> dict:
+        return client.post(
+            "/api/v1/items", json={"name": name, "description": "For caching"}
+        ).json()
+
+    def test_get_item_returns_strong_etag(self, client: TestClient) -> None:
+        """Test that GET /api/v1/items/{id} returns a strong ETag."""
+        item = self._create(client)
+        response = client.get(f"/api/v1/items/{item['id']}")
+        assert response.status_code == 200
+        etag = response.headers["ETag"]
+        assert etag.startswith('"') and etag.endswith('"')
+
+    def test_get_item_returns_304_for_matching_etag(self, client: TestClient) -> None:
+        """Test that a matching If-None-Match yields an empty 304."""
+        item = self._create(client)
+        etag = client.get(f"/api/v1/items/{item['id']}").headers["ETag"]
+
+        response = client.get(
+            f"/api/v1/items/{item['id']}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert response.content == b""
+
+    def test_get_item_accepts_weak_and_listed_etags(self, client: TestClient) -> None:
+        """Test that If-None-Match uses weak comparison over a list of tags."""
+        item = self._create(client)
+        etag = client.get(f"/api/v1/items/{item['id']}").headers["ETag"]
+
+        response = client.get(
+            f"/api/v1/items/{item['id']}",
+            headers={"If-None-Match": f'"stale", W/{etag}'},
+        )
+        assert response.status_code == 304
+
+    def test_get_item_returns_200_for_stale_etag(self, client: TestClient) -> None:
+        """Test that a non-matching If-None-Match returns the full item."""
+        item = self._create(client)
+        response = client.get(
+            f"/api/v1/items/{item['id']}", headers={"If-None-Match": '"stale"'}
+        )
+        assert response.status_code == 200
+        assert response.json()["id"] == item["id"]
+
+    def test_get_item_with_etag_returns_404_for_nonexistent(
+        self, client: TestClient
+    ) -> None:
+        """Test that If-None-Match does not mask a missing item."""
+        response = client.get(
+            "/api/v1/items/nonexistent-id-12345", headers={"If-None-Match": "*"}
+        )
+        assert response.status_code == 404
+
+    def test_create_item_etag_matches_get(self, client: TestClient) -> None:
+        """Test that POST /api/v1/items returns the same ETag as a later GET."""
+        created = client.post(
+            "/api/v1/items", json={"name": "Fresh", "description": "New"}
+        )
+        item_id = created.json()["id"]
+        assert created.headers["ETag"] == (
+            client.get(f"/api/v1/items/{item_id}").headers["ETag"]
+        )
+
+    def test_get_items_returns_304_until_list_changes(self, client: TestClient) -> None:
+        """Test that the list ETag revalidates until an item is added."""
+        self._create(client, "First")
+        etag = client.get("/api/v1/items").headers["ETag"]
+
+        response = client.get("/api/v1/items", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        self._create(client, "Second")
+        response = client.get("/api/v1/items", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert len(response.json()) == 2
+
+    def test_get_items_etag_for_empty_list(self, client: TestClient) -> None:
+        """Test that an empty list also revalidates with its ETag."""
+        etag = client.get("/api/v1/items").headers["ETag"]
+        response = client.get("/api/v1/items", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+
 class TestCalculateAPI:
     """Tests for the /api/v1/calculate endpoint."""
 
@@ -0,0 +1,368 @@
+"""Tests for optional item sharding over several databases."""
+
+import os
+import tempfile
+import uuid
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+
+import pytest
+import pytest_asyncio
+from alembic.command import upgrade
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.core.config import get_settings
+from app.db import database, repository
+from app.db.database import (
+    PRIMARY_SHARD,
+    Base,
+    ItemShardRouter,
+    ReadOnlySession,
+    item_shard_router,
+    sharding_options,
+)
+from app.db.models import Item, ItemCount
+from app.db.types import uuid7
+from app.models.schemas import ItemCreate
+from app.services import importer
+from app.services.importer import (
+    ImportCheckpoint,
+    ImportFailed,
+    ItemImporter,
+    load_items,
+)
+
+
+@dataclass
+class ShardedDatabase:
+    """A primary database and two item shards, each in its own SQLite file."""
+
+    engines: dict[str, AsyncEngine]
+    sessions: async_sessionmaker[AsyncSession]
+    read_sessions: async_sessionmaker[ReadOnlySession]
+    statements: dict[str, int]
+
+    @property
+    def router(self) -> ItemShardRouter:
+        return self.sessions.kw["info"]["item_shards"]
+
+    async def item_ids(self, shard_id: str) -> set[uuid.UUID]:
+        async with self.engines[shard_id].connect() as conn:
+            return set((await conn.execute(select(Item.id))).scalars())
+
+
+@pytest_asyncio.fixture
+async def sharded() -> AsyncGenerator[ShardedDatabase, None]:
+    """Create a primary and two shard databases on throwaway SQLite files."""
+    paths: list[str] = []
+    engines: dict[str, AsyncEngine] = {}
+    statements: dict[str, int] = {}
+    for name in (PRIMARY_SHARD, "shard0", "shard1"):
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        paths.append(path)
+        engines[name] = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with engines[name].begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        statements[name] = 0
+
+        def count(*args: object, name: str = name) -> None:
+            statements[name] += 1
+
+        event.listen(engines[name].sync_engine, "before_cursor_execute", count)
+
+    primary = engines[PRIMARY_SHARD]
+    shards = {name: engine for name, engine in engines.items() if name != PRIMARY_SHARD}
+    yield ShardedDatabase(
+        engines=engines,
+        sessions=async_sessionmaker(
+            primary, expire_on_commit=False, **sharding_options(primary, shards)
+        ),
+        read_sessions=async_sessionmaker(
+            primary,
+            class_=ReadOnlySession,
+            expire_on_commit=False,
+            **sharding_options(primary, shards),
+        ),
+        statements=statements,
+    )
+    for engine in engines.values():
+        await engine.dispose()
+    for path in paths:
+        os.unlink(path)
+
+
+async def _create_items(sharded: ShardedDatabase, count: int) -> list[Item]:
+    async with sharded.sessions() as session:
+        items = [
+            await repository.create_item(session, f"Item {i}", f"Row {i}")
+            for i in range(count)
+        ]
+        await session.commit()
+    return items
+
+
+class TestItemShardRouter:
+    """Tests for hashing items onto shards."""
+
+    def test_routing_is_stable_and_spreads_items(self) -> None:
+        """Test that an ID always maps to one shard and shards are all used."""
+        router = ItemShardRouter(["a", "b", "c"])
+        ids = [uuid7() for _ in range(300)]
+        assigned = [router.shard_for(item_id) for item_id in ids]
+
+        assert assigned == [router.shard_for(item_id) for item_id in ids]
+        assert all(assigned.count(shard) > 50 for shard in ("a", "b", "c"))
+
+    def test_requires_a_shard(self) -> None:
+        """Test that an empty shard list is a configuration error."""
+        with pytest.raises(ValueError):
+            ItemShardRouter([])
+
+
+class TestShardedRepository:
+    """Tests for the item repository on sharded sessions."""
+
+    @pytest.mark.asyncio
+    async def test_items_are_stored_on_their_owning_shard(
+        self, sharded: ShardedDatabase
+    ) -> None:
+        """Test that each created item exists on exactly its hashed shard."""
+        items = await _create_items(sharded, 20)
+
+        on_shard0 = await sharded.item_ids("shard0")
+        on_shard1 = await sharded.item_ids("shard1")
+        assert on_shard0 and on_shard1 and not on_shard0 & on_shard1
+        for item in items:
+            owner = (
+                on_shard0
+                if sharded.router.shard_for(item.id) == "shard0"
+                else on_shard1
+            )
+            assert item.id in owner
+        assert await sharded.item_ids(PRIMARY_SHARD) == set()
+
+    @pytest.mark.asyncio
+    async def test_get_item_queries_only_the_owning_shard(
+        self, sharded: ShardedDatabase
+    ) -> None:
+        """Test that a lookup by ID runs on one shard."""
+        items = await _create_items(sharded, 10)
+        target = items[3]
+        owner = sharded.router.shard_for(target.id)
+        before = dict(sharded.statements)
+
+        async with sharded.read_sessions() as session:
+            loaded = await repository.get_item(session, target.id)
+            version = await repository.get_item_version(session, target.id)
+
+        assert loaded is not None and loaded.name == "Item 3"
+        assert version == 1
+        queried = {
+            name for name, count in sharded.statements.items() if count > before[name]
+        }
+        assert queried == {owner}
+
+    @pytest.mark.asyncio
+    async def test_list_items_merges_shards_in_id_order(
+        self, sharded: ShardedDatabase
+    ) -> None:
+        """Test that the scatter-gather listing is in creation order."""
+        items = await _create_items(sharded, 15)
+
+        async with sharded.read_sessions() as session:
+            listed = await repository.list_items(session)
+            page = await repository.list_items_after(session, items[4].id, 6)
+
+        assert [item.id for item in listed] == [item.id for item in items]
+        assert [item.id for item in page] == [item.id for item in items[5:11]]
+
+    @pytest.mark.asyncio
+    async def test_revision_folds_every_shard(self, sharded: ShardedDatabase) -> None:
+        """Test that writes on any shard move the collection revision."""
+        async with sharded.read_sessions() as session:
+            assert await repository.items_revision(session) == 0
+        await _create_items(sharded, 12)
+
+        async with sharded.read_sessions() as session:
+            assert await repository.items_revision(session) == 12
+
+    @pytest.mark.asyncio
+    async def test_bulk_load_splits_rows_by_shard(
+        self, sharded: ShardedDatabase
+    ) -> None:
+        """Test that imported rows land on their owning shards."""
+        items = [ItemCreate(name=f"Item {i}", description="d") for i in range(40)]
+        async with sharded.sessions() as session:
+            assert item_shard_router(session) is sharded.router
+            await load_items(session, items)
+            await session.commit()
+
+        on_shard0 = await sharded.item_ids("shard0")
+        on_shard1 = await sharded.item_ids("shard1")
+        assert len(on_shard0) + len(on_shard1) == 40
+        assert all(sharded.router.shard_for(i) == "shard0" for i in on_shard0)
+        assert all(sharded.router.shard_for(i) == "shard1" for i in on_shard1)
+
+    @pytest.mark.asyncio
+    async def test_each_shard_counts_its_own_items(
+        self, sharded: ShardedDatabase
+    ) -> None:
+        """Test that single and bulk inserts update the owning shard's counter."""
+        await _create_items(sharded, 10)
+        async with sharded.sessions() as session:
+            await load_items(session, [ItemCreate(name="x", description="d")] * 30)
+            await session.commit()
+
+        for shard_id in ("shard0", "shard1"):
+            async with sharded.engines[shard_id].connect() as conn:
+                counted = (
+                    await conn.execute(select(func.sum(ItemCount.count)))
+                ).scalar_one()
+            assert counted == len(await sharded.item_ids(shard_id))
+        async with sharded.read_sessions() as session:
+            assert await repository.count_items(session) == 40
+
+    @pytest.mark.asyncio
+    async def test_import_resumes_a_partly_committed_batch(
+        self, sharded: ShardedDatabase, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that shards which committed a failed batch are not loaded twice."""
+        source = b"".join(
+            f'{{"name": "Item {i}", "description": "d"}}\n'.encode() for i in range(40)
+        )
+
+        async def chunks() -> AsyncGenerator[bytes, None]:
+            yield source
+
+        load = importer.load_items
+
+        async def shard1_down(
+            session: AsyncSession, items: list[ItemCreate], ids: list[uuid.UUID]
+        ) -> None:
+            if sharded.router.shard_for(ids[0]) == "shard1":
+                raise RuntimeError("shard1 unavailable")
+            await load(session, items, ids)
+
+        # Start on an ID base whose first row lands on shard0, so shard0 loads
+        # before shard1 fails.
+        start = ImportCheckpoint(batch_size=40)
+        while sharded.router.shard_for(start.item_id(0, 1)) != "shard0":
+            start = ImportCheckpoint(batch_size=40)
+        monkeypatch.setattr(importer, "load_items", shard1_down)
+        with pytest.raises(ImportFailed) as failed:
+            await ItemImporter(sharded.sessions, checkpoint=start).run(
+                chunks(), "ndjson"
+            )
+        checkpoint = failed.value.checkpoint
+        assert checkpoint.shards_done == {0: {"shard0"}}
+        committed = len(await sharded.item_ids("shard0"))
+        assert failed.value.progress.imported == committed
+
+        monkeypatch.setattr(importer, "load_items", load)
+        resumed = ItemImporter(
+            sharded.sessions,
+            checkpoint=ImportCheckpoint.from_token(checkpoint.to_token()),
+        )
+        progress = await resumed.run(chunks(), "ndjson")
+
+        assert (progress.skipped, progress.imported) == (committed, 40 - committed)
+        on_shard0 = await sharded.item_ids("shard0")
+        on_shard1 = await sharded.item_ids("shard1")
+        assert len(on_shard0) == committed
+        assert len(on_shard0) + len(on_shard1) == 40
+
+
+class TestShardSettings:
+    """Tests for configuring shards through settings."""
+
+    @pytest.mark.asyncio
+    async def test_shard_urls_enable_routing(
+        self, tmp_path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that DATABASE_SHARD_URLS creates and routes over the shards."""
+        urls = [f"sqlite+aiosqlite:///{tmp_path / name}.db" for name in "pab"]
+        monkeypatch.setenv("DATABASE_URL", urls[0])
+        monkeypatch.setenv("DATABASE_SHARD_URLS", f'["{urls[1]}", "{urls[2]}"]')
+        monkeypatch.setenv("ENVIRONMENT", "test")
+        get_settings.cache_clear()
+        await database.dispose_engine()
+        try:
+            await database.init_db()
+            factory = database.get_session_factory()
+            async with factory() as session:
+                router = item_shard_router(session)
+                assert router is not None
+                assert router.shard_ids == ["shard0", "shard1"]
+                await repository.create_item(session, "A", "a")
+                await session.commit()
+            async with database.read_session() as session:
+                result = await session.execute(select(func.count(Item.id)))
+                assert sum(result.scalars()) == 1
+        finally:
+            await database.dispose_engine()
+            get_settings.cache_clear()
+
+    @pytest.mark.asyncio
+    async def test_shards_get_item_tables_and_migrations(
+        self, tmp_path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that init_db migrates shards and keeps primary tables off them."""
+        urls = [f"sqlite+aiosqlite:///{tmp_path / name}.db" for name in "pab"]
+        # shard1 already exists at an older revision, before item_counts.revision.
+        old_shard = create_async_engine(urls[2])
+        async with old_shard.begin() as conn:
+            await conn.run_sync(
+                lambda sync_conn: upgrade(
+                    database.alembic_config(sync_conn, item_shard=True), "005"
+                )
+            )
+        await old_shard.dispose()
+        monkeypatch.setenv("DATABASE_URL", urls[0])
+        monkeypatch.setenv("DATABASE_SHARD_URLS", f'["{urls[1]}", "{urls[2]}"]')
+        monkeypatch.setenv("ENVIRONMENT", "test")
+        get_settings.cache_clear()
+        await database.dispose_engine()
+        try:
+            await database.init_db()
+            for shard in database._get_shard_engines().values():
+                async with shard.connect() as conn:
+                    tables, columns, revision = await conn.run_sync(
+                        lambda sync_conn: (
+                            set(inspect(sync_conn).get_table_names()),
+                            {
+                                c["name"]
+                                for c in inspect(sync_conn).get_columns("item_counts")
+                            },
+                            MigrationContext.configure(
+                                sync_conn
+                            ).get_current_revision(),
+                        )
+                    )
+                assert tables == {"alembic_version", "items", "item_counts"}
+                assert "revision" in columns
+                assert (
+                    revision
+                    == ScriptDirectory(
+                        database.alembic_script_location()
+                    ).get_current_head()
+                )
+        finally:
+            await database.dispose_engine()
+            get_settings.cache_clear()
+
+    @pytest.mark.asyncio
+    async def test_unsharded_sessions_have_no_router(self) -> None:
+        """Test that routing stays off without shard URLs."""
+        async with async_sessionmaker(
+            create_async_engine("sqlite+aiosqlite://")
+        )() as s:
+            assert item_shard_router(s) is None
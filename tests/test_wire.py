@@ -0,0 +1,125 @@
+"""Tests for JSON / MessagePack content negotiation on API routes."""
+
+import msgpack
+from fastapi.testclient import TestClient
+
+MSGPACK = "application/msgpack"
+
+
+def _post_msgpack(client: TestClient, url: str, payload: dict, **headers: str):
+    return client.post(
+        url,
+        content=msgpack.packb(payload),
+        headers={"Content-Type": MSGPACK, **headers},
+    )
+
+
+class TestMsgPackRequests:
+    """Tests for MessagePack request bodies."""
+
+    def test_create_item_from_msgpack_body(self, client: TestClient) -> None:
+        """Test that POST /api/v1/items accepts a MessagePack body."""
+        response = _post_msgpack(
+            client, "/api/v1/items", {"name": "Packed", "description": "Binary"}
+        )
+        assert response.status_code == 201
+        assert response.headers["Content-Type"] == "application/json"
+        assert response.json()["name"] == "Packed"
+
+    def test_msgpack_body_is_validated(self, client: TestClient) -> None:
+        """Test that MessagePack bodies go through schema validation."""
+        response = _post_msgpack(client, "/api/v1/items", {"name": "No description"})
+        assert response.status_code == 422
+
+    def test_calculate_round_trip_in_msgpack(self, client: TestClient) -> None:
+        """Test that /calculate can be used entirely in MessagePack."""
+        response = _post_msgpack(
+            client,
+            "/api/v1/calculate",
+            {"a": 6, "b": 7, "operation": "multiply"},
+            Accept=MSGPACK,
+        )
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == MSGPACK
+        assert msgpack.unpackb(response.content)["result"] == 42
+
+
+class TestMsgPackResponses:
+    """Tests for Accept-driven response encoding."""
+
+    def test_get_items_in_msgpack(self, client: TestClient) -> None:
+        """Test that GET /api/v1/items honours Accept: application/msgpack."""
+        client.post("/api/v1/items", json={"name": "A", "description": "First"})
+        response = client.get("/api/v1/items", headers={"Accept": MSGPACK})
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == MSGPACK
+        assert "Accept" in response.headers["Vary"]
+        items = msgpack.unpackb(response.content)
+        assert [item["name"] for item in items] == ["A"]
+
+    def test_get_item_in_msgpack(self, client: TestClient) -> None:
+        """Test that single items are also available as MessagePack."""
+        created = client.post(
+            "/api/v1/items", json={"name": "B", "description": "Second"}
+        ).json()
+        response = client.get(
+            f"/api/v1/items/{created['id']}",
+            headers={"Accept": "application/x-msgpack"},
+        )
+        assert response.headers["Content-Type"] == "application/x-msgpack"
+        assert msgpack.unpackb(response.content)["id"] == created["id"]
+
+    def test_wildcard_accept_defaults_to_json(self, client: TestClient) -> None:
+        """Test that */* and missing Accept headers keep JSON responses."""
+        response = client.get("/api/v1/items", headers={"Accept": "*/*"})
+        assert response.headers["Content-Type"] == "application/json"
+        assert response.json() == []
+
+    def test_quality_values_select_format(self, client: TestClient) -> None:
+        """Test that q values decide between JSON and MessagePack."""
+        response = client.get(
+            "/api/v1/items",
+            headers={"Accept": f"application/json;q=0.5, {MSGPACK}"},
+        )
+        assert response.headers["Content-Type"] == MSGPACK
+
+    def test_errors_stay_json(self, client: TestClient) -> None:
+        """Test that error responses are JSON regardless of Accept."""
+        response = client.get(
+            "/api/v1/items/nonexistent-id-12345", headers={"Accept": MSGPACK}
+        )
+        assert response.status_code == 404
+        assert response.json()["detail"]
+
+    def test_overflowing_result_is_json_null(self, client: TestClient) -> None:
+        """Test that a non-finite result renders as null, not invalid JSON."""
+        response = client.post(
+            "/api/v1/calculate", json={"a": 1e308, "b": 1e308, "operation": "multiply"}
+        )
+        assert response.status_code == 200
+        assert response.json()["result"] is None
+
+    def test_etags_differ_per_media_type(self, client: TestClient) -> None:
+        """Test that a JSON ETag never revalidates a MessagePack request."""
+        created = client.post(
+            "/api/v1/items", json={"name": "C", "description": "Third"}
+        ).json()
+        for url in ("/api/v1/items", f"/api/v1/items/{created['id']}"):
+            as_json = client.get(url)
+            as_msgpack = client.get(url, headers={"Accept": MSGPACK})
+            assert as_json.headers["ETag"] != as_msgpack.headers["ETag"]
+
+            stale = client.get(
+                url,
+                headers={"Accept": MSGPACK, "If-None-Match": as_json.headers["ETag"]},
+            )
+            fresh = client.get(
+                url,
+                headers={
+                    "Accept": MSGPACK,
+                    "If-None-Match": as_msgpack.headers["ETag"],
+                },
+            )
+            assert stale.status_code == 200
+            assert fresh.status_code == 304
+            assert fresh.headers["Vary"] == "Accept"